@@ -0,0 +1,27 @@
+import sys
+from db import backup_db, export_jsonl, import_jsonl
+from app import app
+
+
+# python backup-db.py backup <dest.db>   online backup of app.db (+ archive)
+# python backup-db.py export <dir>       one <table>.jsonl per table
+# python backup-db.py import <dir>       load a JSONL export into an empty app.db
+USAGE = "usage: python backup-db.py backup <dest.db> | export <dir> | import <dir>"
+
+if len(sys.argv) != 3 or sys.argv[1] not in ("backup", "export", "import"):
+    sys.exit(USAGE)
+
+command, target = sys.argv[1], sys.argv[2]
+with app.app_context():
+    if command == "backup":
+        report = backup_db(target)
+    elif command == "export":
+        report = export_jsonl(target)
+    else:
+        report = import_jsonl(target)
+
+for name, info in report.get("tables", {}).items():
+    print(f"  {name}: {info['rows']} rows, {info['bytes'] / 1e6:.2f} MB")
+for info in report.get("files", []):
+    print(f"  {info['path']}: {info['bytes'] / 1e6:.2f} MB")
+print(f"{command}: {report['bytes'] / 1e6:.2f} MB in {report['seconds']:.2f}s ({report['mb_per_s']} MB/s)")
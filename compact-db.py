@@ -0,0 +1,14 @@
+from db import compact_db
+from app import app
+
+
+# Move old messages/notifications/login events into the monthly archive
+# partitions (app.archive.db) and VACUUM app.db.
+with app.app_context():
+    report = compact_db()
+
+print(f"Archived rows: {report['moved']}")
+print(
+    f"app.db: {report['bytes_before'] / 1e6:.2f} MB -> {report['bytes_after'] / 1e6:.2f} MB "
+    f"(reclaimed {report['reclaimed_bytes'] / 1e6:.2f} MB); archive: {report['archive_bytes'] / 1e6:.2f} MB"
+)
@@ -10,480 +10,1243 @@ The rest of the backend imports and uses these functions.
 
 from __future__ import annotations
 
+import functools
+import json
+import os
+import queue
+import re
+import secrets
 import sqlite3
-from datetime import datetime, timezone, date
-from typing import Any, Dict, List, Optional, Tuple
-import pytz 
+import threading
+import time
+import urllib.parse
+from concurrent.futures import Future
+from datetime import datetime, timedelta, timezone, date
+from zoneinfo import ZoneInfo
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
 
 def utcnow_iso() -> str:
     return datetime.now(timezone.utc).isoformat()
 
 
+def utcnow_ms() -> int:
+    return time.time_ns() // 1_000_000
+
+
+def ms_to_iso(value: Any) -> Optional[str]:
+    """API form of an epoch-ms created_at (rows archived before v8 are already ISO text)."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        if not value.isdigit():
+            return value
+        value = int(value)
+    return datetime.fromtimestamp(value / 1000, timezone.utc).isoformat(timespec="milliseconds")
+
+
 def _row_to_dict(row: sqlite3.Row) -> dict:
-    return {k: row[k] for k in row.keys()}
+    return dict(zip(row.keys(), row))
+
+
+def _epoch_row_to_dict(row: sqlite3.Row) -> dict:
+    d = _row_to_dict(row)
+    d["created_at"] = ms_to_iso(d.get("created_at"))
+    return d
+
+
+# Seconds a connection waits on SQLite's locks before raising "database is locked".
+BUSY_TIMEOUT_S = 5.0
+# Idle read-only connections kept for reuse.
+READ_POOL_SIZE = 8
+# Max queued mutations committed together in one writer transaction.
+WRITE_BATCH_MAX = 64
+# Rows older than this move from the hot tables into monthly archive partitions.
+ARCHIVE_HORIZON_DAYS = 180
+# Timezone event dates/times are entered in (starts_at/ends_at are UTC epoch ms).
+EVENTS_TZ = "Asia/Singapore"
+# Free pages handed back per incremental-vacuum writer job.
+VACUUM_STEP_PAGES = 256
+# Online backup: pages copied per step, and the pause between steps for writers.
+BACKUP_PAGES_PER_STEP = 256
+BACKUP_STEP_SLEEP_S = 0.005
+# Rows per transaction when bulk-importing JSONL.
+IMPORT_BATCH_ROWS = 5000
+
+
+class _Connection(sqlite3.Connection):
+    """sqlite3 connection that knows its pool (close() hands it back) and
+    whether the archive database is attached."""
+
+    _pool: Optional["_ReadPool"] = None
+    archive_attached = False
+
+    def close(self) -> None:
+        pool = self._pool
+        if pool is not None and pool.release(self):
+            return
+        super().close()
+
+
+class _ReadPool:
+    """LIFO pool of read-only (mode=ro) connections; WAL lets them run in parallel."""
+
+    def __init__(self, connect: Callable[[], sqlite3.Connection], size: int) -> None:
+        self._connect = connect
+        self._idle: "queue.LifoQueue[_Connection]" = queue.LifoQueue(maxsize=size)
+        self._closed = False
+
+    def acquire(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+            conn._pool = self
+            return conn
+
+    def release(self, conn: _Connection) -> bool:
+        if self._closed:
+            return False
+        if conn.in_transaction:
+            conn.rollback()
+        try:
+            self._idle.put_nowait(conn)
+            return True
+        except queue.Full:
+            return False
+
+    def close(self) -> None:
+        self._closed = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            sqlite3.Connection.close(conn)
+
+
+class _WriterConnection:
+    """Writer-thread view of the connection: commit/close are owned by the batch."""
+
+    def __init__(self, conn: sqlite3.Connection) -> None:
+        self._conn = conn
+
+    def commit(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._conn, name)
+
+
+class _Writer:
+    """Single writer thread.
+
+    Mutations are submitted to a queue and return Futures. The thread drains up
+    to WRITE_BATCH_MAX queued jobs, runs each inside its own SAVEPOINT (so one
+    failing job does not undo the others) and commits the batch once.
+    """
+
+    def __init__(self, connect: Callable[[], sqlite3.Connection]) -> None:
+        # Connect on the caller's thread so setup errors surface there instead of
+        # leaving submitters waiting on a dead thread.
+        self._raw = connect()
+        self._raw.isolation_level = None  # explicit BEGIN/SAVEPOINT/COMMIT below
+        self.conn = _WriterConnection(self._raw)
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self._post_commit: List[Callable[[], None]] = []
+        self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+        self._thread.start()
+
+    def owns_current_thread(self) -> bool:
+        return threading.current_thread() is self._thread
+
+    def submit(self, fn: Callable, *args: Any, **kwargs: Any) -> Future:
+        fut: Future = Future()
+        self._queue.put((fn, args, kwargs, fut))
+        return fut
+
+    def after_commit(self, fn: Callable[[], None]) -> None:
+        """Defer fn until the current batch commits (dropped if its job rolls back)."""
+        self._post_commit.append(fn)
+
+    def stop(self) -> None:
+        self._queue.put(None)
+        if not self.owns_current_thread():
+            self._thread.join(timeout=BUSY_TIMEOUT_S)
+
+    def _run(self) -> None:
+        raw = self._raw
+        stopping = False
+        try:
+            while not stopping:
+                job = self._queue.get()
+                if job is None:
+                    break
+                batch = [job]
+                while len(batch) < WRITE_BATCH_MAX:
+                    try:
+                        nxt = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if nxt is None:
+                        stopping = True
+                        break
+                    batch.append(nxt)
+                self._run_batch(raw, batch)
+        finally:
+            raw.close()
+
+    def _run_batch(self, raw: sqlite3.Connection, batch: List[tuple]) -> None:
+        done: List[Tuple[Future, bool, Any]] = []
+        try:
+            raw.execute("BEGIN IMMEDIATE")
+            for fn, args, kwargs, fut in batch:
+                if not fut.set_running_or_notify_cancel():
+                    continue
+                raw.execute("SAVEPOINT job")
+                mark = len(self._post_commit)
+                try:
+                    result = fn(*args, **kwargs)
+                except Exception as e:
+                    del self._post_commit[mark:]
+                    if raw.in_transaction:
+                        raw.execute("ROLLBACK TO job")
+                        raw.execute("RELEASE job")
+                    done.append((fut, False, e))
+                else:
+                    raw.execute("RELEASE job")
+                    done.append((fut, True, result))
+            if raw.in_transaction:
+                raw.execute("COMMIT")
+        except sqlite3.Error as e:
+            self._post_commit = []
+            if raw.in_transaction:
+                raw.execute("ROLLBACK")
+            for _, _, _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+        callbacks, self._post_commit = self._post_commit, []
+        for cb in callbacks:
+            try:
+                cb()
+            except Exception:
+                pass
+        for fut, ok, value in done:
+            if ok:
+                fut.set_result(value)
+            else:
+                fut.set_exception(value)
 
 
 class DB:
-    """Very small helper wrapper around sqlite3."""
+    """Very small helper wrapper around sqlite3.
+
+    Reads go through pooled read-only connections; all mutations are serialized
+    through one writer thread (see _Writer).
+    """
 
     def __init__(self) -> None:
         self._path: Optional[str] = None
+        self._lock = threading.Lock()
+        self._readers: Optional[_ReadPool] = None
+        self._writer: Optional[_Writer] = None
+        self.archive_path: Optional[str] = None
+        self.archive_horizon_days = ARCHIVE_HORIZON_DAYS
+        self.events_tz = ZoneInfo(EVENTS_TZ)
 
     def init_app(self, app) -> None:
+        self.close_all()
         self._path = app.config["SQLITE_PATH"]
+        self.archive_path = app.config.get("ARCHIVE_PATH") or os.path.splitext(self._path)[0] + ".archive.db"
+        self.archive_horizon_days = int(app.config.get("ARCHIVE_HORIZON_DAYS") or ARCHIVE_HORIZON_DAYS)
+        self.events_tz = ZoneInfo(app.config.get("EVENTS_TZ") or EVENTS_TZ)
 
     def connect(self) -> sqlite3.Connection:
+        """Open a write-capable connection (schema setup, the writer thread)."""
         if not self._path:
             raise RuntimeError("DB not initialized; call db.init_app(app)")
-        conn = sqlite3.connect(self._path, check_same_thread=False)
+        conn = sqlite3.connect(self._path, timeout=BUSY_TIMEOUT_S, check_same_thread=False, factory=_Connection)
         conn.row_factory = sqlite3.Row
         conn.execute("PRAGMA foreign_keys = ON;")
+        self._attach_archive(conn, self.archive_path)
+        return conn
+
+    def connect_readonly(self) -> sqlite3.Connection:
+        if not self._path:
+            raise RuntimeError("DB not initialized; call db.init_app(app)")
+        uri = "file:" + urllib.parse.quote(os.path.abspath(self._path)) + "?mode=ro"
+        conn = sqlite3.connect(
+            uri, uri=True, timeout=BUSY_TIMEOUT_S, check_same_thread=False, factory=_Connection
+        )
+        conn.row_factory = sqlite3.Row
+        if self.archive_path:
+            self._attach_archive(conn, "file:" + urllib.parse.quote(os.path.abspath(self.archive_path)) + "?mode=ro")
         return conn
 
+    def _attach_archive(self, conn: _Connection, target: Optional[str]) -> None:
+        if self.archive_path and os.path.exists(self.archive_path):
+            conn.execute("ATTACH DATABASE ? AS archive", (target,))
+            conn.archive_attached = True
+
+    def reader(self) -> sqlite3.Connection:
+        with self._lock:
+            if self._readers is None:
+                self._readers = _ReadPool(self.connect_readonly, READ_POOL_SIZE)
+            pool = self._readers
+        return pool.acquire()
+
+    def writer(self) -> _Writer:
+        with self._lock:
+            if self._writer is None:
+                self._writer = _Writer(self.connect)
+            return self._writer
+
+    def current_writer(self) -> Optional[_Writer]:
+        return self._writer
+
+    def close_all(self) -> None:
+        with self._lock:
+            readers, writer = self._readers, self._writer
+            self._readers = self._writer = None
+        if writer is not None:
+            writer.stop()
+        if readers is not None:
+            readers.close()
+
 
 # Singleton used by APIs
 _db = DB()
 
 
-def init_db(app) -> None:
-    """Create (or migrate) schema + seed data.
+# Bump whenever the schema or the migrations in _migrate_schema() change.
+# init_db() compares it against PRAGMA user_version and skips all DDL when equal.
+SCHEMA_VERSION = 15
+
+# Tables whose live row counts are materialized in admin_stats.
+_STAT_TABLES = (
+    "users", "stories", "story_comments", "skillswap_posts", "skillswap_comments", "events",
+    "messages", "notifications", "reports", "login_events",
+)
+
+
+def init_db(app, *, seed: bool = False) -> None:
+    """Create (or migrate) schema; optionally seed demo data.
+
+    Normal startup only reads PRAGMA user_version and returns when the stored
+    schema is current. Seeding is an explicit opt-in step: pass seed=True or set
+    app.config["SEED_DEMO_DATA"] (re-seed.py does the former).
 
-    Constraints:
-    - Plaintext passwords (NO hashing)
-    - SQLite persistence
-    - Seed demo data for testing
+    The elapsed time is recorded in app.config["DB_INIT_MS"].
     """
+    started = time.perf_counter()
     _db.init_app(app)
+    seed = seed or bool(app.config.get("SEED_DEMO_DATA"))
     conn = _db.connect()
     try:
-        # Base schema (idempotent)
-        conn.executescript(
-            """
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                full_name TEXT NOT NULL,
-                email TEXT NOT NULL UNIQUE,
-                password TEXT NOT NULL,
-                age INTEGER,
-                generation TEXT,
-                bio TEXT,
-                match_preferences TEXT,
-                avatar TEXT,
-                is_admin INTEGER NOT NULL DEFAULT 0,
-                is_banned INTEGER NOT NULL DEFAULT 0,
-                show_in_matchup INTEGER NOT NULL DEFAULT 0,
-                suspended_until TEXT,
-                warning_message TEXT,
-                warning_ack INTEGER NOT NULL DEFAULT 1
-            );
-
-            CREATE TABLE IF NOT EXISTS interests (
-                name TEXT PRIMARY KEY
-            );
-
-            CREATE TABLE IF NOT EXISTS user_interests (
-                user_id INTEGER NOT NULL,
-                interest_name TEXT NOT NULL,
-                PRIMARY KEY (user_id, interest_name),
-                FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
-                FOREIGN KEY (interest_name) REFERENCES interests(name) ON DELETE CASCADE
-            );
-
-            CREATE TABLE IF NOT EXISTS stories (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                title TEXT NOT NULL,
-                category TEXT NOT NULL,
-                content TEXT NOT NULL,
-                status TEXT NOT NULL DEFAULT 'ongoing',
-                created_at TEXT NOT NULL,
-                FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
-            );
-
-            CREATE TABLE IF NOT EXISTS story_comments (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                story_id INTEGER NOT NULL,
-                user_id INTEGER NOT NULL,
-                text TEXT NOT NULL,
-                created_at TEXT NOT NULL,
-                FOREIGN KEY (story_id) REFERENCES stories(id) ON DELETE CASCADE,
-                FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
-            );
-
-            CREATE TABLE IF NOT EXISTS skillswap_posts (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                post_type TEXT NOT NULL,
-                title TEXT NOT NULL,
-                category TEXT NOT NULL,
-                description TEXT NOT NULL,
-                created_at TEXT NOT NULL,
-                FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
-            );
-
-            CREATE TABLE IF NOT EXISTS events (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                title TEXT NOT NULL,
-                description TEXT,
-                location TEXT,
-                start_date TEXT NOT NULL,
-                start_time TEXT,
-                end_date TEXT,
-                end_time TEXT,
-                link TEXT,
-                created_at TEXT NOT NULL
-            );
-
-            CREATE TABLE IF NOT EXISTS messages (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                sender_id INTEGER NOT NULL,
-                recipient_id INTEGER NOT NULL,
-                text TEXT NOT NULL,
-                created_at TEXT NOT NULL,
-                is_read INTEGER NOT NULL DEFAULT 0,
-                FOREIGN KEY (sender_id) REFERENCES users(id) ON DELETE CASCADE,
-                FOREIGN KEY (recipient_id) REFERENCES users(id) ON DELETE CASCADE
-            );
-
-            CREATE TABLE IF NOT EXISTS notifications (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                notif_type TEXT NOT NULL,
-                icon TEXT NOT NULL,
-                title TEXT NOT NULL,
-                content TEXT NOT NULL,
-                link TEXT,
-                created_at TEXT NOT NULL,
-                is_read INTEGER NOT NULL DEFAULT 0,
-                FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
-            );
-
-            CREATE TABLE IF NOT EXISTS reports (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                reporter_id INTEGER NOT NULL,
-                target_user_id INTEGER NOT NULL,
-                reason TEXT NOT NULL,
-                details TEXT,
-                status TEXT NOT NULL DEFAULT 'pending',
-                created_at TEXT NOT NULL,
-                FOREIGN KEY (reporter_id) REFERENCES users(id) ON DELETE CASCADE,
-                FOREIGN KEY (target_user_id) REFERENCES users(id) ON DELETE CASCADE
-            );
-
-            CREATE TABLE IF NOT EXISTS login_events (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                email TEXT,
-                success INTEGER NOT NULL,
-                ip TEXT,
-                user_agent TEXT,
-                created_at TEXT NOT NULL
-            );
-            """
+        version = int(conn.execute("PRAGMA user_version").fetchone()[0])
+        if version < SCHEMA_VERSION:
+            _migrate_schema(conn, version)
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            conn.commit()
+        if seed:
+            _seed_demo_data(conn)
+            conn.commit()
+    finally:
+        conn.close()
+    _ensure_archive_db()
+    app.config["DB_INIT_MS"] = round((time.perf_counter() - started) * 1000, 3)
+
+
+def _migrate_schema(conn: sqlite3.Connection, from_version: int = 0) -> None:
+    """Create missing tables and apply lightweight column migrations (idempotent)."""
+    # Free pages are given back in bounded steps (see _vacuum_step). Switching an
+    # existing database over takes one full VACUUM, run at the end.
+    needs_vacuum = int(conn.execute("PRAGMA auto_vacuum").fetchone()[0]) != 2
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    # WAL lets the read-only pool run alongside the single writer (persistent).
+    conn.execute("PRAGMA journal_mode=WAL")
+    # v8: integer epoch-ms created_at on the high-volume tables (rebuilt before
+    # the base script below recreates their triggers and indexes)
+    for table in _EPOCH_MS_TABLES:
+        _rebuild_with_epoch_ms(conn, table)
+    # Base schema (idempotent)
+    conn.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            full_name TEXT NOT NULL,
+            email TEXT NOT NULL UNIQUE,
+            password TEXT NOT NULL,
+            age INTEGER,
+            generation TEXT,
+            bio TEXT,
+            match_preferences TEXT,
+            avatar TEXT,
+            is_admin INTEGER NOT NULL DEFAULT 0,
+            is_banned INTEGER NOT NULL DEFAULT 0,
+            show_in_matchup INTEGER NOT NULL DEFAULT 0,
+            suspended_until TEXT,
+            warning_message TEXT,
+            warning_ack INTEGER NOT NULL DEFAULT 1
+        );
+
+        CREATE TABLE IF NOT EXISTS interests (
+            name TEXT PRIMARY KEY
+        );
+
+        CREATE TABLE IF NOT EXISTS user_interests (
+            user_id INTEGER NOT NULL,
+            interest_name TEXT NOT NULL,
+            PRIMARY KEY (user_id, interest_name),
+            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+            FOREIGN KEY (interest_name) REFERENCES interests(name) ON DELETE CASCADE
+        );
+
+        CREATE TABLE IF NOT EXISTS stories (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            title TEXT NOT NULL,
+            category TEXT NOT NULL,
+            content TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'ongoing',
+            created_at TEXT NOT NULL,
+            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+        );
+
+        CREATE TABLE IF NOT EXISTS story_comments (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            story_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            text TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            FOREIGN KEY (story_id) REFERENCES stories(id) ON DELETE CASCADE,
+            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+        );
+
+        CREATE TABLE IF NOT EXISTS skillswap_posts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            post_type TEXT NOT NULL,
+            title TEXT NOT NULL,
+            category TEXT NOT NULL,
+            description TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+        );
+
+        CREATE TABLE IF NOT EXISTS skillswap_comments (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            post_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            text TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            FOREIGN KEY (post_id) REFERENCES skillswap_posts(id) ON DELETE CASCADE,
+            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+        );
+
+        CREATE TABLE IF NOT EXISTS events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            description TEXT,
+            location TEXT,
+            start_date TEXT NOT NULL,
+            start_time TEXT,
+            end_date TEXT,
+            end_time TEXT,
+            link TEXT,
+            created_at TEXT NOT NULL
+        );
+
+        CREATE TABLE IF NOT EXISTS messages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            sender_id INTEGER NOT NULL,
+            recipient_id INTEGER NOT NULL,
+            text TEXT NOT NULL,
+            created_at INTEGER NOT NULL,
+            is_read INTEGER NOT NULL DEFAULT 0,
+            FOREIGN KEY (sender_id) REFERENCES users(id) ON DELETE CASCADE,
+            FOREIGN KEY (recipient_id) REFERENCES users(id) ON DELETE CASCADE
+        );
+
+        CREATE TABLE IF NOT EXISTS notifications (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            notif_type TEXT NOT NULL,
+            icon TEXT NOT NULL,
+            title TEXT NOT NULL,
+            content TEXT NOT NULL,
+            link TEXT,
+            created_at INTEGER NOT NULL,
+            is_read INTEGER NOT NULL DEFAULT 0,
+            group_count INTEGER NOT NULL DEFAULT 1,
+            updated_at INTEGER,
+            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+        );
+
+        CREATE TABLE IF NOT EXISTS notification_digest (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            notif_type TEXT NOT NULL,
+            title TEXT NOT NULL,
+            content TEXT NOT NULL,
+            link TEXT,
+            created_at INTEGER NOT NULL,
+            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+        );
+
+        CREATE TABLE IF NOT EXISTS reports (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            reporter_id INTEGER NOT NULL,
+            target_user_id INTEGER NOT NULL,
+            reason TEXT NOT NULL,
+            details TEXT,
+            status TEXT NOT NULL DEFAULT 'pending',
+            created_at TEXT NOT NULL,
+            content_kind TEXT,
+            content_id INTEGER,
+            FOREIGN KEY (reporter_id) REFERENCES users(id) ON DELETE CASCADE,
+            FOREIGN KEY (target_user_id) REFERENCES users(id) ON DELETE CASCADE
+        );
+
+        CREATE TABLE IF NOT EXISTS login_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            email TEXT,
+            success INTEGER NOT NULL,
+            ip TEXT,
+            user_agent TEXT,
+            created_at INTEGER NOT NULL
+        );
+
+        CREATE TABLE IF NOT EXISTS unread_counters (
+            user_id INTEGER PRIMARY KEY,
+            messages INTEGER NOT NULL DEFAULT 0,
+            notifications INTEGER NOT NULL DEFAULT 0,
+            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+        );
+
+        CREATE TABLE IF NOT EXISTS admin_stats (
+            key TEXT PRIMARY KEY,
+            value INTEGER NOT NULL DEFAULT 0
+        );
+
+        CREATE TABLE IF NOT EXISTS stats_hourly (
+            hour TEXT PRIMARY KEY,
+            logins_ok INTEGER NOT NULL DEFAULT 0,
+            logins_failed INTEGER NOT NULL DEFAULT 0,
+            signups INTEGER NOT NULL DEFAULT 0
+        );
+
+        CREATE TABLE IF NOT EXISTS event_rsvps (
+            user_id INTEGER NOT NULL,
+            event_id INTEGER NOT NULL,
+            created_at TEXT NOT NULL,
+            PRIMARY KEY (user_id, event_id),
+            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+            FOREIGN KEY (event_id) REFERENCES events(id) ON DELETE CASCADE
+        );
+
+        CREATE TABLE IF NOT EXISTS suggestion_cache (
+            context_key TEXT PRIMARY KEY,
+            topics TEXT NOT NULL,
+            expires_at INTEGER NOT NULL
+        );
+
+        CREATE TABLE IF NOT EXISTS gazetteer (
+            place_key TEXT PRIMARY KEY,
+            latitude REAL,
+            longitude REAL,
+            source TEXT NOT NULL,
+            updated_at INTEGER NOT NULL
+        );
+
+        CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            priority INTEGER NOT NULL DEFAULT 0,
+            run_at INTEGER NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            max_attempts INTEGER NOT NULL DEFAULT 5,
+            lease_owner TEXT,
+            last_error TEXT,
+            created_at INTEGER NOT NULL
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_jobs_ready ON jobs(priority DESC, run_at, id);
+
+        CREATE TABLE IF NOT EXISTS purge_tasks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            entity TEXT NOT NULL,
+            entity_id INTEGER NOT NULL,
+            step INTEGER NOT NULL DEFAULT 0,
+            rows_purged INTEGER NOT NULL DEFAULT 0,
+            rows_total INTEGER,
+            requested_at INTEGER NOT NULL,
+            finished_at INTEGER,
+            UNIQUE (entity, entity_id)
+        );
+
+        CREATE TABLE IF NOT EXISTS jobs_dead (
+            id INTEGER PRIMARY KEY,
+            kind TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            priority INTEGER NOT NULL,
+            attempts INTEGER NOT NULL,
+            max_attempts INTEGER NOT NULL DEFAULT 5,
+            last_error TEXT,
+            created_at INTEGER NOT NULL,
+            failed_at INTEGER NOT NULL
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_messages_created_at ON messages(created_at);
+        CREATE INDEX IF NOT EXISTS idx_notifications_created_at ON notifications(created_at);
+        CREATE INDEX IF NOT EXISTS idx_login_events_created_at ON login_events(created_at);
+
+        CREATE TRIGGER IF NOT EXISTS trg_stats_reports_pending_ins AFTER INSERT ON reports
+        WHEN NEW.status='pending' BEGIN
+            UPDATE admin_stats SET value=value+1 WHERE key='reports_pending';
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_stats_reports_pending_upd AFTER UPDATE OF status ON reports
+        WHEN (OLD.status='pending') <> (NEW.status='pending') BEGIN
+            UPDATE admin_stats SET value=value + (CASE WHEN NEW.status='pending' THEN 1 ELSE -1 END)
+            WHERE key='reports_pending';
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_stats_reports_pending_del AFTER DELETE ON reports
+        WHEN OLD.status='pending' BEGIN
+            UPDATE admin_stats SET value=value-1 WHERE key='reports_pending';
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_stats_hourly_login AFTER INSERT ON login_events BEGIN
+            INSERT INTO stats_hourly(hour, logins_ok, logins_failed)
+            VALUES (strftime('%Y-%m-%dT%H','now'), NEW.success<>0, NEW.success=0)
+            ON CONFLICT(hour) DO UPDATE SET
+                logins_ok=logins_ok+excluded.logins_ok,
+                logins_failed=logins_failed+excluded.logins_failed;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_stats_hourly_signup AFTER INSERT ON users BEGIN
+            INSERT INTO stats_hourly(hour, signups) VALUES (strftime('%Y-%m-%dT%H','now'), 1)
+            ON CONFLICT(hour) DO UPDATE SET signups=signups+1;
+        END;
+        """
+    )
+
+    # Materialized row counts for the admin overview (triggers fire on cascades too)
+    for table in _STAT_TABLES:
+        conn.execute(
+            f"CREATE TRIGGER IF NOT EXISTS trg_stats_{table}_ins AFTER INSERT ON {table} BEGIN "
+            f"UPDATE admin_stats SET value=value+1 WHERE key='{table}'; END"
+        )
+        conn.execute(
+            f"CREATE TRIGGER IF NOT EXISTS trg_stats_{table}_del AFTER DELETE ON {table} BEGIN "
+            f"UPDATE admin_stats SET value=value-1 WHERE key='{table}'; END"
         )
 
-        # Lightweight migrations for older DB files
-        # NOTE: If you add a column, refresh the pragma list before checking again,
-        # otherwise duplicate ALTERs can crash startup.
+    # Lightweight migrations for older DB files
+    # NOTE: If you add a column, refresh the pragma list before checking again,
+    # otherwise duplicate ALTERs can crash startup.
+    cols = [r["name"] for r in conn.execute("PRAGMA table_info(users)").fetchall()]
+    if "is_banned" not in cols:
+        conn.execute("ALTER TABLE users ADD COLUMN is_banned INTEGER NOT NULL DEFAULT 0")
+        cols = [r["name"] for r in conn.execute("PRAGMA table_info(users)").fetchall()]
+    if "show_in_matchup" not in cols:
+        conn.execute("ALTER TABLE users ADD COLUMN show_in_matchup INTEGER NOT NULL DEFAULT 0")
         cols = [r["name"] for r in conn.execute("PRAGMA table_info(users)").fetchall()]
-        if "is_banned" not in cols:
-            conn.execute("ALTER TABLE users ADD COLUMN is_banned INTEGER NOT NULL DEFAULT 0")
-            cols = [r["name"] for r in conn.execute("PRAGMA table_info(users)").fetchall()]
-        if "show_in_matchup" not in cols:
-            conn.execute("ALTER TABLE users ADD COLUMN show_in_matchup INTEGER NOT NULL DEFAULT 0")
-            cols = [r["name"] for r in conn.execute("PRAGMA table_info(users)").fetchall()]
-
-        # Moderation gating
-        if "suspended_until" not in cols:
-            conn.execute("ALTER TABLE users ADD COLUMN suspended_until TEXT")
-            cols = [r["name"] for r in conn.execute("PRAGMA table_info(users)").fetchall()]
-        if "warning_message" not in cols:
-            conn.execute("ALTER TABLE users ADD COLUMN warning_message TEXT")
-            cols = [r["name"] for r in conn.execute("PRAGMA table_info(users)").fetchall()]
-        if "warning_ack" not in cols:
-            conn.execute("ALTER TABLE users ADD COLUMN warning_ack INTEGER NOT NULL DEFAULT 1")
-
-        # Migration: Add latitude and longitude columns to events table
-        event_cols = [r["name"] for r in conn.execute("PRAGMA table_info(events)").fetchall()]
-        if "latitude" not in event_cols:
-            conn.execute("ALTER TABLE events ADD COLUMN latitude REAL")
-            event_cols = [r["name"] for r in conn.execute("PRAGMA table_info(events)").fetchall()]
-        if "longitude" not in event_cols:
-            conn.execute("ALTER TABLE events ADD COLUMN longitude REAL")
-
-        # Seed baseline interests
-        base_interests = [
-            "tech", "art", "music", "cooking", "reading", "sports", "gaming", "practical",
-            "cultural", "religious", "technical", "creative"
-        ]
-        for name in base_interests:
-            conn.execute("INSERT OR IGNORE INTO interests(name) VALUES (?)", (name,))
 
-        # Enforce single admin credential
-        ADMIN_EMAIL = "admin@generationbridge.com"
-        ADMIN_PASSWORD = "admin123"
-
-        # Upsert admin + baseline users + required demo users
-        seeds = [
-            # Admin (only one)
-            ("Admin", ADMIN_EMAIL, ADMIN_PASSWORD, 30, "Gen Y", "Platform admin", "", "🛡️", 1),
-
-            # Required demo users for testing
-            ("Eleanor Martinez", "eleanor.martinez@generationbridge.com", "123456", 54, "Baby Boomer",
-             "Enjoys sharing life experience and learning new tech.", "Looking for friendly chats.", "👩‍🦳", 0),
-            ("David Miller", "david.miller@generationbridge.com", "123456", 34, "Gen Y",
-             "Curious about culture and mentoring.", "Prefer weekend meetups.", "👨‍💼", 0),
-            ("Robert Thompson", "robert.thompson@generationbridge.com", "123456", 61, "Baby Boomer",
-             "Retired engineer open to mentoring and learning.", "Looking for practical exchanges.", "👴", 0),
-            ("Sophie Johnson", "sophie.johnson@generationbridge.com", "123456", 22, "Gen Z",
-             "Student who loves creative projects and learning.", "Prefer quick sessions.", "👩‍🎓", 0),
-
-            # Extra users to ensure Match-Up always has matches
-            ("Alice Tan", "alice@example.com", "123456", 21, "Gen Z", "Hi, I'm Alice.", "", "😊", 0),
-            ("Mr Lim", "mr_lim@example.com", "123456", 52, "Gen X", "Happy to mentor.", "", "👨‍🏫", 0),
-            ("Mei Chen", "mei.chen@example.com", "123456", 29, "Gen Y", "Enjoys cooking and culture.", "", "👩‍🍳", 0),
-            ("Jason Ng", "jason.ng@example.com", "123456", 45, "Gen X", "DIY and practical skills enthusiast.", "", "🧰", 0),
-        ]
+    # Moderation gating
+    if "suspended_until" not in cols:
+        conn.execute("ALTER TABLE users ADD COLUMN suspended_until TEXT")
+        cols = [r["name"] for r in conn.execute("PRAGMA table_info(users)").fetchall()]
+    if "warning_message" not in cols:
+        conn.execute("ALTER TABLE users ADD COLUMN warning_message TEXT")
+        cols = [r["name"] for r in conn.execute("PRAGMA table_info(users)").fetchall()]
+    if "warning_ack" not in cols:
+        conn.execute("ALTER TABLE users ADD COLUMN warning_ack INTEGER NOT NULL DEFAULT 1")
 
-        for full_name, email, password, age, gen, bio, mp, avatar, is_admin in seeds:
+    # Migration: Add latitude and longitude columns to events table
+    event_cols = [r["name"] for r in conn.execute("PRAGMA table_info(events)").fetchall()]
+    if "latitude" not in event_cols:
+        conn.execute("ALTER TABLE events ADD COLUMN latitude REAL")
+        event_cols = [r["name"] for r in conn.execute("PRAGMA table_info(events)").fetchall()]
+    if "longitude" not in event_cols:
+        conn.execute("ALTER TABLE events ADD COLUMN longitude REAL")
+
+    # v7: normalized event instants for indexed range queries (see _event_instants)
+    if "starts_at" not in event_cols:
+        conn.execute("ALTER TABLE events ADD COLUMN starts_at INTEGER")
+        conn.execute("ALTER TABLE events ADD COLUMN ends_at INTEGER")
+    conn.executescript(
+        """
+        CREATE INDEX IF NOT EXISTS idx_events_starts_at ON events(starts_at, id);
+        CREATE INDEX IF NOT EXISTS idx_events_span ON events(ends_at - starts_at);
+        """
+    )
+    if from_version < 7:
+        for r in conn.execute("SELECT id, start_date, start_time, end_date, end_time FROM events").fetchall():
             conn.execute(
-                """
-                INSERT OR IGNORE INTO users(full_name,email,password,age,generation,bio,match_preferences,avatar,is_admin,is_banned)
-                VALUES (?,?,?,?,?,?,?,?,?,0)
-                """,
-                (full_name, email, password, age, gen, bio, mp, avatar, is_admin),
+                "UPDATE events SET starts_at=?, ends_at=? WHERE id=?",
+                (*_event_instants(r["start_date"], r["start_time"], r["end_date"], r["end_time"]), r["id"]),
             )
 
-        # Make absolutely sure only ADMIN_EMAIL is admin
-        conn.execute("UPDATE users SET is_admin=0")
-        conn.execute("UPDATE users SET is_admin=1, password=? WHERE email=?", (ADMIN_PASSWORD, ADMIN_EMAIL))
+    # v11: batch geocoding picks events without coordinates off a partial index
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_events_missing_coords ON events(id) WHERE latitude IS NULL")
+
+    # v9: notification coalescing (see notify()); archive partitions get the columns too
+    notif_cols = [r["name"] for r in conn.execute("PRAGMA table_info(notifications)").fetchall()]
+    if "group_count" not in notif_cols:
+        conn.execute("ALTER TABLE notifications ADD COLUMN group_count INTEGER NOT NULL DEFAULT 1")
+        conn.execute("ALTER TABLE notifications ADD COLUMN updated_at INTEGER")
+    for name in _archive_partitions(conn, "notifications"):
+        part_cols = [r["name"] for r in conn.execute(f"PRAGMA archive.table_info({name})").fetchall()]
+        if "group_count" not in part_cols:
+            conn.execute(f"ALTER TABLE archive.{name} ADD COLUMN group_count INTEGER NOT NULL DEFAULT 1")
+            conn.execute(f"ALTER TABLE archive.{name} ADD COLUMN updated_at INTEGER")
+    conn.executescript(
+        """
+        CREATE INDEX IF NOT EXISTS idx_notifications_coalesce ON notifications(user_id, notif_type, link);
+        CREATE INDEX IF NOT EXISTS idx_notification_digest_user ON notification_digest(user_id, id);
+        """
+    )
+
+    # v10: automatic moderation reports point at the flagged item (one report per item)
+    report_cols = [r["name"] for r in conn.execute("PRAGMA table_info(reports)").fetchall()]
+    if "content_kind" not in report_cols:
+        conn.execute("ALTER TABLE reports ADD COLUMN content_kind TEXT")
+        conn.execute("ALTER TABLE reports ADD COLUMN content_id INTEGER")
+    conn.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_reports_content ON reports(content_kind, content_id) "
+        "WHERE content_kind IS NOT NULL"
+    )
+
+    # v13: soft delete (tombstones purged by purge_pending()); the purge walks the
+    # foreign-key columns, which had no indexes, so cascades scanned whole tables
+    for table in ("users", "stories", "skillswap_posts"):
+        table_cols = [r["name"] for r in conn.execute(f"PRAGMA table_info({table})").fetchall()]
+        if "deleted_at" not in table_cols:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN deleted_at INTEGER")
+    conn.executescript(
+        """
+        CREATE INDEX IF NOT EXISTS idx_users_tombstoned ON users(id) WHERE deleted_at IS NOT NULL;
+        CREATE INDEX IF NOT EXISTS idx_stories_user ON stories(user_id);
+        CREATE INDEX IF NOT EXISTS idx_story_comments_story ON story_comments(story_id);
+        CREATE INDEX IF NOT EXISTS idx_story_comments_user ON story_comments(user_id);
+        CREATE INDEX IF NOT EXISTS idx_skillswap_posts_user ON skillswap_posts(user_id);
+        CREATE INDEX IF NOT EXISTS idx_skillswap_comments_post ON skillswap_comments(post_id);
+        CREATE INDEX IF NOT EXISTS idx_skillswap_comments_user ON skillswap_comments(user_id);
+        CREATE INDEX IF NOT EXISTS idx_messages_sender ON messages(sender_id);
+        CREATE INDEX IF NOT EXISTS idx_messages_recipient ON messages(recipient_id);
+        CREATE INDEX IF NOT EXISTS idx_reports_reporter ON reports(reporter_id);
+        CREATE INDEX IF NOT EXISTS idx_reports_target ON reports(target_user_id);
+        """
+    )
+
+    # v14: system accounts (the auto-moderation reporter) are hidden from user
+    # lists and kept out of the user / signup stats
+    user_cols = [r["name"] for r in conn.execute("PRAGMA table_info(users)").fetchall()]
+    if "is_system" not in user_cols:
+        conn.execute("ALTER TABLE users ADD COLUMN is_system INTEGER NOT NULL DEFAULT 0")
+    conn.executescript(
+        """
+        DROP TRIGGER IF EXISTS trg_stats_users_ins;
+        DROP TRIGGER IF EXISTS trg_stats_users_del;
+        DROP TRIGGER IF EXISTS trg_stats_hourly_signup;
+        CREATE TRIGGER trg_stats_users_ins AFTER INSERT ON users WHEN NEW.is_system=0 BEGIN
+            UPDATE admin_stats SET value=value+1 WHERE key='users';
+        END;
+        CREATE TRIGGER trg_stats_users_del AFTER DELETE ON users WHEN OLD.is_system=0 BEGIN
+            UPDATE admin_stats SET value=value-1 WHERE key='users';
+        END;
+        CREATE TRIGGER trg_stats_hourly_signup AFTER INSERT ON users WHEN NEW.is_system=0 BEGIN
+            INSERT INTO stats_hourly(hour, signups) VALUES (strftime('%Y-%m-%dT%H','now'), 1)
+            ON CONFLICT(hour) DO UPDATE SET signups=signups+1;
+        END;
+        """
+    )
+    if from_version < 14:
+        conn.execute("UPDATE users SET is_system=1 WHERE email=?", (SYSTEM_REPORTER_EMAIL,))
+        conn.execute(
+            "INSERT OR REPLACE INTO admin_stats(key, value) SELECT 'users', COUNT(*) FROM users WHERE is_system=0"
+        )
+
+    # v15: dead-lettered jobs keep their attempt budget, so retry_dead_job() restores it
+    dead_cols = [r["name"] for r in conn.execute("PRAGMA table_info(jobs_dead)").fetchall()]
+    if "max_attempts" not in dead_cols:
+        conn.execute("ALTER TABLE jobs_dead ADD COLUMN max_attempts INTEGER NOT NULL DEFAULT 5")
+
+    # v5: denormalized comment counters (kept by the triggers below)
+    for table in ("stories", "skillswap_posts"):
+        table_cols = [r["name"] for r in conn.execute(f"PRAGMA table_info({table})").fetchall()]
+        if "comments_count" not in table_cols:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN comments_count INTEGER NOT NULL DEFAULT 0")
+    conn.executescript(
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_story_comments_count_ins AFTER INSERT ON story_comments BEGIN
+            UPDATE stories SET comments_count=comments_count+1 WHERE id=NEW.story_id;
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_story_comments_count_del AFTER DELETE ON story_comments BEGIN
+            UPDATE stories SET comments_count=comments_count-1 WHERE id=OLD.story_id;
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_skillswap_comments_count_ins AFTER INSERT ON skillswap_comments BEGIN
+            UPDATE skillswap_posts SET comments_count=comments_count+1 WHERE id=NEW.post_id;
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_skillswap_comments_count_del AFTER DELETE ON skillswap_comments BEGIN
+            UPDATE skillswap_posts SET comments_count=comments_count-1 WHERE id=OLD.post_id;
+        END;
+        """
+    )
+    if from_version < 5:
+        conn.execute(
+            "UPDATE stories SET comments_count=(SELECT COUNT(*) FROM story_comments c WHERE c.story_id=stories.id)"
+        )
+        conn.execute(
+            "UPDATE skillswap_posts SET comments_count="
+            "(SELECT COUNT(*) FROM skillswap_comments c WHERE c.post_id=skillswap_posts.id)"
+        )
+        conn.execute(
+            "INSERT OR REPLACE INTO admin_stats(key, value) SELECT 'skillswap_comments', COUNT(*) FROM skillswap_comments"
+        )
 
-        # Ensure required demo users appear in Match-Up by default
+    # v3: unread badge counters, backfilled once from the hot tables
+    if from_version < 3:
         conn.execute(
             """
-            UPDATE users
-            SET show_in_matchup=1
-            WHERE email IN (?,?,?,?)
-            """,
-            (
-                "eleanor.martinez@generationbridge.com",
-                "david.miller@generationbridge.com",
-                "robert.thompson@generationbridge.com",
-                "sophie.johnson@generationbridge.com",
-            ),
+            INSERT OR REPLACE INTO unread_counters(user_id, messages, notifications)
+            SELECT u.id,
+                   (SELECT COUNT(*) FROM messages m WHERE m.recipient_id=u.id AND m.is_read=0),
+                   (SELECT COUNT(*) FROM notifications n WHERE n.user_id=u.id AND n.is_read=0)
+            FROM users u
+            """
         )
 
-        # Seed interests per user (lightweight for matching)
-        email_to_interests = {
-            ADMIN_EMAIL: ["practical"],
-            "eleanor.martinez@generationbridge.com": ["cultural", "reading", "practical"],
-            "david.miller@generationbridge.com": ["cultural", "technical", "reading"],
-            "robert.thompson@generationbridge.com": ["technical", "practical", "reading"],
-            "sophie.johnson@generationbridge.com": ["creative", "tech", "music"],
-            "alice@example.com": ["tech", "creative", "gaming"],
-            "mr_lim@example.com": ["practical", "technical", "reading"],
-            "mei.chen@example.com": ["cooking", "cultural", "music"],
-            "jason.ng@example.com": ["practical", "sports", "technical"],
-        }
-        email_to_id = {r["email"]: r["id"] for r in conn.execute("SELECT id,email FROM users").fetchall()}
-        for email, ints in email_to_interests.items():
-            uid = email_to_id.get(email)
-            if not uid:
-                continue
-            conn.execute("DELETE FROM user_interests WHERE user_id=?", (int(uid),))
-            for name in ints:
-                conn.execute("INSERT OR IGNORE INTO interests(name) VALUES (?)", (name,))
-                conn.execute(
-                    "INSERT OR IGNORE INTO user_interests(user_id,interest_name) VALUES (?,?)",
-                    (int(uid), name),
-                )
+    # v4: admin overview stats, backfilled once
+    if from_version < 4:
+        for table in _STAT_TABLES:
+            conn.execute(
+                f"INSERT OR REPLACE INTO admin_stats(key, value) SELECT '{table}', COUNT(*) FROM {table}"
+            )
+        conn.execute(
+            "INSERT OR REPLACE INTO admin_stats(key, value) "
+            "SELECT 'reports_pending', COUNT(*) FROM reports WHERE status='pending'"
+        )
+        conn.execute(
+            """
+            INSERT OR REPLACE INTO stats_hourly(hour, logins_ok, logins_failed, signups)
+            SELECT strftime('%Y-%m-%dT%H', created_at / 1000, 'unixepoch'), SUM(success<>0), SUM(success=0), 0
+            FROM login_events GROUP BY 1
+            """
+        )
 
-        # Seed sample stories and comments (categories restricted to 4)
-        allowed_story_categories = {"daytoday", "tradition", "career", "untagged"}
-        story_count = conn.execute("SELECT COUNT(*) FROM stories").fetchone()[0]
-        if story_count == 0:
-            def _ins_story(email: str, title: str, category: str, content: str, status: str):
-                uid = email_to_id.get(email) or 1
-                cat = category if category in allowed_story_categories else "untagged"
-                conn.execute(
-                    "INSERT INTO stories(user_id,title,category,content,status,created_at) VALUES (?,?,?,?,?,?)",
-                    (int(uid), title, cat, content, status, utcnow_iso()),
-                )
+    if needs_vacuum and conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' LIMIT 1").fetchone():
+        conn.commit()
+        conn.execute("VACUUM")
+
+
+# Tables whose created_at is INTEGER epoch ms (v8); converted with ms_to_iso() on the way out.
+_EPOCH_MS_TABLES = ("messages", "notifications", "login_events")
+
+
+def _rebuild_with_epoch_ms(conn: sqlite3.Connection, table: str) -> None:
+    """Copy a pre-v8 table into one with INTEGER created_at (SQLite can't retype a column)."""
+    info = conn.execute(f"PRAGMA table_info({table})").fetchall()
+    created = [r for r in info if r["name"] == "created_at"]
+    if not created or created[0]["type"].upper() == "INTEGER":
+        return
+    sql = conn.execute("SELECT sql FROM sqlite_master WHERE type='table' AND name=?", (table,)).fetchone()[0]
+    sql = re.sub(r"^CREATE TABLE\s+\"?\w+\"?", f"CREATE TABLE {table}__v8", sql, count=1)
+    sql = re.sub(r"\bcreated_at\s+TEXT\b", "created_at INTEGER", sql, count=1)
+    names = [r["name"] for r in info]
+    select = ", ".join(
+        "CAST(ROUND((julianday(created_at) - 2440587.5) * 86400000) AS INTEGER)" if n == "created_at" else n
+        for n in names
+    )
+    # Keep the AUTOINCREMENT high-water mark: archived rows still own the older ids.
+    seq = conn.execute("SELECT seq FROM sqlite_sequence WHERE name=?", (table,)).fetchone()
+    conn.execute(sql)
+    conn.execute(f"INSERT INTO {table}__v8 ({', '.join(names)}) SELECT {select} FROM {table}")
+    conn.execute(f"DROP TABLE {table}")
+    conn.execute(f"ALTER TABLE {table}__v8 RENAME TO {table}")
+    if seq is not None:
+        conn.execute("DELETE FROM sqlite_sequence WHERE name=?", (table,))
+        conn.execute("INSERT INTO sqlite_sequence(name, seq) VALUES (?, ?)", (table, int(seq[0])))
+
+
+def _ensure_archive_db() -> None:
+    """Create the archive database (partition registry only) if it is missing."""
+    path = _db.archive_path
+    if not path or os.path.exists(path):
+        return
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS archive_partitions (
+                table_name TEXT PRIMARY KEY,
+                base_table TEXT NOT NULL,
+                month TEXT NOT NULL,
+                row_count INTEGER NOT NULL DEFAULT 0
+            )
+            """
+        )
+        conn.commit()
+    finally:
+        conn.close()
 
-            _ins_story("sophie.johnson@generationbridge.com",
-                       "Balancing school and part-time work",
-                       "daytoday",
-                       "I am struggling to balance classes, assignments, and a part-time job. Any tips from someone who has been through this?",
-                       "ongoing")
-            _ins_story("robert.thompson@generationbridge.com",
-                       "Career change after 50",
-                       "career",
-                       "I would like to share my experience switching careers later in life and hear others' perspectives on staying relevant.",
-                       "ongoing")
-            _ins_story("eleanor.martinez@generationbridge.com",
-                       "Keeping traditions alive in a modern family",
-                       "tradition",
-                       "How do you keep family traditions meaningful when everyone is busy and lives far apart?",
-                       "resolved")
-            _ins_story("david.miller@generationbridge.com",
-                       "Finding community in a new city",
-                       "untagged",
-                       "Recently moved and finding it hard to build a social circle. What worked for you?",
-                       "ongoing")
-
-        # Normalize any existing stories to allowed categories
+
+def _seed_demo_data(conn: sqlite3.Connection) -> None:
+    """Upsert the admin/demo accounts and sample content (opt-in, see init_db)."""
+    # Seed baseline interests
+    base_interests = [
+        "tech", "art", "music", "cooking", "reading", "sports", "gaming", "practical",
+        "cultural", "religious", "technical", "creative"
+    ]
+    for name in base_interests:
+        conn.execute("INSERT OR IGNORE INTO interests(name) VALUES (?)", (name,))
+
+    # Enforce single admin credential
+    ADMIN_EMAIL = "admin@generationbridge.com"
+    ADMIN_PASSWORD = "admin123"
+
+    # Upsert admin + baseline users + required demo users
+    seeds = [
+        # Admin (only one)
+        ("Admin", ADMIN_EMAIL, ADMIN_PASSWORD, 30, "Gen Y", "Platform admin", "", "🛡️", 1),
+
+        # Required demo users for testing
+        ("Eleanor Martinez", "eleanor.martinez@generationbridge.com", "123456", 54, "Baby Boomer",
+         "Enjoys sharing life experience and learning new tech.", "Looking for friendly chats.", "👩‍🦳", 0),
+        ("David Miller", "david.miller@generationbridge.com", "123456", 34, "Gen Y",
+         "Curious about culture and mentoring.", "Prefer weekend meetups.", "👨‍💼", 0),
+        ("Robert Thompson", "robert.thompson@generationbridge.com", "123456", 61, "Baby Boomer",
+         "Retired engineer open to mentoring and learning.", "Looking for practical exchanges.", "👴", 0),
+        ("Sophie Johnson", "sophie.johnson@generationbridge.com", "123456", 22, "Gen Z",
+         "Student who loves creative projects and learning.", "Prefer quick sessions.", "👩‍🎓", 0),
+
+        # Extra users to ensure Match-Up always has matches
+        ("Alice Tan", "alice@example.com", "123456", 21, "Gen Z", "Hi, I'm Alice.", "", "😊", 0),
+        ("Mr Lim", "mr_lim@example.com", "123456", 52, "Gen X", "Happy to mentor.", "", "👨‍🏫", 0),
+        ("Mei Chen", "mei.chen@example.com", "123456", 29, "Gen Y", "Enjoys cooking and culture.", "", "👩‍🍳", 0),
+        ("Jason Ng", "jason.ng@example.com", "123456", 45, "Gen X", "DIY and practical skills enthusiast.", "", "🧰", 0),
+    ]
+
+    for full_name, email, password, age, gen, bio, mp, avatar, is_admin in seeds:
         conn.execute(
-            "UPDATE stories SET category='untagged' WHERE lower(category) NOT IN ('daytoday','tradition','career','untagged')"
+            """
+            INSERT OR IGNORE INTO users(full_name,email,password,age,generation,bio,match_preferences,avatar,is_admin,is_banned)
+            VALUES (?,?,?,?,?,?,?,?,?,0)
+            """,
+            (full_name, email, password, age, gen, bio, mp, avatar, is_admin),
         )
 
-        # Seed comments if none exist
-        comment_count = conn.execute("SELECT COUNT(*) FROM story_comments").fetchone()[0]
-        if comment_count == 0:
-            # Add a few comments to the most recent stories
-            story_rows = conn.execute("SELECT id,user_id FROM stories ORDER BY id DESC LIMIT 3").fetchall()
-            for sr in story_rows:
-                sid = sr["id"]
-                # Commenters: Alice and Mr Lim if available
-                for commenter_email, text in [
-                    ("alice@example.com", "I relate to this. One thing that helped me was planning my week in blocks."),
-                    ("mr_lim@example.com", "Try small consistent steps—habit building is more sustainable than big changes."),
-                ]:
-                    uid = email_to_id.get(commenter_email)
-                    if not uid:
-                        continue
-                    conn.execute(
-                        "INSERT INTO story_comments(story_id,user_id,text,created_at) VALUES (?,?,?,?)",
-                        (int(sid), int(uid), text, utcnow_iso()),
-                    )
-
-        # Seed skillswap posts if empty (use categories present in filter bar)
-        skill_count = conn.execute("SELECT COUNT(*) FROM skillswap_posts").fetchone()[0]
-        if skill_count == 0:
-            def _ins_skill(email: str, post_type: str, title: str, category: str, desc: str):
-                uid = email_to_id.get(email) or 1
-                conn.execute(
-                    "INSERT INTO skillswap_posts(user_id,post_type,title,category,description,created_at) VALUES (?,?,?,?,?,?)",
-                    (int(uid), post_type, title, category, desc, utcnow_iso()),
-                )
+    # Make absolutely sure only ADMIN_EMAIL is admin
+    conn.execute("UPDATE users SET is_admin=0")
+    conn.execute("UPDATE users SET is_admin=1, password=? WHERE email=?", (ADMIN_PASSWORD, ADMIN_EMAIL))
+
+    # Ensure required demo users appear in Match-Up by default
+    conn.execute(
+        """
+        UPDATE users
+        SET show_in_matchup=1
+        WHERE email IN (?,?,?,?)
+        """,
+        (
+            "eleanor.martinez@generationbridge.com",
+            "david.miller@generationbridge.com",
+            "robert.thompson@generationbridge.com",
+            "sophie.johnson@generationbridge.com",
+        ),
+    )
+
+    # Seed interests per user (lightweight for matching)
+    email_to_interests = {
+        ADMIN_EMAIL: ["practical"],
+        "eleanor.martinez@generationbridge.com": ["cultural", "reading", "practical"],
+        "david.miller@generationbridge.com": ["cultural", "technical", "reading"],
+        "robert.thompson@generationbridge.com": ["technical", "practical", "reading"],
+        "sophie.johnson@generationbridge.com": ["creative", "tech", "music"],
+        "alice@example.com": ["tech", "creative", "gaming"],
+        "mr_lim@example.com": ["practical", "technical", "reading"],
+        "mei.chen@example.com": ["cooking", "cultural", "music"],
+        "jason.ng@example.com": ["practical", "sports", "technical"],
+    }
+    email_to_id = {r["email"]: r["id"] for r in conn.execute("SELECT id,email FROM users").fetchall()}
+    for email, ints in email_to_interests.items():
+        uid = email_to_id.get(email)
+        if not uid:
+            continue
+        conn.execute("DELETE FROM user_interests WHERE user_id=?", (int(uid),))
+        for name in ints:
+            conn.execute("INSERT OR IGNORE INTO interests(name) VALUES (?)", (name,))
+            conn.execute(
+                "INSERT OR IGNORE INTO user_interests(user_id,interest_name) VALUES (?,?)",
+                (int(uid), name),
+            )
+
+    # Seed sample stories and comments (categories restricted to 4)
+    allowed_story_categories = {"daytoday", "tradition", "career", "untagged"}
+    story_count = conn.execute("SELECT COUNT(*) FROM stories").fetchone()[0]
+    if story_count == 0:
+        def _ins_story(email: str, title: str, category: str, content: str, status: str):
+            uid = email_to_id.get(email) or 1
+            cat = category if category in allowed_story_categories else "untagged"
+            conn.execute(
+                "INSERT INTO stories(user_id,title,category,content,status,created_at) VALUES (?,?,?,?,?,?)",
+                (int(uid), title, cat, content, status, utcnow_iso()),
+            )
 
-            _ins_skill("robert.thompson@generationbridge.com", "offer", "Excel Basics for Budgeting", "practical",
-                       "I can teach formulas, pivot tables, and simple budgets. Availability: Weeknights 8–10pm.")
-            _ins_skill("sophie.johnson@generationbridge.com", "offer", "Intro to Video Editing (Mobile)", "creative",
-                       "Learn quick edits for short-form videos. Availability: Weekends 2–6pm.")
-            _ins_skill("eleanor.martinez@generationbridge.com", "offer", "Traditional Family Recipes", "cultural",
-                       "Cooking session sharing classic family recipes. Availability: Saturday mornings.")
-            _ins_skill("david.miller@generationbridge.com", "request", "Public Speaking Practice", "practical",
-                       "Seeking coaching for confident presentations. Prefer 30-minute sessions.")
-            _ins_skill("alice@example.com", "request", "Basic Networking / LinkedIn Tips", "technical",
-                       "Need help improving my profile and networking approach.")
-            _ins_skill("mr_lim@example.com", "offer", "Interview Preparation Mentoring", "technical",
-                       "Mock interviews and resume feedback. Availability: Tue/Thu 7–9pm.")
-
-        # ---- Seed sample events (from OnePA + SAFRA) ----
-        event_count = conn.execute("SELECT COUNT(*) FROM events").fetchone()[0]
-        if event_count == 0:
-            def _ins_event(title, desc, loc, sd, st="", ed="", et="", link="", lat=None, lng=None):
+        _ins_story("sophie.johnson@generationbridge.com",
+                   "Balancing school and part-time work",
+                   "daytoday",
+                   "I am struggling to balance classes, assignments, and a part-time job. Any tips from someone who has been through this?",
+                   "ongoing")
+        _ins_story("robert.thompson@generationbridge.com",
+                   "Career change after 50",
+                   "career",
+                   "I would like to share my experience switching careers later in life and hear others' perspectives on staying relevant.",
+                   "ongoing")
+        _ins_story("eleanor.martinez@generationbridge.com",
+                   "Keeping traditions alive in a modern family",
+                   "tradition",
+                   "How do you keep family traditions meaningful when everyone is busy and lives far apart?",
+                   "resolved")
+        _ins_story("david.miller@generationbridge.com",
+                   "Finding community in a new city",
+                   "untagged",
+                   "Recently moved and finding it hard to build a social circle. What worked for you?",
+                   "ongoing")
+
+    # Normalize any existing stories to allowed categories
+    conn.execute(
+        "UPDATE stories SET category='untagged' WHERE lower(category) NOT IN ('daytoday','tradition','career','untagged')"
+    )
+
+    # Seed comments if none exist
+    comment_count = conn.execute("SELECT COUNT(*) FROM story_comments").fetchone()[0]
+    if comment_count == 0:
+        # Add a few comments to the most recent stories
+        story_rows = conn.execute("SELECT id,user_id FROM stories ORDER BY id DESC LIMIT 3").fetchall()
+        for sr in story_rows:
+            sid = sr["id"]
+            # Commenters: Alice and Mr Lim if available
+            for commenter_email, text in [
+                ("alice@example.com", "I relate to this. One thing that helped me was planning my week in blocks."),
+                ("mr_lim@example.com", "Try small consistent steps—habit building is more sustainable than big changes."),
+            ]:
+                uid = email_to_id.get(commenter_email)
+                if not uid:
+                    continue
                 conn.execute(
-                    """
-                    INSERT INTO events
-                    (title, description, location, start_date, start_time, end_date, end_time, link, latitude, longitude, created_at)
-                    VALUES (?,?,?,?,?,?,?,?,?,?,?)
-                    """,
-                    (title, desc, loc, sd, st, ed, et, link, lat, lng, utcnow_iso())
+                    "INSERT INTO story_comments(story_id,user_id,text,created_at) VALUES (?,?,?,?)",
+                    (int(sid), int(uid), text, utcnow_iso()),
                 )
-            # 1) Punggol Meadows RC Line Dance Interest Group
-            _ins_event(
-                "Punggol Meadows RC Line Dance Interest Group",
-                "Community line dance interest group session organised by Punggol Meadows RC.",
-                "Punggol Meadows Community Centre, Singapore",
-                "2026-05-01",
-                "",
-                "",
-                "",
-                "https://www.onepa.gov.sg/events/punggol-meadows-rc-line-dance-interest-group-64220439"
-            )
-            # 2) Jurong Spring CACC Giant Delight 2025
-            _ins_event(
-                "Jurong Spring CACC Giant Delight 2025",
-                "Community celebration and family activity event by Jurong Spring CACC.",
-                "Jurong Spring, Singapore",
-                "2025-06-25",
-                "",
-                "",
-                "",
-                "https://www.onepa.gov.sg/events/jurong-spring-cacc-giant-delight-2025-62571032"
-            )
-            # 3) SAFRA – What's New in February 2026 (Event Listing)
-            _ins_event(
-                "SAFRA – What's New in February 2026",
-                "Official SAFRA listing of February 2026 events including Total Defence 2026, Lunar New Year celebrations, and Buddies Day Out.",
-                "Multiple SAFRA Clubs, Singapore",
-                "2026-02-01",
-                "",
-                "",
-                "",
-                "https://www.safra.sg/nsman-magazine/things-to-do/Things-to-do/2026/02/04/whats-new-in-february-2026"
-            )
-            # 4) Community Connectors – Bendemeer Senior Befriending (with coordinates)
-            _ins_event(
-                "Community Connectors – Bendemeer Senior Befriending",
-                "Youth volunteers engage seniors through conversations, community activities, and social support.",
-                "Lion Befrienders Active Ageing Centre, Bendemeer, Singapore",
-                "2026-03-01",
-                "14:00",
-                "",
-                "",
-                "https://www.volunteer.gov.sg/volunteer/opportunity/details/?id=dfbd8f85-98ba-ee11-ac5f-0aec74081c56",
-                1.3216,
-                103.8622
-            )
 
-            # 5) Joyful Connections – SGH Hospital Senior Companionship (with coordinates)
-            _ins_event(
-                "Joyful Connections – SGH Senior Companionship",
-                "Hospital-based befriending programme where youth volunteers engage elderly patients through games and conversation.",
-                "Singapore General Hospital, Singapore",
-                "2026-03-18",
-                "10:00",
-                "",
-                "",
-                "https://www.volunteer.gov.sg/volunteer/opportunity/details/?id=5cce7e81-93c3-f011-ac7e-027d80ecb760",
-                1.2789,
-                103.8345
+    # Seed skillswap posts if empty (use categories present in filter bar)
+    skill_count = conn.execute("SELECT COUNT(*) FROM skillswap_posts").fetchone()[0]
+    if skill_count == 0:
+        def _ins_skill(email: str, post_type: str, title: str, category: str, desc: str):
+            uid = email_to_id.get(email) or 1
+            conn.execute(
+                "INSERT INTO skillswap_posts(user_id,post_type,title,category,description,created_at) VALUES (?,?,?,?,?,?)",
+                (int(uid), post_type, title, category, desc, utcnow_iso()),
             )
 
-            # 6) Le Celebake – Youth & Seniors Intergenerational Baking (with coordinates)
-            _ins_event(
-                "Le Celebake – Youth & Seniors Intergenerational Baking",
-                "Youth and seniors come together for baking workshops and bonding sessions.",
-                "Jalan Kukoh, Singapore",
-                "2026-03-08",
-                "10:00",
-                "",
-                "",
-                "https://www.volunteer.gov.sg/volunteer/opportunity/details/?id=1e1ed635-f2cf-ee11-ac5e-027d80ecb760",
-                1.2867,
-                103.8397
+        _ins_skill("robert.thompson@generationbridge.com", "offer", "Excel Basics for Budgeting", "practical",
+                   "I can teach formulas, pivot tables, and simple budgets. Availability: Weeknights 8–10pm.")
+        _ins_skill("sophie.johnson@generationbridge.com", "offer", "Intro to Video Editing (Mobile)", "creative",
+                   "Learn quick edits for short-form videos. Availability: Weekends 2–6pm.")
+        _ins_skill("eleanor.martinez@generationbridge.com", "offer", "Traditional Family Recipes", "cultural",
+                   "Cooking session sharing classic family recipes. Availability: Saturday mornings.")
+        _ins_skill("david.miller@generationbridge.com", "request", "Public Speaking Practice", "practical",
+                   "Seeking coaching for confident presentations. Prefer 30-minute sessions.")
+        _ins_skill("alice@example.com", "request", "Basic Networking / LinkedIn Tips", "technical",
+                   "Need help improving my profile and networking approach.")
+        _ins_skill("mr_lim@example.com", "offer", "Interview Preparation Mentoring", "technical",
+                   "Mock interviews and resume feedback. Availability: Tue/Thu 7–9pm.")
+
+    # ---- Seed sample events (from OnePA + SAFRA) ----
+    event_count = conn.execute("SELECT COUNT(*) FROM events").fetchone()[0]
+    if event_count == 0:
+        def _ins_event(title, desc, loc, sd, st="", ed="", et="", link="", lat=None, lng=None):
+            conn.execute(
+                """
+                INSERT INTO events
+                (title, description, location, start_date, start_time, end_date, end_time, link, latitude, longitude,
+                 created_at, starts_at, ends_at)
+                VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?)
+                """,
+                (title, desc, loc, sd, st, ed, et, link, lat, lng, utcnow_iso(), *_event_instants(sd, st, ed, et))
             )
-        conn.commit()
+        # 1) Punggol Meadows RC Line Dance Interest Group
+        _ins_event(
+            "Punggol Meadows RC Line Dance Interest Group",
+            "Community line dance interest group session organised by Punggol Meadows RC.",
+            "Punggol Meadows Community Centre, Singapore",
+            "2026-05-01",
+            "",
+            "",
+            "",
+            "https://www.onepa.gov.sg/events/punggol-meadows-rc-line-dance-interest-group-64220439"
+        )
+        # 2) Jurong Spring CACC Giant Delight 2025
+        _ins_event(
+            "Jurong Spring CACC Giant Delight 2025",
+            "Community celebration and family activity event by Jurong Spring CACC.",
+            "Jurong Spring, Singapore",
+            "2025-06-25",
+            "",
+            "",
+            "",
+            "https://www.onepa.gov.sg/events/jurong-spring-cacc-giant-delight-2025-62571032"
+        )
+        # 3) SAFRA – What's New in February 2026 (Event Listing)
+        _ins_event(
+            "SAFRA – What's New in February 2026",
+            "Official SAFRA listing of February 2026 events including Total Defence 2026, Lunar New Year celebrations, and Buddies Day Out.",
+            "Multiple SAFRA Clubs, Singapore",
+            "2026-02-01",
+            "",
+            "",
+            "",
+            "https://www.safra.sg/nsman-magazine/things-to-do/Things-to-do/2026/02/04/whats-new-in-february-2026"
+        )
+        # 4) Community Connectors – Bendemeer Senior Befriending (with coordinates)
+        _ins_event(
+            "Community Connectors – Bendemeer Senior Befriending",
+            "Youth volunteers engage seniors through conversations, community activities, and social support.",
+            "Lion Befrienders Active Ageing Centre, Bendemeer, Singapore",
+            "2026-03-01",
+            "14:00",
+            "",
+            "",
+            "https://www.volunteer.gov.sg/volunteer/opportunity/details/?id=dfbd8f85-98ba-ee11-ac5f-0aec74081c56",
+            1.3216,
+            103.8622
+        )
 
-    finally:
-        conn.close()
+        # 5) Joyful Connections – SGH Hospital Senior Companionship (with coordinates)
+        _ins_event(
+            "Joyful Connections – SGH Senior Companionship",
+            "Hospital-based befriending programme where youth volunteers engage elderly patients through games and conversation.",
+            "Singapore General Hospital, Singapore",
+            "2026-03-18",
+            "10:00",
+            "",
+            "",
+            "https://www.volunteer.gov.sg/volunteer/opportunity/details/?id=5cce7e81-93c3-f011-ac7e-027d80ecb760",
+            1.2789,
+            103.8345
+        )
+
+        # 6) Le Celebake – Youth & Seniors Intergenerational Baking (with coordinates)
+        _ins_event(
+            "Le Celebake – Youth & Seniors Intergenerational Baking",
+            "Youth and seniors come together for baking workshops and bonding sessions.",
+            "Jalan Kukoh, Singapore",
+            "2026-03-08",
+            "10:00",
+            "",
+            "",
+            "https://www.volunteer.gov.sg/volunteer/opportunity/details/?id=1e1ed635-f2cf-ee11-ac5e-027d80ecb760",
+            1.2867,
+            103.8397
+        )
 
 
 
 
 def get_conn() -> sqlite3.Connection:
-    return _db.connect()
+    """Connection for the calling context.
+
+    Inside a mutation (on the writer thread) this is the writer's batched
+    connection, so read-after-write sees its own changes. Everywhere else it is
+    a pooled read-only connection; close() returns it to the pool.
+    """
+    writer = _db.current_writer()
+    if writer is not None and writer.owns_current_thread():
+        return writer.conn
+    return _db.reader()
+
+
+def submit_write(fn: Callable, *args: Any, **kwargs: Any) -> Future:
+    """Queue fn(*args, **kwargs) on the writer thread and return its Future."""
+    return _db.writer().submit(fn, *args, **kwargs)
+
+
+def on_commit(fn: Callable[[], None]) -> None:
+    """Run fn once the current writer batch has committed (cache invalidation,
+    pushes). Outside a mutation it runs immediately."""
+    writer = _db.current_writer()
+    if writer is not None and writer.owns_current_thread():
+        writer.after_commit(fn)
+    else:
+        fn()
+
+
+# New user content is handed to listeners (e.g. moderation.scanner) after commit,
+# so scanning never runs on the request path.
+ContentListener = Callable[[str, int, int, str], None]  # (kind, item id, author id, text)
+_content_listeners: List[ContentListener] = []
+
+
+def add_content_listener(fn: ContentListener) -> None:
+    if fn not in _content_listeners:
+        _content_listeners.append(fn)
+
+
+def remove_content_listener(fn: ContentListener) -> None:
+    if fn in _content_listeners:
+        _content_listeners.remove(fn)
+
+
+def _publish_content(kind: str, item_id: int, author_id: int, text: str) -> None:
+    if not _content_listeners:
+        return
+
+    def _notify() -> None:
+        for listener in list(_content_listeners):
+            try:
+                listener(kind, item_id, author_id, text)
+            except Exception:
+                pass
+
+    on_commit(_notify)
+
+
+def _serialized_write(fn: Callable) -> Callable:
+    """Run a mutation helper on the writer thread and block for its result.
+
+    The Future-returning variant is available as ``helper.submit(...)``.
+    """
+
+    @functools.wraps(fn)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        writer = _db.writer()
+        if writer.owns_current_thread():
+            return fn(*args, **kwargs)
+        return writer.submit(fn, *args, **kwargs).result()
+
+    wrapper.submit = functools.partial(submit_write, fn)
+    return wrapper
 
 
 # ---- Users / Auth ----
 
+# Everything but the bookkeeping columns (deleted_at, is_system), which stay out of API payloads.
+_USER_COLUMNS = (
+    "id, full_name, email, password, age, generation, bio, match_preferences, avatar, "
+    "is_admin, is_banned, show_in_matchup, suspended_until, warning_message, warning_ack"
+)
+
 def get_user_by_email(email: str) -> Optional[dict]:
     conn = get_conn()
     try:
-        row = conn.execute("SELECT * FROM users WHERE email=?", (email,)).fetchone()
+        row = conn.execute(f"SELECT {_USER_COLUMNS} FROM users WHERE email=? AND deleted_at IS NULL", (email,)).fetchone()
         return _row_to_dict(row) if row else None
     finally:
         conn.close()
@@ -492,12 +1255,13 @@ def get_user_by_email(email: str) -> Optional[dict]:
 def get_user_by_id(user_id: int) -> Optional[dict]:
     conn = get_conn()
     try:
-        row = conn.execute("SELECT * FROM users WHERE id=?", (int(user_id),)).fetchone()
+        row = conn.execute(f"SELECT {_USER_COLUMNS} FROM users WHERE id=? AND deleted_at IS NULL", (int(user_id),)).fetchone()
         return _row_to_dict(row) if row else None
     finally:
         conn.close()
 
 
+@_serialized_write
 def create_user(full_name: str, email: str, password: str) -> Tuple[bool, Optional[dict], str]:
     conn = get_conn()
     try:
@@ -515,6 +1279,7 @@ def create_user(full_name: str, email: str, password: str) -> Tuple[bool, Option
         conn.close()
 
 
+@_serialized_write
 def update_user(user_id: int, fields: dict) -> Optional[dict]:
     allowed = {"full_name", "email", "age", "generation", "bio", "match_preferences", "avatar"}
     sets = []
@@ -530,12 +1295,14 @@ def update_user(user_id: int, fields: dict) -> Optional[dict]:
     try:
         params.append(int(user_id))
         conn.execute(f"UPDATE users SET {', '.join(sets)} WHERE id=?", params)
+        _invalidate_principal(int(user_id))
         conn.commit()
     finally:
         conn.close()
     return get_user_by_id(user_id)
 
 
+@_serialized_write
 def set_user_interests(user_id: int, interests: List[str]) -> None:
     conn = get_conn()
     try:
@@ -548,6 +1315,7 @@ def set_user_interests(user_id: int, interests: List[str]) -> None:
                 "INSERT OR IGNORE INTO user_interests(user_id,interest_name) VALUES (?,?)",
                 (int(user_id), name),
             )
+        _invalidate_principal(int(user_id))
         conn.commit()
     finally:
         conn.close()
@@ -565,9 +1333,13 @@ def get_user_public(user_id: int) -> Optional[dict]:
             "SELECT interest_name FROM user_interests WHERE user_id=? ORDER BY interest_name",
             (int(user_id),),
         ).fetchall()
-        u["interests"] = [r["interest_name"] for r in ints]
+        interests = [r["interest_name"] for r in ints]
     finally:
         conn.close()
+    return _public_user_dict(u, interests)
+
+
+def _public_user_dict(u: dict, interests: List[str]) -> dict:
     return {
         "id": u["id"],
         "full_name": u.get("full_name"),
@@ -577,13 +1349,29 @@ def get_user_public(user_id: int) -> Optional[dict]:
         "bio": u.get("bio"),
         "match_preferences": u.get("match_preferences"),
         "avatar": u.get("avatar"),
-        "interests": u.get("interests", []),
+        "interests": interests,
         "is_admin": bool(u.get("is_admin")),
         "is_banned": bool(u.get("is_banned")),
         "show_in_matchup": bool(u.get("show_in_matchup")),
     }
 
 
+def _public_users_by_id(conn: sqlite3.Connection, user_ids: Iterable[int]) -> Dict[int, dict]:
+    """get_user_public() for many ids with two queries."""
+    ids = sorted({int(i) for i in user_ids})
+    if not ids:
+        return {}
+    marks = ",".join("?" * len(ids))
+    interests: Dict[int, List[str]] = {}
+    for r in conn.execute(
+        f"SELECT user_id, interest_name FROM user_interests WHERE user_id IN ({marks}) ORDER BY interest_name",
+        ids,
+    ).fetchall():
+        interests.setdefault(int(r["user_id"]), []).append(r["interest_name"])
+    rows = conn.execute(f"SELECT {_USER_COLUMNS} FROM users WHERE id IN ({marks}) AND deleted_at IS NULL", ids).fetchall()
+    return {int(r["id"]): _public_user_dict(_row_to_dict(r), interests.get(int(r["id"]), [])) for r in rows}
+
+
 # ---- Moderation gating (warnings / suspensions) ----
 
 def _parse_iso_dt(value: Optional[str]) -> Optional[datetime]:
@@ -603,43 +1391,40 @@ def _parse_iso_dt(value: Optional[str]) -> Optional[datetime]:
 
 
 def is_user_currently_suspended(user_row: dict) -> Tuple[bool, Optional[str]]:
-    """Return (is_suspended, until_iso). Auto-clears if suspension expired."""
-    until_raw = user_row.get("suspended_until")
-    until_dt = _parse_iso_dt(until_raw)
-    if not until_dt:
-        return False, None
+    """Return (is_suspended, until_iso).
 
-    now = datetime.now(timezone.utc)
-    if until_dt > now:
+    Read-only: expired suspensions are cleared by sweep_expired_suspensions().
+    """
+    until_dt = _parse_iso_dt(user_row.get("suspended_until"))
+    if until_dt and until_dt > datetime.now(timezone.utc):
         return True, until_dt.isoformat()
-
-    # Expired: clear
-    try:
-        clear_user_suspension(int(user_row.get("id")))
-    except Exception:
-        pass
     return False, None
 
 
+@_serialized_write
 def set_user_suspension(user_id: int, until_iso: str) -> Optional[dict]:
     conn = get_conn()
     try:
         conn.execute("UPDATE users SET suspended_until=? WHERE id=?", (until_iso, int(user_id)))
+        _invalidate_principal(int(user_id))
         conn.commit()
     finally:
         conn.close()
     return get_user_by_id(int(user_id))
 
 
+@_serialized_write
 def clear_user_suspension(user_id: int) -> None:
     conn = get_conn()
     try:
         conn.execute("UPDATE users SET suspended_until=NULL WHERE id=?", (int(user_id),))
+        _invalidate_principal(int(user_id))
         conn.commit()
     finally:
         conn.close()
 
 
+@_serialized_write
 def set_user_warning(user_id: int, message: str) -> None:
     conn = get_conn()
     try:
@@ -647,6 +1432,7 @@ def set_user_warning(user_id: int, message: str) -> None:
             "UPDATE users SET warning_message=?, warning_ack=0 WHERE id=?",
             (message, int(user_id)),
         )
+        _invalidate_principal(int(user_id))
         conn.commit()
     finally:
         conn.close()
@@ -662,6 +1448,7 @@ def get_user_warning(user_id: int) -> Tuple[bool, Optional[str]]:
     return pending, msg if pending else None
 
 
+@_serialized_write
 def ack_user_warning(user_id: int) -> None:
     conn = get_conn()
     try:
@@ -669,15 +1456,115 @@ def ack_user_warning(user_id: int) -> None:
             "UPDATE users SET warning_ack=1, warning_message=NULL WHERE id=?",
             (int(user_id),),
         )
+        _invalidate_principal(int(user_id))
         conn.commit()
     finally:
         conn.close()
 
 
-def list_users(exclude_user_id: Optional[int] = None, *, only_matchup: bool = False) -> List[dict]:
+# ---- Session principal cache ----
+#
+# /api/auth/me and moderation gating need the user, admin/ban flags, suspension
+# deadline and pending warning on every page load. The principal is cached per
+# user; every write that changes those fields bumps the user's version after
+# commit (via _invalidate_principal), and PRINCIPAL_TTL_S bounds staleness for
+# writes made by other worker processes.
+
+PRINCIPAL_TTL_S = 30.0
+
+_principal_lock = threading.Lock()
+_principal_versions: Dict[int, int] = {}
+_principal_cache: Dict[int, Tuple[int, float, dict, Optional[datetime]]] = {}
+
+
+def _invalidate_principal(user_id: int) -> None:
+    def _bump() -> None:
+        with _principal_lock:
+            _principal_versions[user_id] = _principal_versions.get(user_id, 0) + 1
+            _principal_cache.pop(user_id, None)
+        _bump_content_version("users")
+
+    on_commit(_bump)
+
+
+def get_session_principal(user_id: int) -> Optional[dict]:
+    """Cached view of the session user for auth/moderation checks.
+
+    Returns {"user", "is_admin", "is_banned", "is_suspended", "suspended_until",
+    "warning"} or None if the user no longer exists. is_suspended is evaluated
+    against the clock on every call, so no write is needed when it expires.
+    """
+    uid = int(user_id)
+    now = time.monotonic()
+    with _principal_lock:
+        version = _principal_versions.get(uid, 0)
+        hit = _principal_cache.get(uid)
+    if hit is not None and hit[0] == version and now - hit[1] < PRINCIPAL_TTL_S:
+        _, _, principal, until_dt = hit
+    else:
+        row = get_user_by_id(uid)
+        if not row:
+            return None
+        until_dt = _parse_iso_dt(row.get("suspended_until"))
+        pending_warning = bool(row.get("warning_message")) and int(row.get("warning_ack") or 0) == 0
+        principal = {
+            "user": get_user_public(uid),
+            "is_admin": bool(row.get("is_admin")),
+            "is_banned": bool(row.get("is_banned")),
+            "warning": row.get("warning_message") if pending_warning else None,
+        }
+        with _principal_lock:
+            # Only store if no write landed while we were reading.
+            if _principal_versions.get(uid, 0) == version:
+                _principal_cache[uid] = (version, now, principal, until_dt)
+    suspended = until_dt is not None and until_dt > datetime.now(timezone.utc)
+    return dict(
+        principal,
+        is_suspended=suspended,
+        suspended_until=until_dt.isoformat() if suspended else None,
+    )
+
+
+def sweep_expired_suspensions() -> int:
+    """Clear suspended_until for every user whose suspension has expired."""
+    conn = get_conn()
+    try:
+        rows = conn.execute(
+            "SELECT id, suspended_until FROM users WHERE suspended_until IS NOT NULL"
+        ).fetchall()
+    finally:
+        conn.close()
+    now = datetime.now(timezone.utc)
+    expired = [int(r["id"]) for r in rows if (_parse_iso_dt(r["suspended_until"]) or now) <= now]
+    for uid in expired:
+        clear_user_suspension(uid)
+    return len(expired)
+
+
+def start_suspension_sweeper(interval_s: float = 60.0) -> threading.Event:
+    """Run sweep_expired_suspensions() every interval_s on a daemon thread.
+
+    Set the returned Event to stop it.
+    """
+    stop = threading.Event()
+
+    def _loop() -> None:
+        while not stop.wait(interval_s):
+            try:
+                sweep_expired_suspensions()
+            except Exception:
+                pass
+
+    threading.Thread(target=_loop, name="suspension-sweeper", daemon=True).start()
+    return stop
+
+
+def list_users(
+    exclude_user_id: Optional[int] = None, *, only_matchup: bool = False, limit: Optional[int] = None
+) -> List[dict]:
     conn = get_conn()
     try:
-        clauses = []
+        clauses = ["deleted_at IS NULL", "is_system=0"]
         params: List[Any] = []
         if exclude_user_id:
             clauses.append("id<>?")
@@ -685,19 +1572,22 @@ def list_users(exclude_user_id: Optional[int] = None, *, only_matchup: bool = Fa
         if only_matchup:
             clauses.append("show_in_matchup=1")
 
-        where_sql = (" WHERE " + " AND ".join(clauses)) if clauses else ""
-        rows = conn.execute(f"SELECT id FROM users{where_sql} ORDER BY id", tuple(params)).fetchall()
-        return [get_user_public(r["id"]) for r in rows if get_user_public(r["id"]) is not None]
+        where_sql = " WHERE " + " AND ".join(clauses)
+        params.append(-1 if limit is None else int(limit))
+        rows = conn.execute(f"SELECT id FROM users{where_sql} ORDER BY id LIMIT ?", tuple(params)).fetchall()
+        users = _public_users_by_id(conn, (r["id"] for r in rows))
+        return [users[r["id"]] for r in rows if r["id"] in users]
     finally:
         conn.close()
 
 
 # ---- Login events ----
 
+@_serialized_write
 def log_login_event(user_id: Optional[int], email: str, success: bool, ip: str, user_agent: str) -> dict:
     conn = get_conn()
     try:
-        created_at = utcnow_iso()
+        created_at = utcnow_ms()
         conn.execute(
             "INSERT INTO login_events(user_id,email,success,ip,user_agent,created_at) VALUES (?,?,?,?,?,?)",
             (user_id, email, 1 if success else 0, ip, user_agent, created_at),
@@ -711,18 +1601,32 @@ def log_login_event(user_id: Optional[int], email: str, success: bool, ip: str,
             "success": bool(success),
             "ip": ip,
             "user_agent": user_agent,
-            "created_at": created_at,
+            "created_at": ms_to_iso(created_at),
         }
     finally:
         conn.close()
 
 
 def list_login_events(limit: int = 50) -> List[dict]:
+    conn = get_conn()
+    try:
+        rows = _select_partitioned(conn, "login_events", "1=1", (), limit=int(limit), newest_first=True)
+        return [_epoch_row_to_dict(r) for r in rows]
+    finally:
+        conn.close()
+
+
+def list_login_rollups(hours: int = 168) -> List[dict]:
+    """Per-hour success/failure counts (stats_hourly) for the last `hours` hours, oldest first."""
     conn = get_conn()
     try:
         rows = conn.execute(
-            "SELECT * FROM login_events ORDER BY id DESC LIMIT ?",
-            (int(limit),),
+            """
+            SELECT hour, logins_ok, logins_failed FROM stats_hourly
+            WHERE hour >= strftime('%Y-%m-%dT%H','now',?)
+            ORDER BY hour ASC
+            """,
+            (f"-{max(int(hours), 1) - 1} hours",),
         ).fetchall()
         return [_row_to_dict(r) for r in rows]
     finally:
@@ -731,6 +1635,9 @@ def list_login_events(limit: int = 50) -> List[dict]:
 
 # ---- Stories ----
 
+_STORY_COLUMNS = "id, user_id, title, category, content, status, created_at, comments_count"
+
+@_serialized_write
 def create_story(user_id: int, title: str, category: str, content: str, status: str = "ongoing") -> dict:
     conn = get_conn()
     try:
@@ -741,6 +1648,8 @@ def create_story(user_id: int, title: str, category: str, content: str, status:
         )
         conn.commit()
         sid = conn.execute("SELECT last_insert_rowid() AS id").fetchone()["id"]
+        on_commit(functools.partial(_bump_content_version, "stories"))
+        _publish_content("story", sid, int(user_id), f"{title}\n{content}")
         return get_story(sid)
     finally:
         conn.close()
@@ -749,27 +1658,35 @@ def create_story(user_id: int, title: str, category: str, content: str, status:
 def get_story(story_id: int) -> Optional[dict]:
     conn = get_conn()
     try:
-        row = conn.execute("SELECT * FROM stories WHERE id=?", (int(story_id),)).fetchone()
+        row = conn.execute(f"SELECT {_STORY_COLUMNS} FROM stories WHERE id=? AND deleted_at IS NULL", (int(story_id),)).fetchone()
         if not row:
             return None
         d = _row_to_dict(row)
         d["user"] = get_user_public(d["user_id"])
-        d["comments_count"] = count_story_comments(int(d["id"]))
         return d
     finally:
         conn.close()
 
 
-def list_stories() -> List[dict]:
+def _with_authors(conn: sqlite3.Connection, rows: List[sqlite3.Row]) -> List[dict]:
+    """Content rows as dicts with "user" attached, fetching all authors at once."""
+    users = _public_users_by_id(conn, (r["user_id"] for r in rows))
+    out = []
+    for r in rows:
+        d = _row_to_dict(r)
+        d["user"] = users.get(int(d["user_id"]))
+        out.append(d)
+    return out
+
+
+def list_stories(limit: Optional[int] = None) -> List[dict]:
     conn = get_conn()
     try:
-        rows = conn.execute("SELECT id FROM stories ORDER BY id DESC").fetchall()
-        out = []
-        for r in rows:
-            s = get_story(r["id"])
-            if s:
-                out.append(s)
-        return out
+        rows = conn.execute(
+            f"SELECT {_STORY_COLUMNS} FROM stories WHERE deleted_at IS NULL ORDER BY id DESC LIMIT ?",
+            (-1 if limit is None else int(limit),),
+        ).fetchall()
+        return _with_authors(conn, rows)
     finally:
         conn.close()
 
@@ -781,7 +1698,9 @@ def list_stories() -> List[dict]:
 def count_story_comments(story_id: int) -> int:
     conn = get_conn()
     try:
-        row = conn.execute("SELECT COUNT(*) AS c FROM story_comments WHERE story_id=?", (int(story_id),)).fetchone()
+        row = conn.execute(
+            "SELECT comments_count AS c FROM stories WHERE id=? AND deleted_at IS NULL", (int(story_id),)
+        ).fetchone()
         return int(row["c"] or 0) if row else 0
     finally:
         conn.close()
@@ -795,7 +1714,7 @@ def list_story_comments(story_id: int, limit: int = 200) -> List[dict]:
             SELECT c.*, u.full_name, u.avatar
             FROM story_comments c
             JOIN users u ON u.id = c.user_id
-            WHERE c.story_id=?
+            WHERE c.story_id=? AND u.deleted_at IS NULL
             ORDER BY c.id ASC
             LIMIT ?
             """,
@@ -817,12 +1736,15 @@ def list_story_comments(story_id: int, limit: int = 200) -> List[dict]:
 def get_story_comment(comment_id: int) -> Optional[dict]:
     conn = get_conn()
     try:
-        row = conn.execute("SELECT * FROM story_comments WHERE id=?", (int(comment_id),)).fetchone()
+        row = conn.execute(
+            f"SELECT * FROM story_comments WHERE id=? AND user_id NOT IN {_TOMBSTONED_USERS}", (int(comment_id),)
+        ).fetchone()
         return _row_to_dict(row) if row else None
     finally:
         conn.close()
 
 
+@_serialized_write
 def create_story_comment(story_id: int, user_id: int, text: str) -> dict:
     conn = get_conn()
     try:
@@ -832,7 +1754,9 @@ def create_story_comment(story_id: int, user_id: int, text: str) -> dict:
             (int(story_id), int(user_id), text, created_at),
         )
         conn.commit()
+        on_commit(functools.partial(_bump_content_version, "stories"))
         cid = conn.execute("SELECT last_insert_rowid() AS id").fetchone()["id"]
+        _publish_content("story_comment", cid, int(user_id), text)
         row = conn.execute(
             """
             SELECT c.*, u.full_name, u.avatar
@@ -851,6 +1775,7 @@ def create_story_comment(story_id: int, user_id: int, text: str) -> dict:
         conn.close()
 
 
+@_serialized_write
 def delete_story_comment(story_id: int, comment_id: int) -> bool:
     """Delete a single story comment by id (scoped to a story for safety)."""
     conn = get_conn()
@@ -860,6 +1785,7 @@ def delete_story_comment(story_id: int, comment_id: int) -> bool:
             (int(comment_id), int(story_id)),
         )
         conn.commit()
+        on_commit(functools.partial(_bump_content_version, "stories"))
         return bool(cur.rowcount)
     finally:
         conn.close()
@@ -867,52 +1793,82 @@ def delete_story_comment(story_id: int, comment_id: int) -> bool:
 
 # ---- Moderation helpers (Admin) ----
 
+@_serialized_write
 def set_user_banned(user_id: int, banned: bool = True) -> Optional[dict]:
     conn = get_conn()
     try:
         conn.execute("UPDATE users SET is_banned=? WHERE id=?", (1 if banned else 0, int(user_id)))
+        _invalidate_principal(int(user_id))
         conn.commit()
     finally:
         conn.close()
     return get_user_public(int(user_id))
 
 
+@_serialized_write
 def set_user_matchup_enabled(user_id: int, enabled: bool = True) -> Optional[dict]:
     """Mark a user as visible in Match-Up."""
     conn = get_conn()
     try:
         conn.execute("UPDATE users SET show_in_matchup=? WHERE id=?", (1 if enabled else 0, int(user_id)))
+        _invalidate_principal(int(user_id))
         conn.commit()
     finally:
         conn.close()
     return get_user_public(int(user_id))
 
 
+@_serialized_write
 def delete_user(user_id: int) -> bool:
+    """Tombstone the user and their stories / skill posts; purge_pending() removes the rows.
+
+    The email stays taken until the purge has run.
+    """
+    uid = int(user_id)
     conn = get_conn()
     try:
-        conn.execute("DELETE FROM users WHERE id=?", (int(user_id),))
+        now = utcnow_ms()
+        cur = conn.execute("UPDATE users SET deleted_at=? WHERE id=? AND deleted_at IS NULL", (now, uid))
+        if cur.rowcount:
+            _discount_unread_from_sender(conn, uid)
+            conn.execute("UPDATE stories SET deleted_at=? WHERE user_id=? AND deleted_at IS NULL", (now, uid))
+            conn.execute("UPDATE skillswap_posts SET deleted_at=? WHERE user_id=? AND deleted_at IS NULL", (now, uid))
+            _queue_purge(conn, "user", uid)
+            _invalidate_principal(uid)
         conn.commit()
+        on_commit(functools.partial(_bump_content_version, "stories", "skillswap", "events"))
         return True
     finally:
         conn.close()
 
 
+@_serialized_write
 def delete_story(story_id: int) -> bool:
     conn = get_conn()
     try:
-        conn.execute("DELETE FROM stories WHERE id=?", (int(story_id),))
+        cur = conn.execute(
+            "UPDATE stories SET deleted_at=? WHERE id=? AND deleted_at IS NULL", (utcnow_ms(), int(story_id))
+        )
+        if cur.rowcount:
+            _queue_purge(conn, "story", int(story_id))
         conn.commit()
+        on_commit(functools.partial(_bump_content_version, "stories"))
         return True
     finally:
         conn.close()
 
 
+@_serialized_write
 def delete_skillswap_post(post_id: int) -> bool:
     conn = get_conn()
     try:
-        conn.execute("DELETE FROM skillswap_posts WHERE id=?", (int(post_id),))
+        cur = conn.execute(
+            "UPDATE skillswap_posts SET deleted_at=? WHERE id=? AND deleted_at IS NULL", (utcnow_ms(), int(post_id))
+        )
+        if cur.rowcount:
+            _queue_purge(conn, "skillswap_post", int(post_id))
         conn.commit()
+        on_commit(functools.partial(_bump_content_version, "skillswap"))
         return True
     finally:
         conn.close()
@@ -920,6 +1876,9 @@ def delete_skillswap_post(post_id: int) -> bool:
 
 # ---- SkillSwap ----
 
+_SKILLSWAP_POST_COLUMNS = "id, user_id, post_type, title, category, description, created_at, comments_count"
+
+@_serialized_write
 def create_skillswap_post(user_id: int, post_type: str, title: str, category: str, description: str) -> dict:
     conn = get_conn()
     try:
@@ -930,6 +1889,8 @@ def create_skillswap_post(user_id: int, post_type: str, title: str, category: st
         )
         conn.commit()
         pid = conn.execute("SELECT last_insert_rowid() AS id").fetchone()["id"]
+        on_commit(functools.partial(_bump_content_version, "skillswap"))
+        _publish_content("skillswap_post", pid, int(user_id), f"{title}\n{description}")
         return get_skillswap_post(pid)
     finally:
         conn.close()
@@ -938,63 +1899,159 @@ def create_skillswap_post(user_id: int, post_type: str, title: str, category: st
 def get_skillswap_post(post_id: int) -> Optional[dict]:
     conn = get_conn()
     try:
-        row = conn.execute("SELECT * FROM skillswap_posts WHERE id=?", (int(post_id),)).fetchone()
+        row = conn.execute(f"SELECT {_SKILLSWAP_POST_COLUMNS} FROM skillswap_posts WHERE id=? AND deleted_at IS NULL", (int(post_id),)).fetchone()
         if not row:
             return None
         d = _row_to_dict(row)
         d["user"] = get_user_public(d["user_id"])
-        d["comments_count"] = count_story_comments(int(d["id"]))
         return d
     finally:
         conn.close()
 
 
-def list_skillswap_posts() -> List[dict]:
+def list_skillswap_posts(limit: Optional[int] = None) -> List[dict]:
     conn = get_conn()
     try:
-        rows = conn.execute("SELECT id FROM skillswap_posts ORDER BY id DESC").fetchall()
-        out = []
-        for r in rows:
-            p = get_skillswap_post(r["id"])
-            if p:
-                out.append(p)
-        return out
+        rows = conn.execute(
+            f"SELECT {_SKILLSWAP_POST_COLUMNS} FROM skillswap_posts WHERE deleted_at IS NULL ORDER BY id DESC LIMIT ?",
+            (-1 if limit is None else int(limit),),
+        ).fetchall()
+        return _with_authors(conn, rows)
     finally:
         conn.close()
 
 
-# ---- Events ----
+# ---- SkillSwap Responses ----
 
-def create_event(
-    title: str,
-    start_date: str,
-    start_time: Optional[str] = None,
-    location: str = "",
-    description: str = "",
-    end_date: Optional[str] = None,
-    end_time: Optional[str] = None,
-    link: Optional[str] = None,
-    latitude: Optional[float] = None,
-    longitude: Optional[float] = None,
-) -> dict:
-    """Create a new event (admin-only at API layer).
+def _comment_with_user(d: dict) -> dict:
+    d["user"] = {"id": d["user_id"], "full_name": d.get("full_name"), "avatar": d.get("avatar")}
+    d.pop("full_name", None)
+    d.pop("avatar", None)
+    return d
 
-    Dates are stored as ISO strings (YYYY-MM-DD) for easy sorting/filtering.
-    Latitude and longitude are optional geocoded coordinates.
-    """
+
+def count_skillswap_comments(post_id: int) -> int:
     conn = get_conn()
     try:
-        created_at = utcnow_iso()
-        conn.execute(
-            """
-            INSERT INTO events(title,description,location,start_date,start_time,end_date,end_time,link,latitude,longitude,created_at)
-            VALUES (?,?,?,?,?,?,?,?,?,?,?)
-            """,
-            (
-                title,
-                description or "",
-                location or "",
-                start_date,
+        row = conn.execute(
+            "SELECT comments_count AS c FROM skillswap_posts WHERE id=? AND deleted_at IS NULL", (int(post_id),)
+        ).fetchone()
+        return int(row["c"] or 0) if row else 0
+    finally:
+        conn.close()
+
+
+def list_skillswap_comments(post_id: int, limit: int = 200) -> List[dict]:
+    conn = get_conn()
+    try:
+        rows = conn.execute(
+            """
+            SELECT c.*, u.full_name, u.avatar
+            FROM skillswap_comments c
+            JOIN users u ON u.id = c.user_id
+            WHERE c.post_id=? AND u.deleted_at IS NULL
+            ORDER BY c.id ASC
+            LIMIT ?
+            """,
+            (int(post_id), int(limit)),
+        ).fetchall()
+        return [_comment_with_user(_row_to_dict(r)) for r in rows]
+    finally:
+        conn.close()
+
+
+def get_skillswap_comment(comment_id: int) -> Optional[dict]:
+    conn = get_conn()
+    try:
+        row = conn.execute(
+            f"SELECT * FROM skillswap_comments WHERE id=? AND user_id NOT IN {_TOMBSTONED_USERS}", (int(comment_id),)
+        ).fetchone()
+        return _row_to_dict(row) if row else None
+    finally:
+        conn.close()
+
+
+@_serialized_write
+def create_skillswap_comment(post_id: int, user_id: int, text: str) -> dict:
+    conn = get_conn()
+    try:
+        conn.execute(
+            "INSERT INTO skillswap_comments(post_id,user_id,text,created_at) VALUES (?,?,?,?)",
+            (int(post_id), int(user_id), text, utcnow_iso()),
+        )
+        cid = conn.execute("SELECT last_insert_rowid() AS id").fetchone()["id"]
+        conn.commit()
+        on_commit(functools.partial(_bump_content_version, "skillswap"))
+        _publish_content("skillswap_comment", cid, int(user_id), text)
+        row = conn.execute(
+            """
+            SELECT c.*, u.full_name, u.avatar
+            FROM skillswap_comments c
+            JOIN users u ON u.id = c.user_id
+            WHERE c.id=?
+            """,
+            (int(cid),),
+        ).fetchone()
+        return _comment_with_user(_row_to_dict(row))
+    finally:
+        conn.close()
+
+
+@_serialized_write
+def delete_skillswap_comment(post_id: int, comment_id: int) -> bool:
+    """Delete a single skillswap response by id (scoped to a post for safety)."""
+    conn = get_conn()
+    try:
+        cur = conn.execute(
+            "DELETE FROM skillswap_comments WHERE id=? AND post_id=?",
+            (int(comment_id), int(post_id)),
+        )
+        conn.commit()
+        on_commit(functools.partial(_bump_content_version, "skillswap"))
+        return bool(cur.rowcount)
+    finally:
+        conn.close()
+
+
+# ---- Events ----
+
+@_serialized_write
+def create_event(
+    title: str,
+    start_date: str,
+    start_time: Optional[str] = None,
+    location: str = "",
+    description: str = "",
+    end_date: Optional[str] = None,
+    end_time: Optional[str] = None,
+    link: Optional[str] = None,
+    latitude: Optional[float] = None,
+    longitude: Optional[float] = None,
+) -> dict:
+    """Create a new event (admin-only at API layer).
+
+    Dates are stored as ISO strings (YYYY-MM-DD) for easy sorting/filtering,
+    plus normalized starts_at/ends_at instants for range queries.
+    Latitude and longitude are optional geocoded coordinates.
+    Raises ValueError if start_date is not a valid YYYY-MM-DD date.
+    """
+    starts_at, ends_at = _event_instants(start_date, start_time, end_date, end_time)
+    if starts_at is None:
+        raise ValueError(f"start_date must be a YYYY-MM-DD date, got {start_date!r}")
+    conn = get_conn()
+    try:
+        created_at = utcnow_iso()
+        conn.execute(
+            """
+            INSERT INTO events(title,description,location,start_date,start_time,end_date,end_time,link,latitude,longitude,
+                               created_at,starts_at,ends_at)
+            VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?)
+            """,
+            (
+                title,
+                description or "",
+                location or "",
+                start_date,
                 (start_time or ""),
                 (end_date or ""),
                 (end_time or ""),
@@ -1002,10 +2059,13 @@ def create_event(
                 latitude,
                 longitude,
                 created_at,
+                starts_at,
+                ends_at,
             ),
         )
         conn.commit()
         eid = conn.execute("SELECT last_insert_rowid() AS id").fetchone()["id"]
+        on_commit(_bump_events_version)
         return get_event(int(eid))
     finally:
         conn.close()
@@ -1028,21 +2088,25 @@ def list_events(limit: int = 50, upcoming_only: bool = True) -> List[dict]:
             limit = 50
 
         if upcoming_only:
-            today_str = date.today().isoformat()  # YYYY-MM-DD
             rows = conn.execute(
                 """
                 SELECT * FROM events
-                WHERE start_date >= ?
-                ORDER BY start_date ASC, COALESCE(start_time,'') ASC, id ASC
+                WHERE starts_at >= ?
+                ORDER BY starts_at ASC, id ASC
                 LIMIT ?
                 """,
-                (today_str, limit),
+                (_start_of_today_ms(), limit),
             ).fetchall()
+            # Legacy rows whose start_date never parsed have no starts_at; list them last.
+            if len(rows) < limit:
+                rows += conn.execute(
+                    "SELECT * FROM events WHERE starts_at IS NULL ORDER BY id ASC LIMIT ?", (limit - len(rows),)
+                ).fetchall()
         else:
             rows = conn.execute(
                 """
                 SELECT * FROM events
-                ORDER BY start_date DESC, COALESCE(start_time,'') DESC, id DESC
+                ORDER BY starts_at DESC, id DESC
                 LIMIT ?
                 """,
                 (limit,),
@@ -1055,28 +2119,271 @@ def list_events(limit: int = 50, upcoming_only: bool = True) -> List[dict]:
         conn.close()
 
 
+@_serialized_write
 def delete_event(event_id: int) -> bool:
     conn = get_conn()
     try:
         conn.execute("DELETE FROM events WHERE id=?", (int(event_id),))
         conn.commit()
+        on_commit(functools.partial(_bump_events_version, int(event_id)))
+        return True
+    finally:
+        conn.close()
+
+
+def _parse_event_time(value: Optional[str]) -> Optional[Tuple[int, int]]:
+    """'14:30', '14:30:00', '2:30 PM', '2pm' -> (14, 30); None if empty/unparseable."""
+    s = (value or "").strip().lower().replace(".", "")
+    if not s:
+        return None
+    m = re.match(r"^(\d{1,2})(?::(\d{2}))?(?::\d{2})?\s*(am|pm)?$", s)
+    if not m:
+        return None
+    hour, minute, ampm = int(m.group(1)), int(m.group(2) or 0), m.group(3)
+    if ampm:
+        if not 1 <= hour <= 12:
+            return None
+        hour = hour % 12 + (12 if ampm == "pm" else 0)
+    if hour > 23 or minute > 59:
+        return None
+    return hour, minute
+
+
+def _event_instants(
+    start_date: Optional[str], start_time: Optional[str], end_date: Optional[str], end_time: Optional[str]
+) -> Tuple[Optional[int], Optional[int]]:
+    """(starts_at, ends_at) in UTC epoch ms from the free-form event fields.
+
+    Times are local to EVENTS_TZ. A missing start time means the start of the
+    day; a missing end means the end of the end date (or of the start date).
+    ends_at is never before starts_at. (None, None) if start_date is invalid.
+    """
+    try:
+        start_day = date.fromisoformat((start_date or "").strip())
+    except ValueError:
+        return None, None
+    try:
+        end_day = date.fromisoformat((end_date or "").strip())
+    except ValueError:
+        end_day = start_day
+    tz = _db.events_tz
+
+    def _ms(day: date, hm: Optional[Tuple[int, int]]) -> int:
+        if hm is None:
+            return int(datetime(day.year, day.month, day.day, tzinfo=tz).timestamp() * 1000)
+        return int(datetime(day.year, day.month, day.day, hm[0], hm[1], tzinfo=tz).timestamp() * 1000)
+
+    starts_at = _ms(start_day, _parse_event_time(start_time))
+    end_hm = _parse_event_time(end_time)
+    ends_at = _ms(end_day, end_hm) if end_hm else _ms(end_day + timedelta(days=1), None)
+    return starts_at, max(starts_at, ends_at)
+
+
+def _start_of_today_ms() -> int:
+    today = datetime.now(_db.events_tz).date()
+    return _event_instants(today.isoformat(), None, None, None)[0]
+
+
+def _range_bound_ms(value: Any) -> int:
+    """Epoch ms from an int/epoch-ms string or an ISO date/datetime (local to EVENTS_TZ if naive)."""
+    if isinstance(value, (int, float)):
+        return int(value)
+    s = str(value or "").strip()
+    if s.lstrip("-").isdigit():
+        return int(s)
+    dt = datetime.fromisoformat(s.replace("Z", "+00:00"))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=_db.events_tz)
+    return int(dt.timestamp() * 1000)
+
+
+def list_events_between(start: Any, end: Any, limit: int = 500) -> List[dict]:
+    """Events overlapping [start, end), for /api/events?from=&to=.
+
+    Bounds are epoch ms or ISO dates/datetimes. Multi-day events that began
+    before the window are included. The idx_events_starts_at range is bounded
+    by the longest event span (read from idx_events_span), so the query never
+    scans the whole table.
+    """
+    lo, hi = _range_bound_ms(start), _range_bound_ms(end)
+    if hi <= lo:
+        return []
+    conn = get_conn()
+    try:
+        rows = conn.execute(
+            """
+            SELECT * FROM events
+            WHERE starts_at >= ? - (SELECT COALESCE(MAX(ends_at - starts_at), 0) FROM events)
+              AND starts_at < ? AND ends_at > ?
+            ORDER BY starts_at ASC, id ASC
+            LIMIT ?
+            """,
+            (lo, hi, lo, int(limit)),
+        ).fetchall()
+        return [_row_to_dict(r) for r in rows]
+    finally:
+        conn.close()
+
+
+# Per-kind counters bumped (via on_commit) after every committed write to shared
+# content; ical.py caches feeds and home.py caches page fragments per version.
+# "users" covers profile fields embedded as story / skill post authors.
+_content_versions: Dict[str, int] = {"events": 0, "stories": 0, "skillswap": 0, "users": 0}
+
+
+def _bump_content_version(*kinds: str) -> None:
+    for kind in kinds:
+        _content_versions[kind] += 1
+
+
+# Per-row versions for writes that change an existing events row (delete,
+# geocoded coordinates), so per-event renderings (ical.py) are invalidated by
+# the same after-commit hook that bumps the events version.
+_event_row_versions: Dict[int, int] = {}
+
+
+def _bump_events_version(*event_ids: int) -> None:
+    for eid in event_ids:
+        _event_row_versions[int(eid)] = _event_row_versions.get(int(eid), 0) + 1
+    _bump_content_version("events")
+
+
+def events_version() -> int:
+    return _content_versions["events"]
+
+
+def event_row_versions() -> Dict[int, int]:
+    """Snapshot of the per-row versions; take it before reading the rows it describes."""
+    return dict(_event_row_versions)
+
+
+def content_version(*kinds: str) -> Tuple[int, ...]:
+    return tuple(_content_versions[k] for k in kinds)
+
+
+@_serialized_write
+def set_event_rsvp(user_id: int, event_id: int, going: bool = True) -> bool:
+    conn = get_conn()
+    try:
+        if going:
+            if not conn.execute("SELECT 1 FROM events WHERE id=?", (int(event_id),)).fetchone():
+                return False
+            conn.execute(
+                "INSERT OR IGNORE INTO event_rsvps(user_id, event_id, created_at) VALUES (?,?,?)",
+                (int(user_id), int(event_id), utcnow_iso()),
+            )
+        else:
+            conn.execute("DELETE FROM event_rsvps WHERE user_id=? AND event_id=?", (int(user_id), int(event_id)))
+        conn.commit()
+        on_commit(_bump_events_version)
         return True
     finally:
         conn.close()
 
 
+# ---- Geocoding (gazetteer cache) ----
+#
+# geocoder.py resolves events.location text to coordinates in batches. The
+# gazetteer table caches every resolved place key (negative results have NULL
+# coordinates), so a cached place never goes to the upstream again.
+
+def list_events_missing_coords(limit: int = 500, after_id: int = 0) -> List[dict]:
+    conn = get_conn()
+    try:
+        rows = conn.execute(
+            "SELECT id, location FROM events WHERE latitude IS NULL AND id>? ORDER BY id LIMIT ?",
+            (int(after_id), int(limit)),
+        ).fetchall()
+        return [_row_to_dict(r) for r in rows]
+    finally:
+        conn.close()
+
+
+def list_gazetteer() -> List[dict]:
+    conn = get_conn()
+    try:
+        rows = conn.execute("SELECT place_key, latitude, longitude, source, updated_at FROM gazetteer").fetchall()
+        return [_row_to_dict(r) for r in rows]
+    finally:
+        conn.close()
+
+
+@_serialized_write
+def put_gazetteer_entries(entries: List[Tuple[str, Optional[float], Optional[float], str]]) -> int:
+    """Upsert (place_key, latitude, longitude, source) rows."""
+    if not entries:
+        return 0
+    conn = get_conn()
+    try:
+        now = utcnow_ms()
+        conn.executemany(
+            """
+            INSERT INTO gazetteer(place_key, latitude, longitude, source, updated_at) VALUES (?,?,?,?,?)
+            ON CONFLICT(place_key) DO UPDATE SET
+                latitude=excluded.latitude, longitude=excluded.longitude,
+                source=excluded.source, updated_at=excluded.updated_at
+            """,
+            [(key, lat, lng, source, now) for key, lat, lng, source in entries],
+        )
+        conn.commit()
+        return len(entries)
+    finally:
+        conn.close()
+
+
+@_serialized_write
+def set_event_coords_bulk(coords: List[Tuple[int, float, float]]) -> int:
+    """Write (event_id, latitude, longitude) for events that still have none; returns rows updated."""
+    if not coords:
+        return 0
+    conn = get_conn()
+    try:
+        before = conn.total_changes
+        conn.executemany(
+            "UPDATE events SET latitude=?, longitude=? WHERE id=? AND latitude IS NULL",
+            [(lat, lng, int(eid)) for eid, lat, lng in coords],
+        )
+        updated = conn.total_changes - before
+        conn.commit()
+        if updated:
+            on_commit(functools.partial(_bump_events_version, *(int(eid) for eid, _, _ in coords)))
+        return updated
+    finally:
+        conn.close()
+
+
+def list_user_events(user_id: int) -> List[dict]:
+    """Events the user has RSVP'd to, by start."""
+    conn = get_conn()
+    try:
+        rows = conn.execute(
+            """
+            SELECT e.* FROM events e JOIN event_rsvps r ON r.event_id=e.id
+            WHERE r.user_id=?
+            ORDER BY e.starts_at ASC, e.id ASC
+            """,
+            (int(user_id),),
+        ).fetchall()
+        return [_row_to_dict(r) for r in rows]
+    finally:
+        conn.close()
+
+
 # ---- Messages ----
 
+@_serialized_write
 def create_message(sender_id: int, recipient_id: int, text: str) -> dict:
     conn = get_conn()
     try:
-        created_at = utcnow_iso()
+        created_at = utcnow_ms()
         conn.execute(
             "INSERT INTO messages(sender_id,recipient_id,text,created_at,is_read) VALUES (?,?,?,?,0)",
             (int(sender_id), int(recipient_id), text, created_at),
         )
-        conn.commit()
         mid = conn.execute("SELECT last_insert_rowid() AS id").fetchone()["id"]
+        _bump_unread(conn, int(recipient_id), "messages", 1)
+        conn.commit()
+        _publish_content("message", mid, int(sender_id), text)
         return get_message(mid)
     finally:
         conn.close()
@@ -1085,8 +2392,10 @@ def create_message(sender_id: int, recipient_id: int, text: str) -> dict:
 def get_message(message_id: int) -> Optional[dict]:
     conn = get_conn()
     try:
-        row = conn.execute("SELECT * FROM messages WHERE id=?", (int(message_id),)).fetchone()
-        return _row_to_dict(row) if row else None
+        row = _get_partitioned(conn, "messages", int(message_id))
+        if not row or _any_tombstoned(conn, row["sender_id"], row["recipient_id"]):
+            return None
+        return _epoch_row_to_dict(row)
     finally:
         conn.close()
 
@@ -1094,16 +2403,17 @@ def get_message(message_id: int) -> Optional[dict]:
 def list_thread(user_a: int, user_b: int, limit: int = 200) -> List[dict]:
     conn = get_conn()
     try:
-        rows = conn.execute(
-            """
-            SELECT * FROM messages
-            WHERE (sender_id=? AND recipient_id=?) OR (sender_id=? AND recipient_id=?)
-            ORDER BY id ASC
-            LIMIT ?
-            """,
-            (int(user_a), int(user_b), int(user_b), int(user_a), int(limit)),
-        ).fetchall()
-        return [_row_to_dict(r) for r in rows]
+        if _any_tombstoned(conn, user_a, user_b):
+            return []
+        rows = _select_partitioned(
+            conn,
+            "messages",
+            "(sender_id=? AND recipient_id=?) OR (sender_id=? AND recipient_id=?)",
+            (int(user_a), int(user_b), int(user_b), int(user_a)),
+            limit=int(limit),
+            newest_first=False,
+        )
+        return [_epoch_row_to_dict(r) for r in rows]
     finally:
         conn.close()
 
@@ -1115,38 +2425,52 @@ def list_contacts_for_user(user_id: int) -> List[dict]:
 
 # ---- Notifications ----
 
+def _insert_notification(
+    conn: sqlite3.Connection, user_id: int, notif_type: str, icon: str, title: str, content: str,
+    link: Optional[str], group_count: int = 1,
+) -> int:
+    conn.execute(
+        "INSERT INTO notifications(user_id,notif_type,icon,title,content,link,created_at,is_read,group_count) "
+        "VALUES (?,?,?,?,?,?,?,0,?)",
+        (user_id, notif_type, icon, title, content, link, utcnow_ms(), group_count),
+    )
+    nid = conn.execute("SELECT last_insert_rowid() AS id").fetchone()["id"]
+    _bump_unread(conn, user_id, "notifications", 1)
+    return nid
+
+
+@_serialized_write
 def create_notification(user_id: int, notif_type: str, icon: str, title: str, content: str, link: Optional[str] = None) -> dict:
     conn = get_conn()
     try:
-        created_at = utcnow_iso()
-        conn.execute(
-            "INSERT INTO notifications(user_id,notif_type,icon,title,content,link,created_at,is_read) VALUES (?,?,?,?,?,?,?,0)",
-            (int(user_id), notif_type, icon, title, content, link, created_at),
-        )
+        nid = _insert_notification(conn, int(user_id), notif_type, icon, title, content, link)
         conn.commit()
-        nid = conn.execute("SELECT last_insert_rowid() AS id").fetchone()["id"]
         return get_notification(nid)
     finally:
         conn.close()
 
 
+def _notification_to_api(d: dict) -> dict:
+    return {
+        "id": d["id"],
+        "type": d.get("notif_type"),
+        "icon": d.get("icon"),
+        "title": d.get("title"),
+        "content": d.get("content"),
+        "link": d.get("link"),
+        "time": ms_to_iso(d.get("updated_at") or d.get("created_at")),
+        "isRead": bool(d.get("is_read")),
+        "count": d.get("group_count") or 1,
+    }
+
+
 def get_notification(notif_id: int) -> Optional[dict]:
     conn = get_conn()
     try:
-        row = conn.execute("SELECT * FROM notifications WHERE id=?", (int(notif_id),)).fetchone()
+        row = _get_partitioned(conn, "notifications", int(notif_id))
         if not row:
             return None
-        d = _row_to_dict(row)
-        return {
-            "id": d["id"],
-            "type": d.get("notif_type"),
-            "icon": d.get("icon"),
-            "title": d.get("title"),
-            "content": d.get("content"),
-            "link": d.get("link"),
-            "time": d.get("created_at"),
-            "isRead": bool(d.get("is_read")),
-        }
+        return _notification_to_api(_row_to_dict(row))
     finally:
         conn.close()
 
@@ -1154,88 +2478,1378 @@ def get_notification(notif_id: int) -> Optional[dict]:
 def list_notifications(user_id: int, limit: int = 50) -> List[dict]:
     conn = get_conn()
     try:
-        rows = conn.execute(
-            "SELECT id FROM notifications WHERE user_id=? ORDER BY id DESC LIMIT ?",
-            (int(user_id), int(limit)),
-        ).fetchall()
-        out = []
-        for r in rows:
-            n = get_notification(r["id"])
-            if n:
-                out.append(n)
-        return out
+        rows = _select_partitioned(conn, "notifications", "user_id=?", (int(user_id),), limit=int(limit), newest_first=True)
+        return [_notification_to_api(_row_to_dict(r)) for r in rows]
     finally:
         conn.close()
 
 
+@_serialized_write
 def mark_all_notifications_read(user_id: int) -> None:
     conn = get_conn()
     try:
         conn.execute("UPDATE notifications SET is_read=1 WHERE user_id=?", (int(user_id),))
+        for name in _archive_partitions(conn, "notifications"):
+            conn.execute(f"UPDATE archive.{name} SET is_read=1 WHERE user_id=? AND is_read=0", (int(user_id),))
+        _reset_unread(conn, int(user_id), "notifications")
         conn.commit()
     finally:
         conn.close()
 
 
+@_serialized_write
 def clear_notifications(user_id: int) -> None:
     conn = get_conn()
     try:
         conn.execute("DELETE FROM notifications WHERE user_id=?", (int(user_id),))
+        for name in _archive_partitions(conn, "notifications"):
+            conn.execute(f"DELETE FROM archive.{name} WHERE user_id=?", (int(user_id),))
+        _reset_unread(conn, int(user_id), "notifications")
         conn.commit()
+        on_commit(_schedule_incremental_vacuum)
     finally:
         conn.close()
 
 
-# ---- Reports ----
+# ---- Notification coalescing / digests ----
+#
+# notify() sits in front of create_notification(): an unread notification with
+# the same (user, type, link) touched within NOTIFY_COALESCE_WINDOW_S is
+# updated in place (group_count, title, content) instead of adding a row, and
+# the caller only pushes notification:new when a row was created. Low-priority
+# notifications are queued in notification_digest and rolled into one 'digest'
+# notification per user by flush_notification_digests().
 
-def create_report(reporter_id: int, target_user_id: int, reason: str, details: str) -> dict:
-    conn = get_conn()
-    try:
-        created_at = utcnow_iso()
-        conn.execute(
-            "INSERT INTO reports(reporter_id,target_user_id,reason,details,status,created_at) VALUES (?,?,?,?, 'pending', ?)",
-            (int(reporter_id), int(target_user_id), reason, details, created_at),
-        )
-        conn.commit()
-        rid = conn.execute("SELECT last_insert_rowid() AS id").fetchone()["id"]
-        return get_report(rid)
-    finally:
-        conn.close()
+NOTIFY_COALESCE_WINDOW_S = 120
+DIGEST_INTERVAL_S = 3600.0
+DIGEST_MAX_LINES = 5
 
 
-def get_report(report_id: int) -> Optional[dict]:
+@_serialized_write
+def notify(
+    user_id: int,
+    notif_type: str,
+    icon: str,
+    title: str,
+    content: str,
+    link: Optional[str] = None,
+    *,
+    group_title: Optional[str] = None,
+    priority: str = "normal",
+) -> Tuple[Optional[dict], bool]:
+    """Create or coalesce a notification; returns (notification, created).
+
+    group_title is formatted with {count} once a row holds more than one
+    notification (e.g. "{count} new messages from David"). priority="low"
+    queues the notification for the next digest and returns (None, False).
+    """
+    uid = int(user_id)
     conn = get_conn()
     try:
-        row = conn.execute("SELECT * FROM reports WHERE id=?", (int(report_id),)).fetchone()
-        if not row:
-            return None
-        d = _row_to_dict(row)
-        d["reporter"] = get_user_public(d["reporter_id"])
-        d["target_user"] = get_user_public(d["target_user_id"])
-        return d
+        now = utcnow_ms()
+        if priority == "low":
+            conn.execute(
+                "INSERT INTO notification_digest(user_id,notif_type,title,content,link,created_at) VALUES (?,?,?,?,?,?)",
+                (uid, notif_type, title, content, link, now),
+            )
+            conn.commit()
+            return None, False
+
+        row = conn.execute(
+            """
+            SELECT id, group_count FROM notifications
+            WHERE user_id=? AND notif_type=? AND link IS ? AND is_read=0
+              AND COALESCE(updated_at, created_at) >= ?
+            ORDER BY id DESC LIMIT 1
+            """,
+            (uid, notif_type, link, now - NOTIFY_COALESCE_WINDOW_S * 1000),
+        ).fetchone()
+        if row is None:
+            nid = _insert_notification(conn, uid, notif_type, icon, title, content, link)
+            created = True
+        else:
+            nid, count = row["id"], row["group_count"] + 1
+            merged_title = group_title.format(count=count) if group_title else f"{title} ({count})"
+            conn.execute(
+                "UPDATE notifications SET group_count=?, title=?, content=?, updated_at=? WHERE id=?",
+                (count, merged_title, content, now, nid),
+            )
+            created = False
+        conn.commit()
+        return get_notification(nid), created
     finally:
         conn.close()
 
 
-def list_reports(limit: int = 100) -> List[dict]:
+@_serialized_write
+def flush_notification_digests(max_lines: int = DIGEST_MAX_LINES) -> List[dict]:
+    """Roll each user's queued low-priority notifications into one digest notification."""
     conn = get_conn()
     try:
-        rows = conn.execute("SELECT id FROM reports ORDER BY id DESC LIMIT ?", (int(limit),)).fetchall()
-        out = []
+        rows = conn.execute(
+            "SELECT id, user_id, title FROM notification_digest ORDER BY user_id, id"
+        ).fetchall()
+        if not rows:
+            return []
+        by_user: Dict[int, List[str]] = {}
         for r in rows:
-            rep = get_report(r["id"])
-            if rep:
-                out.append(rep)
-        return out
+            by_user.setdefault(r["user_id"], []).append(r["title"])
+        nids = []
+        for uid, titles in by_user.items():
+            lines = titles[-max_lines:]
+            if len(titles) > len(lines):
+                lines.append(f"...and {len(titles) - len(lines)} more")
+            nids.append(_insert_notification(
+                conn, uid, "digest", "📬", f"{len(titles)} update{'s' if len(titles) != 1 else ''} since your last digest",
+                "\n".join(lines), None, group_count=len(titles),
+            ))
+        conn.execute("DELETE FROM notification_digest WHERE id<=?", (max(r["id"] for r in rows),))
+        conn.commit()
+        return [n for n in (get_notification(nid) for nid in nids) if n is not None]
     finally:
         conn.close()
 
 
-def update_report_status(report_id: int, status: str) -> Optional[dict]:
-    conn = get_conn()
-    try:
-        conn.execute("UPDATE reports SET status=? WHERE id=?", (status, int(report_id)))
-        conn.commit()
+def start_digest_flusher(interval_s: float = DIGEST_INTERVAL_S) -> threading.Event:
+    """Run flush_notification_digests() every interval_s on a daemon thread.
+
+    Set the returned Event to stop it.
+    """
+    stop = threading.Event()
+
+    def _loop() -> None:
+        while not stop.wait(interval_s):
+            try:
+                flush_notification_digests()
+            except Exception:
+                pass
+
+    threading.Thread(target=_loop, name="digest-flusher", daemon=True).start()
+    return stop
+
+
+# ---- Unread badge counters ----
+#
+# unread_counters holds one row per user. create_message / create_notification,
+# mark_thread_read, mark_all_notifications_read, clear_notifications and
+# delete_user keep it in step inside their own transaction, so badges never
+# need to scan messages/notifications.
+
+_UNREAD_COLUMNS = ("messages", "notifications")
+
+
+def _bump_unread(conn: sqlite3.Connection, user_id: int, column: str, delta: int) -> None:
+    if column not in _UNREAD_COLUMNS:
+        raise ValueError(f"Unknown unread counter: {column}")
+    conn.execute(
+        f"""
+        INSERT INTO unread_counters(user_id, {column}) VALUES (?, MAX(0, ?))
+        ON CONFLICT(user_id) DO UPDATE SET {column} = MAX(0, {column} + ?)
+        """,
+        (int(user_id), int(delta), int(delta)),
+    )
+
+
+def _reset_unread(conn: sqlite3.Connection, user_id: int, column: str) -> None:
+    if column not in _UNREAD_COLUMNS:
+        raise ValueError(f"Unknown unread counter: {column}")
+    conn.execute(f"UPDATE unread_counters SET {column}=0 WHERE user_id=?", (int(user_id),))
+
+
+def get_badges(user_id: int) -> dict:
+    """Unread counts for the header badges (single primary-key lookup)."""
+    conn = get_conn()
+    try:
+        row = conn.execute(
+            "SELECT messages, notifications FROM unread_counters WHERE user_id=?",
+            (int(user_id),),
+        ).fetchone()
+        return {
+            "messages": int(row["messages"]) if row else 0,
+            "notifications": int(row["notifications"]) if row else 0,
+        }
+    finally:
+        conn.close()
+
+
+@_serialized_write
+def mark_thread_read(user_id: int, other_user_id: int) -> int:
+    """Mark every message from other_user_id to user_id as read; returns how many changed."""
+    conn = get_conn()
+    try:
+        where = "sender_id=? AND recipient_id=? AND is_read=0"
+        params = (int(other_user_id), int(user_id))
+        changed = conn.execute(f"UPDATE messages SET is_read=1 WHERE {where}", params).rowcount
+        for name in _archive_partitions(conn, "messages"):
+            changed += conn.execute(f"UPDATE archive.{name} SET is_read=1 WHERE {where}", params).rowcount
+        # A tombstoned sender's unread messages were already taken off the badge by delete_user.
+        if changed and not _any_tombstoned(conn, int(other_user_id)):
+            _bump_unread(conn, int(user_id), "messages", -changed)
+        conn.commit()
+        return changed
+    finally:
+        conn.close()
+
+
+def _discount_unread_from_sender(conn: sqlite3.Connection, sender_id: int) -> None:
+    """Before a sender is deleted, drop their unread messages from recipients' badges."""
+    tables = ["main.messages"] + [f"archive.{name}" for name in _archive_partitions(conn, "messages")]
+    per_recipient: Dict[int, int] = {}
+    for table in tables:
+        for r in conn.execute(
+            f"SELECT recipient_id, COUNT(*) AS c FROM {table} WHERE sender_id=? AND is_read=0 GROUP BY recipient_id",
+            (int(sender_id),),
+        ).fetchall():
+            per_recipient[int(r["recipient_id"])] = per_recipient.get(int(r["recipient_id"]), 0) + int(r["c"])
+    for recipient_id, count in per_recipient.items():
+        _bump_unread(conn, recipient_id, "messages", -count)
+
+
+# ---- Reports ----
+
+@_serialized_write
+def create_report(reporter_id: int, target_user_id: int, reason: str, details: str) -> dict:
+    conn = get_conn()
+    try:
+        created_at = utcnow_iso()
+        conn.execute(
+            "INSERT INTO reports(reporter_id,target_user_id,reason,details,status,created_at) VALUES (?,?,?,?, 'pending', ?)",
+            (int(reporter_id), int(target_user_id), reason, details, created_at),
+        )
+        conn.commit()
+        rid = conn.execute("SELECT last_insert_rowid() AS id").fetchone()["id"]
+        return get_report(rid)
     finally:
         conn.close()
-    return get_report(report_id)
\ No newline at end of file
+
+
+def get_report(report_id: int) -> Optional[dict]:
+    conn = get_conn()
+    try:
+        row = conn.execute("SELECT * FROM reports WHERE id=?", (int(report_id),)).fetchone()
+        if not row:
+            return None
+        d = _row_to_dict(row)
+        d["reporter"] = get_user_public(d["reporter_id"])
+        d["target_user"] = get_user_public(d["target_user_id"])
+        if d["reporter"] is None or d["target_user"] is None:
+            return None  # tombstoned party; purged with the user
+        return d
+    finally:
+        conn.close()
+
+
+def list_reports(limit: int = 100, status: Optional[str] = None) -> List[dict]:
+    conn = get_conn()
+    try:
+        live = f"reporter_id NOT IN {_TOMBSTONED_USERS} AND target_user_id NOT IN {_TOMBSTONED_USERS}"
+        if status:
+            rows = conn.execute(
+                f"SELECT * FROM reports WHERE status=? AND {live} ORDER BY id DESC LIMIT ?", (status, int(limit))
+            ).fetchall()
+        else:
+            rows = conn.execute(f"SELECT * FROM reports WHERE {live} ORDER BY id DESC LIMIT ?", (int(limit),)).fetchall()
+        users = _public_users_by_id(conn, [r["reporter_id"] for r in rows] + [r["target_user_id"] for r in rows])
+        out = []
+        for r in rows:
+            d = _row_to_dict(r)
+            d["reporter"] = users.get(int(d["reporter_id"]))
+            d["target_user"] = users.get(int(d["target_user_id"]))
+            if d["reporter"] is not None and d["target_user"] is not None:
+                out.append(d)
+        return out
+    finally:
+        conn.close()
+
+
+SYSTEM_REPORTER_EMAIL = "moderation@generationbridge.system"
+
+
+def _system_reporter_id(conn: sqlite3.Connection) -> int:
+    """The account automatic reports are filed under (created on first use, can't log in)."""
+    row = conn.execute("SELECT id FROM users WHERE email=?", (SYSTEM_REPORTER_EMAIL,)).fetchone()
+    if row:
+        return int(row["id"])
+    conn.execute(
+        "INSERT INTO users(full_name,email,password,generation,bio,avatar,show_in_matchup,is_system) "
+        "VALUES (?,?,?,?,?,?,0,1)",
+        ("Auto-moderation", SYSTEM_REPORTER_EMAIL, secrets.token_urlsafe(32), "", "Automatic content scanning", "🤖"),
+    )
+    return int(conn.execute("SELECT last_insert_rowid() AS id").fetchone()["id"])
+
+
+@_serialized_write
+def create_system_reports(flags: List[dict]) -> List[dict]:
+    """File one pending report per flagged item; items already reported are skipped.
+
+    Each flag is {"kind", "id", "author_id", "reason", "details"}. Returns the
+    new reports (get_report shape).
+    """
+    if not flags:
+        return []
+    conn = get_conn()
+    try:
+        reporter = _system_reporter_id(conn)
+        created_at = utcnow_iso()
+        rids = []
+        for f in flags:
+            # SELECT ... WHERE EXISTS: the author may have been deleted (or tombstoned) since the item was scanned
+            cur = conn.execute(
+                "INSERT OR IGNORE INTO reports(reporter_id,target_user_id,reason,details,status,created_at,"
+                "content_kind,content_id) SELECT ?,?,?,?, 'pending', ?,?,? "
+                "WHERE EXISTS (SELECT 1 FROM users WHERE id=? AND deleted_at IS NULL)",
+                (reporter, int(f["author_id"]), f["reason"], f.get("details"), created_at, f["kind"], int(f["id"]),
+                 int(f["author_id"])),
+            )
+            if cur.rowcount:
+                rids.append(cur.lastrowid)
+        conn.commit()
+        return [r for r in (get_report(rid) for rid in rids) if r is not None]
+    finally:
+        conn.close()
+
+
+@_serialized_write
+def update_report_status(report_id: int, status: str) -> Optional[dict]:
+    conn = get_conn()
+    try:
+        conn.execute("UPDATE reports SET status=? WHERE id=?", (status, int(report_id)))
+        conn.commit()
+    finally:
+        conn.close()
+    return get_report(report_id)
+
+
+# ---- Archive (time-partitioned history) ----
+#
+# messages / notifications / login_events rows older than the horizon move into
+# per-month partitions (e.g. archive.messages_2025_01) inside the attached
+# archive database (DB.archive_path). Reads stay transparent via
+# _select_partitioned / _get_partitioned.
+
+# Archived table -> columns naming the owning user(s); indexed in each partition.
+_ARCHIVED_TABLES: Dict[str, Tuple[str, ...]] = {
+    "messages": ("sender_id", "recipient_id"),
+    "notifications": ("user_id",),
+    "login_events": ("user_id",),
+}
+
+_MONTH_RE = re.compile(r"^\d{4}-\d{2}$")
+
+
+def _archive_partitions(conn: sqlite3.Connection, base_table: str, newest_first: bool = True) -> List[str]:
+    if not getattr(conn, "archive_attached", False):
+        return []
+    order = "DESC" if newest_first else "ASC"
+    rows = conn.execute(
+        f"SELECT table_name FROM archive.archive_partitions WHERE base_table=? ORDER BY month {order}",
+        (base_table,),
+    ).fetchall()
+    return [r["table_name"] for r in rows]
+
+
+def _select_partitioned(
+    conn: sqlite3.Connection,
+    base_table: str,
+    where_sql: str,
+    params: tuple,
+    *,
+    limit: int,
+    newest_first: bool,
+    columns: str = "*",
+    raw: bool = False,
+) -> List[sqlite3.Row]:
+    """Page through the hot table and its archive partitions in id order.
+
+    Newest-first reads hit the hot table first and only open archive partitions
+    when the page is not full yet; oldest-first reads walk them in reverse.
+    raw=True returns plain tuples (no sqlite3.Row) in `columns` order.
+    """
+    order = "DESC" if newest_first else "ASC"
+    rows: List[sqlite3.Row] = []
+
+    def _take(table: str) -> None:
+        cur = conn.execute(
+            f"SELECT {columns} FROM {table} WHERE {where_sql} ORDER BY id {order} LIMIT ?",
+            (*params, limit - len(rows)),
+        )
+        if raw:
+            cur.row_factory = None
+        rows.extend(cur.fetchall())
+
+    if newest_first:
+        _take(f"main.{base_table}")
+        if len(rows) < limit:
+            for name in _archive_partitions(conn, base_table, newest_first=True):
+                _take(f"archive.{name}")
+                if len(rows) >= limit:
+                    break
+    else:
+        for name in _archive_partitions(conn, base_table, newest_first=False):
+            _take(f"archive.{name}")
+            if len(rows) >= limit:
+                break
+        if len(rows) < limit:
+            _take(f"main.{base_table}")
+    return rows
+
+
+def _get_partitioned(conn: sqlite3.Connection, base_table: str, row_id: int) -> Optional[sqlite3.Row]:
+    row = conn.execute(f"SELECT * FROM main.{base_table} WHERE id=?", (row_id,)).fetchone()
+    if row:
+        return row
+    for name in _archive_partitions(conn, base_table):
+        row = conn.execute(f"SELECT * FROM archive.{name} WHERE id=?", (row_id,)).fetchone()
+        if row:
+            return row
+    return None
+
+
+def _purge_archived_user(conn: sqlite3.Connection, user_id: int) -> None:
+    """Archive partitions have no foreign keys; mirror the ON DELETE CASCADE."""
+    for base_table, owner_cols in _ARCHIVED_TABLES.items():
+        where = " OR ".join(f"{c}=?" for c in owner_cols)
+        for name in _archive_partitions(conn, base_table):
+            conn.execute(f"DELETE FROM archive.{name} WHERE {where}", (user_id,) * len(owner_cols))
+
+
+def _ensure_partition(conn: sqlite3.Connection, base_table: str, month: str) -> Tuple[str, List[str]]:
+    """Create archive.<base>_<YYYY_MM> if needed; return (name, shared columns)."""
+    name = f"{base_table}_{month.replace('-', '_')}"
+    info = conn.execute(f"PRAGMA main.table_info({base_table})").fetchall()
+    if not conn.execute("SELECT 1 FROM archive.archive_partitions WHERE table_name=?", (name,)).fetchone():
+        defs = ", ".join(f"{r['name']} {r['type']}" + (" PRIMARY KEY" if r["pk"] else "") for r in info)
+        conn.execute(f"CREATE TABLE IF NOT EXISTS archive.{name} ({defs})")
+        for col in _ARCHIVED_TABLES[base_table]:
+            conn.execute(f"CREATE INDEX IF NOT EXISTS archive.idx_{name}_{col} ON {name}({col})")
+        conn.execute(
+            "INSERT INTO archive.archive_partitions(table_name,base_table,month,row_count) VALUES (?,?,?,0)",
+            (name, base_table, month),
+        )
+    part_cols = {r["name"] for r in conn.execute(f"PRAGMA archive.table_info({name})").fetchall()}
+    return name, [r["name"] for r in info if r["name"] in part_cols]
+
+
+@_serialized_write
+def _archive_month(base_table: str, month: str, cutoff_ms: int) -> int:
+    conn = get_conn()
+    try:
+        if not getattr(conn, "archive_attached", False):
+            raise RuntimeError("Archive database not attached; call init_db(app) first")
+        name, cols = _ensure_partition(conn, base_table, month)
+        col_sql = ",".join(cols)
+        where = "created_at < ? AND strftime('%Y-%m', created_at / 1000, 'unixepoch')=?"
+        conn.execute(
+            f"INSERT OR IGNORE INTO archive.{name}({col_sql}) SELECT {col_sql} FROM main.{base_table} WHERE {where}",
+            (cutoff_ms, month),
+        )
+        moved = conn.execute(f"DELETE FROM main.{base_table} WHERE {where}", (cutoff_ms, month)).rowcount
+        conn.execute(
+            "UPDATE archive.archive_partitions SET row_count=row_count+? WHERE table_name=?",
+            (moved, name),
+        )
+        conn.commit()
+        return moved
+    finally:
+        conn.close()
+
+
+def archive_old_rows(horizon_days: Optional[int] = None) -> Dict[str, int]:
+    """Move rows older than the horizon into monthly archive partitions.
+
+    Each (table, month) chunk is its own writer job, so normal writes interleave
+    with a large archival run. Returns rows moved per table.
+    """
+    days = int(horizon_days if horizon_days is not None else _db.archive_horizon_days)
+    cutoff_ms = utcnow_ms() - days * 86_400_000
+    moved: Dict[str, int] = {}
+    for base_table in _ARCHIVED_TABLES:
+        conn = get_conn()
+        try:
+            months = [
+                r[0]
+                for r in conn.execute(
+                    f"SELECT DISTINCT strftime('%Y-%m', created_at / 1000, 'unixepoch') FROM main.{base_table} "
+                    "WHERE created_at < ?",
+                    (cutoff_ms,),
+                ).fetchall()
+            ]
+        finally:
+            conn.close()
+        moved[base_table] = sum(_archive_month(base_table, m, cutoff_ms) for m in months if m and _MONTH_RE.match(m))
+    return moved
+
+
+def _file_bytes(conn: sqlite3.Connection, schema: str) -> int:
+    page_count = conn.execute(f"PRAGMA {schema}.page_count").fetchone()[0]
+    page_size = conn.execute(f"PRAGMA {schema}.page_size").fetchone()[0]
+    return int(page_count) * int(page_size)
+
+
+def compact_db(horizon_days: Optional[int] = None) -> dict:
+    """Archive old rows, then VACUUM the hot database and report space reclaimed."""
+    conn = _db.connect()  # VACUUM cannot run inside the writer's batch transaction
+    try:
+        before = _file_bytes(conn, "main")
+        moved = archive_old_rows(horizon_days)
+        conn.execute("VACUUM main")
+        conn.execute("PRAGMA main.wal_checkpoint(TRUNCATE)")
+        after = _file_bytes(conn, "main")
+        archive_bytes = _file_bytes(conn, "archive") if conn.archive_attached else 0
+    finally:
+        conn.close()
+    return {
+        "moved": moved,
+        "bytes_before": before,
+        "bytes_after": after,
+        "reclaimed_bytes": before - after,
+        "archive_bytes": archive_bytes,
+    }
+
+
+# ---- Incremental vacuum / storage report ----
+#
+# With auto_vacuum=INCREMENTAL, pages freed by bulk deletes (clear_notifications,
+# delete_user) sit on the freelist until _vacuum_step() hands them back,
+# VACUUM_STEP_PAGES at a time. Each step is its own writer job, so regular
+# writes interleave with a large reclaim.
+
+_vacuum_lock = threading.Lock()
+_vacuum_scheduled = False
+
+
+def _vacuum_step() -> int:
+    """One bounded incremental vacuum; returns the pages still free."""
+    conn = get_conn()
+    try:
+        conn.execute(f"PRAGMA main.incremental_vacuum({VACUUM_STEP_PAGES})").fetchall()
+        return int(conn.execute("PRAGMA main.freelist_count").fetchone()[0])
+    finally:
+        conn.close()
+
+
+def _vacuum_chain() -> None:
+    global _vacuum_scheduled
+    remaining = 0
+    try:
+        remaining = _vacuum_step()
+    finally:
+        with _vacuum_lock:
+            if remaining:
+                submit_write(_vacuum_chain)
+            else:
+                _vacuum_scheduled = False
+
+
+def _schedule_incremental_vacuum() -> None:
+    global _vacuum_scheduled
+    with _vacuum_lock:
+        if _vacuum_scheduled:
+            return
+        _vacuum_scheduled = True
+    submit_write(_vacuum_chain)
+
+
+def reclaim_free_pages(max_steps: Optional[int] = None) -> int:
+    """Maintenance: run up to max_steps vacuum steps now; returns pages still free."""
+    steps, remaining = 0, 1
+    while remaining and (max_steps is None or steps < max_steps):
+        remaining = submit_write(_vacuum_step).result()
+        steps += 1
+    return remaining
+
+
+def storage_report() -> dict:
+    """File size, free bytes, and bytes per table / index (dbstat when available)."""
+    conn = _db.connect_readonly()
+    try:
+        page_size = int(conn.execute("PRAGMA main.page_size").fetchone()[0])
+        report = {
+            "db_bytes": page_size * int(conn.execute("PRAGMA main.page_count").fetchone()[0]),
+            "free_bytes": page_size * int(conn.execute("PRAGMA main.freelist_count").fetchone()[0]),
+            "tables": {},
+            "indexes": {},
+        }
+        try:
+            rows = conn.execute(
+                """
+                SELECT s.name AS name, m.type AS type, SUM(s.pgsize) AS bytes
+                FROM dbstat('main') s LEFT JOIN main.sqlite_master m ON m.name=s.name
+                GROUP BY s.name ORDER BY bytes DESC
+                """
+            ).fetchall()
+        except sqlite3.OperationalError:  # SQLite built without SQLITE_ENABLE_DBSTAT_VTAB
+            rows = []
+        for r in rows:
+            kind = "indexes" if r["type"] == "index" or r["name"].startswith("sqlite_autoindex") else "tables"
+            report[kind][r["name"]] = int(r["bytes"])
+        report["table_bytes"] = sum(report["tables"].values())
+        report["index_bytes"] = sum(report["indexes"].values())
+        return report
+    finally:
+        conn.close()
+
+
+# ---- Soft delete / background purge ----
+#
+# delete_user / delete_story / delete_skillswap_post only set deleted_at and
+# queue a purge_tasks row, so the admin's request and the writer are done in
+# a millisecond. Read helpers filter tombstones (deleted_at IS NULL, or the
+# author / other party not in _TOMBSTONED_USERS). purge_pending() then removes
+# what ON DELETE CASCADE used to, child tables first, PURGE_BATCH rows per
+# write with PURGE_YIELD_S between chunks, and finally the row itself. A task's
+# step / rows_purged / rows_total is its progress (list_purge_tasks()).
+# Until then the materialized counts (admin_stats, comments_count) still
+# include the tombstoned rows.
+
+PURGE_BATCH = 500
+PURGE_YIELD_S = 0.01
+PURGE_INTERVAL_S = 60.0
+
+_TOMBSTONED_USERS = "(SELECT id FROM users WHERE deleted_at IS NOT NULL)"
+
+# entity -> ordered (table, predicate on the entity id); "archive" = the user's archived rows
+_PURGE_PLANS: Dict[str, Tuple[Tuple[str, str], ...]] = {
+    "user": (
+        ("story_comments", "story_id IN (SELECT id FROM stories WHERE user_id=?)"),
+        ("story_comments", "user_id=?"),
+        ("stories", "user_id=?"),
+        ("skillswap_comments", "post_id IN (SELECT id FROM skillswap_posts WHERE user_id=?)"),
+        ("skillswap_comments", "user_id=?"),
+        ("skillswap_posts", "user_id=?"),
+        ("messages", "sender_id=?"),
+        ("messages", "recipient_id=?"),
+        ("notifications", "user_id=?"),
+        ("notification_digest", "user_id=?"),
+        ("reports", "reporter_id=?"),
+        ("reports", "target_user_id=?"),
+        ("event_rsvps", "user_id=?"),
+        ("user_interests", "user_id=?"),
+        ("unread_counters", "user_id=?"),
+        ("archive", ""),
+        ("users", "id=?"),
+    ),
+    "story": (
+        ("story_comments", "story_id=?"),
+        ("stories", "id=?"),
+    ),
+    "skillswap_post": (
+        ("skillswap_comments", "post_id=?"),
+        ("skillswap_posts", "id=?"),
+    ),
+}
+
+_purge_wakeup = threading.Event()
+
+
+def _any_tombstoned(conn: sqlite3.Connection, *user_ids: int) -> bool:
+    ids = [int(u) for u in user_ids]
+    marks = ",".join("?" * len(ids))
+    return conn.execute(
+        f"SELECT 1 FROM users WHERE id IN ({marks}) AND deleted_at IS NOT NULL LIMIT 1", ids
+    ).fetchone() is not None
+
+
+def _queue_purge(conn: sqlite3.Connection, entity: str, entity_id: int) -> None:
+    conn.execute(
+        "INSERT OR IGNORE INTO purge_tasks(entity, entity_id, requested_at) VALUES (?,?,?)",
+        (entity, int(entity_id), utcnow_ms()),
+    )
+    on_commit(_purge_wakeup.set)
+
+
+def _purge_task_to_api(d: dict) -> dict:
+    plan = _PURGE_PLANS.get(d["entity"], ())
+    step = int(d["step"])
+    total = d.get("rows_total")
+    d["steps"] = len(plan)
+    d["current_table"] = plan[step][0] if step < len(plan) else None
+    d["done"] = d.get("finished_at") is not None
+    d["percent"] = 100.0 if d["done"] else (
+        round(min(99.9, 100.0 * d["rows_purged"] / total), 1) if total else 0.0
+    )
+    return d
+
+
+def list_purge_tasks(limit: int = 50, *, pending_only: bool = False) -> List[dict]:
+    """Purge progress for the admin dashboard, newest first."""
+    conn = get_conn()
+    try:
+        where_sql = "WHERE finished_at IS NULL " if pending_only else ""
+        rows = conn.execute(
+            f"SELECT * FROM purge_tasks {where_sql}ORDER BY id DESC LIMIT ?", (int(limit),)
+        ).fetchall()
+        return [_purge_task_to_api(_row_to_dict(r)) for r in rows]
+    finally:
+        conn.close()
+
+
+def get_purge_task(task_id: int) -> Optional[dict]:
+    conn = get_conn()
+    try:
+        row = conn.execute("SELECT * FROM purge_tasks WHERE id=?", (int(task_id),)).fetchone()
+        return _purge_task_to_api(_row_to_dict(row)) if row else None
+    finally:
+        conn.close()
+
+
+def _count_purge_rows(entity: str, entity_id: int) -> int:
+    conn = get_conn()
+    try:
+        total = 0
+        for table, where in _PURGE_PLANS[entity]:
+            if table == "archive":
+                for base_table, owner_cols in _ARCHIVED_TABLES.items():
+                    pred = " OR ".join(f"{c}=?" for c in owner_cols)
+                    for name in _archive_partitions(conn, base_table):
+                        total += conn.execute(
+                            f"SELECT COUNT(*) FROM archive.{name} WHERE {pred}", (entity_id,) * len(owner_cols)
+                        ).fetchone()[0]
+            else:
+                total += conn.execute(f"SELECT COUNT(*) FROM {table} WHERE {where}", (entity_id,)).fetchone()[0]
+        return int(total)
+    finally:
+        conn.close()
+
+
+@_serialized_write
+def _set_purge_total(task_id: int, total: int) -> None:
+    conn = get_conn()
+    try:
+        conn.execute("UPDATE purge_tasks SET rows_total=? WHERE id=?", (int(total), int(task_id)))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+@_serialized_write
+def _purge_chunk(task_id: int, batch_size: int = PURGE_BATCH) -> bool:
+    """Delete up to batch_size rows of the task's current step; True once the task is finished."""
+    conn = get_conn()
+    try:
+        task = conn.execute("SELECT * FROM purge_tasks WHERE id=?", (int(task_id),)).fetchone()
+        if task is None or task["finished_at"] is not None:
+            return True
+        plan = _PURGE_PLANS[task["entity"]]
+        step, entity_id = int(task["step"]), int(task["entity_id"])
+        table, where = plan[step]
+        if table == "archive":
+            deleted = 0
+            for base_table, owner_cols in _ARCHIVED_TABLES.items():
+                pred = " OR ".join(f"{c}=?" for c in owner_cols)
+                for name in _archive_partitions(conn, base_table):
+                    deleted += conn.execute(
+                        f"DELETE FROM archive.{name} WHERE {pred}", (entity_id,) * len(owner_cols)
+                    ).rowcount
+            step += 1
+        else:
+            deleted = conn.execute(
+                f"DELETE FROM {table} WHERE rowid IN (SELECT rowid FROM {table} WHERE {where} LIMIT ?)",
+                (entity_id, int(batch_size)),
+            ).rowcount
+            if deleted < batch_size:
+                step += 1
+        finished = step >= len(plan)
+        conn.execute(
+            "UPDATE purge_tasks SET step=?, rows_purged=rows_purged+?, finished_at=? WHERE id=?",
+            (step, deleted, utcnow_ms() if finished else None, int(task_id)),
+        )
+        conn.commit()
+        if finished and task["entity"] == "user":
+            on_commit(_schedule_incremental_vacuum)
+        return finished
+    finally:
+        conn.close()
+
+
+def purge_pending(
+    batch_size: int = PURGE_BATCH, yield_s: float = PURGE_YIELD_S, progress: Optional[Callable[[dict], None]] = None
+) -> int:
+    """Run every unfinished purge task to completion; returns the number finished.
+
+    Each chunk is its own short write, with yield_s between chunks so request
+    writes interleave. progress (optional) gets the task after every chunk.
+    """
+    conn = get_conn()
+    try:
+        tasks = [_row_to_dict(r) for r in conn.execute(
+            "SELECT * FROM purge_tasks WHERE finished_at IS NULL ORDER BY id"
+        ).fetchall()]
+    finally:
+        conn.close()
+    finished = 0
+    for task in tasks:
+        if task["rows_total"] is None:
+            _set_purge_total(task["id"], _count_purge_rows(task["entity"], int(task["entity_id"])))
+        while not _purge_chunk(task["id"], batch_size):
+            if progress is not None:
+                progress(get_purge_task(task["id"]))
+            time.sleep(yield_s)
+        if progress is not None:
+            progress(get_purge_task(task["id"]))
+        finished += 1
+    return finished
+
+
+def start_purger(
+    interval_s: float = PURGE_INTERVAL_S, progress: Optional[Callable[[dict], None]] = None
+) -> threading.Event:
+    """Run purge_pending() on a daemon thread, woken by each delete; set the returned Event to stop."""
+    stop = threading.Event()
+
+    def _loop() -> None:
+        while not stop.is_set():
+            _purge_wakeup.clear()
+            try:
+                purge_pending(progress=progress)
+            except Exception:
+                pass
+            _purge_wakeup.wait(interval_s)
+
+    threading.Thread(target=_loop, name="purger", daemon=True).start()
+    return stop
+
+
+# ---- Admin overview ----
+
+def get_admin_stats() -> dict:
+    """Materialized counts (live tables) plus last-24h activity from stats_hourly."""
+    conn = get_conn()
+    try:
+        counts = {r["key"]: int(r["value"]) for r in conn.execute("SELECT key, value FROM admin_stats").fetchall()}
+        row = conn.execute(
+            """
+            SELECT COALESCE(SUM(logins_ok),0) AS ok, COALESCE(SUM(logins_failed),0) AS failed,
+                   COALESCE(SUM(signups),0) AS signups
+            FROM stats_hourly
+            WHERE hour >= strftime('%Y-%m-%dT%H','now','-23 hours')
+            """
+        ).fetchone()
+        return {
+            "counts": {t: counts.get(t, 0) for t in _STAT_TABLES},
+            "reports_pending": counts.get("reports_pending", 0),
+            "logins_24h": int(row["ok"]),
+            "login_failures_24h": int(row["failed"]),
+            "signups_24h": int(row["signups"]),
+        }
+    finally:
+        conn.close()
+
+
+def get_admin_overview(page_size: int = 20) -> dict:
+    """Everything the admin dashboard renders on load, in one call.
+
+    Stats come from the materialized tables; each list is only its first page,
+    read with one query plus a batched author/interest fetch (no per-row lookups).
+    """
+    page_size = int(page_size or 20)
+    return {
+        "stats": get_admin_stats(),
+        "users": list_users(limit=page_size),
+        "matchup": list_users(only_matchup=True, limit=page_size),
+        "stories": list_stories(limit=page_size),
+        "skillswap": list_skillswap_posts(limit=page_size),
+        "reports": list_reports(limit=page_size, status="pending"),
+        "events": list_events(limit=page_size),
+        "purges": list_purge_tasks(limit=page_size),
+    }
+
+
+# ---- Chatbot suggestion cache ----
+#
+# Precomputed conversation-starter sets keyed by context (see suggestions.py);
+# expires_at is epoch milliseconds.
+
+def list_suggestion_contexts() -> List[Tuple[str, str]]:
+    """Distinct (generation, interest) pairs among active users; '' for none."""
+    conn = get_conn()
+    try:
+        rows = conn.execute(
+            """
+            SELECT DISTINCT COALESCE(u.generation,'') AS generation, COALESCE(ui.interest_name,'') AS interest
+            FROM users u LEFT JOIN user_interests ui ON ui.user_id=u.id
+            WHERE u.is_banned=0 AND u.is_system=0 AND u.deleted_at IS NULL
+            UNION
+            SELECT DISTINCT COALESCE(generation,''), '' FROM users WHERE is_banned=0 AND is_system=0 AND deleted_at IS NULL
+            ORDER BY 1, 2
+            """
+        ).fetchall()
+        return [(r[0], r[1]) for r in rows]
+    finally:
+        conn.close()
+
+
+def list_suggestion_sets() -> List[dict]:
+    conn = get_conn()
+    try:
+        rows = conn.execute("SELECT context_key, topics, expires_at FROM suggestion_cache").fetchall()
+        return [
+            {"context_key": r["context_key"], "topics": json.loads(r["topics"]), "expires_at": int(r["expires_at"])}
+            for r in rows
+        ]
+    finally:
+        conn.close()
+
+
+@_serialized_write
+def put_suggestion_set(context_key: str, topics: List[str], expires_at: int) -> None:
+    conn = get_conn()
+    try:
+        conn.execute(
+            "INSERT OR REPLACE INTO suggestion_cache(context_key, topics, expires_at) VALUES (?,?,?)",
+            (context_key, json.dumps(list(topics), ensure_ascii=False), int(expires_at)),
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+# ---- Durable job queue ----
+#
+# Side effects that don't need to finish inside the request (notifications,
+# pushes, login logging, LLM calls) are stored as jobs and run by jobs.py
+# workers. add_job(conn, ...) enqueues inside the caller's write, so the job
+# exists iff the caller's change committed; enqueue_job() is the standalone
+# variant.
+#
+# A job is ready when run_at <= now. lease_jobs() claims ready jobs by pushing
+# run_at out by the visibility timeout, so a job whose worker died becomes
+# ready again on its own. complete_job() deletes it; fail_job() reschedules
+# with exponential backoff, or moves it to jobs_dead after max_attempts.
+
+JOB_BACKOFF_BASE_S = 2.0
+JOB_BACKOFF_MAX_S = 3600.0
+JOB_VISIBILITY_S = 60.0
+
+_jobs_ready = threading.Event()  # set after a committed enqueue; wakes idle in-process workers
+
+
+def jobs_ready_event() -> threading.Event:
+    return _jobs_ready
+
+
+def add_job(
+    conn: sqlite3.Connection,
+    kind: str,
+    payload: Any = None,
+    *,
+    priority: int = 0,
+    delay_s: float = 0.0,
+    max_attempts: int = 5,
+) -> int:
+    """Enqueue a job in the caller's transaction (no commit); returns its id."""
+    now = utcnow_ms()
+    cur = conn.execute(
+        "INSERT INTO jobs(kind,payload,priority,run_at,max_attempts,created_at) VALUES (?,?,?,?,?,?)",
+        (kind, json.dumps(payload, ensure_ascii=False), int(priority), now + int(delay_s * 1000),
+         int(max_attempts), now),
+    )
+    on_commit(_jobs_ready.set)
+    return int(cur.lastrowid)
+
+
+@_serialized_write
+def enqueue_job(kind: str, payload: Any = None, *, priority: int = 0, delay_s: float = 0.0, max_attempts: int = 5) -> int:
+    conn = get_conn()
+    try:
+        job_id = add_job(conn, kind, payload, priority=priority, delay_s=delay_s, max_attempts=max_attempts)
+        conn.commit()
+        return job_id
+    finally:
+        conn.close()
+
+
+def _job_to_dict(row: sqlite3.Row) -> dict:
+    d = _row_to_dict(row)
+    d["payload"] = json.loads(d["payload"]) if d.get("payload") else None
+    return d
+
+
+@_serialized_write
+def lease_jobs(owner: str, limit: int = 1, visibility_s: float = JOB_VISIBILITY_S) -> List[dict]:
+    """Claim up to `limit` ready jobs, highest priority first, for visibility_s.
+
+    Jobs whose lease expired on their last allowed attempt (the worker died or
+    hung without acking or failing them) are dead-lettered here instead of
+    being handed out again.
+    """
+    conn = get_conn()
+    try:
+        now = utcnow_ms()
+        expired = "run_at<=? AND lease_owner IS NOT NULL AND attempts>=max_attempts"
+        conn.execute(
+            f"""
+            INSERT OR REPLACE INTO jobs_dead(id,kind,payload,priority,attempts,max_attempts,last_error,created_at,failed_at)
+            SELECT id, kind, payload, priority, attempts, max_attempts,
+                   'lease expired on attempt ' || attempts || ' (worker died or hung)', created_at, ?
+            FROM jobs WHERE {expired}
+            """,
+            (now, now),
+        )
+        conn.execute(f"DELETE FROM jobs WHERE {expired}", (now,))
+        rows = conn.execute(
+            """
+            UPDATE jobs SET lease_owner=?, run_at=?, attempts=attempts+1
+            WHERE id IN (
+                SELECT id FROM jobs WHERE run_at<=? ORDER BY priority DESC, run_at, id LIMIT ?
+            )
+            RETURNING *
+            """,
+            (owner, now + int(visibility_s * 1000), now, int(limit)),
+        ).fetchall()
+        conn.commit()
+        return sorted((_job_to_dict(r) for r in rows), key=lambda j: (-j["priority"], j["id"]))
+    finally:
+        conn.close()
+
+
+@_serialized_write
+def complete_job(job_id: int, owner: str) -> bool:
+    """Ack a leased job; False if the lease was lost (expired and re-leased)."""
+    conn = get_conn()
+    try:
+        cur = conn.execute("DELETE FROM jobs WHERE id=? AND lease_owner=?", (int(job_id), owner))
+        conn.commit()
+        return bool(cur.rowcount)
+    finally:
+        conn.close()
+
+
+def _job_backoff_ms(attempts: int) -> int:
+    delay = min(JOB_BACKOFF_MAX_S, JOB_BACKOFF_BASE_S * 2 ** max(0, attempts - 1))
+    return int(delay * 1000 * (0.75 + secrets.randbelow(500) / 1000))  # +-25% jitter
+
+
+@_serialized_write
+def fail_job(job_id: int, owner: str, error: str) -> Optional[str]:
+    """Record a failed attempt: 'retry' (rescheduled), 'dead' (moved to jobs_dead) or None (lease lost)."""
+    conn = get_conn()
+    try:
+        row = conn.execute("SELECT * FROM jobs WHERE id=? AND lease_owner=?", (int(job_id), owner)).fetchone()
+        if not row:
+            return None
+        now = utcnow_ms()
+        if row["attempts"] >= row["max_attempts"]:
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO jobs_dead(id,kind,payload,priority,attempts,max_attempts,last_error,created_at,failed_at)
+                VALUES (?,?,?,?,?,?,?,?,?)
+                """,
+                (row["id"], row["kind"], row["payload"], row["priority"], row["attempts"], row["max_attempts"],
+                 error[:2000], row["created_at"], now),
+            )
+            conn.execute("DELETE FROM jobs WHERE id=?", (row["id"],))
+            outcome = "dead"
+        else:
+            conn.execute(
+                "UPDATE jobs SET lease_owner=NULL, run_at=?, last_error=? WHERE id=?",
+                (now + _job_backoff_ms(row["attempts"]), error[:2000], row["id"]),
+            )
+            outcome = "retry"
+        conn.commit()
+        return outcome
+    finally:
+        conn.close()
+
+
+def list_dead_jobs(limit: int = 100) -> List[dict]:
+    conn = get_conn()
+    try:
+        rows = conn.execute("SELECT * FROM jobs_dead ORDER BY failed_at DESC LIMIT ?", (int(limit),)).fetchall()
+        return [_job_to_dict(r) for r in rows]
+    finally:
+        conn.close()
+
+
+@_serialized_write
+def retry_dead_job(job_id: int) -> bool:
+    """Move a dead-lettered job back to the queue with a fresh attempt budget."""
+    conn = get_conn()
+    try:
+        row = conn.execute("SELECT * FROM jobs_dead WHERE id=?", (int(job_id),)).fetchone()
+        if not row:
+            return False
+        now = utcnow_ms()
+        conn.execute(
+            "INSERT INTO jobs(id,kind,payload,priority,run_at,max_attempts,created_at) VALUES (?,?,?,?,?,?,?)",
+            (row["id"], row["kind"], row["payload"], row["priority"], now, row["max_attempts"], row["created_at"]),
+        )
+        conn.execute("DELETE FROM jobs_dead WHERE id=?", (row["id"],))
+        conn.commit()
+        on_commit(_jobs_ready.set)
+        return True
+    finally:
+        conn.close()
+
+
+def job_queue_depth() -> dict:
+    """Ready / delayed / leased / dead counts and the age of the oldest ready job."""
+    conn = get_conn()
+    try:
+        now = utcnow_ms()
+        row = conn.execute(
+            """
+            SELECT
+                SUM(run_at<=?) AS ready,
+                SUM(run_at>? AND lease_owner IS NULL) AS delayed,
+                SUM(run_at>? AND lease_owner IS NOT NULL) AS leased,
+                MIN(CASE WHEN run_at<=? THEN created_at END) AS oldest_ready
+            FROM jobs
+            """,
+            (now, now, now, now),
+        ).fetchone()
+        dead = conn.execute("SELECT COUNT(*) FROM jobs_dead").fetchone()[0]
+        return {
+            "ready": int(row["ready"] or 0),
+            "delayed": int(row["delayed"] or 0),
+            "leased": int(row["leased"] or 0),
+            "dead": int(dead),
+            "oldest_ready_ms": (now - int(row["oldest_ready"])) if row["oldest_ready"] is not None else 0,
+        }
+    finally:
+        conn.close()
+
+
+# ---- Streaming list variants ----
+#
+# Generator twins of list_users / list_stories / list_skillswap_posts /
+# list_reports. They walk the cursor with fetchmany() and resolve users per
+# chunk, so memory stays bounded by STREAM_BATCH_SIZE whatever the table size.
+# Items have the same shape as the list helpers' (pair with records.ndjson_lines
+# for `Accept: application/x-ndjson` responses).
+
+STREAM_BATCH_SIZE = 200
+
+
+def _iter_chunks(conn: sqlite3.Connection, sql: str, params: tuple, batch_size: int) -> Iterator[List[sqlite3.Row]]:
+    cur = conn.execute(sql, params)
+    while True:
+        rows = cur.fetchmany(batch_size)
+        if not rows:
+            return
+        yield rows
+
+
+def iter_users(
+    exclude_user_id: Optional[int] = None, *, only_matchup: bool = False, batch_size: int = STREAM_BATCH_SIZE
+) -> Iterator[dict]:
+    clauses = ["deleted_at IS NULL", "is_system=0"]
+    params: List[Any] = []
+    if exclude_user_id:
+        clauses.append("id<>?")
+        params.append(int(exclude_user_id))
+    if only_matchup:
+        clauses.append("show_in_matchup=1")
+    where_sql = " WHERE " + " AND ".join(clauses)
+    conn = get_conn()
+    try:
+        for rows in _iter_chunks(conn, f"SELECT id FROM users{where_sql} ORDER BY id", tuple(params), batch_size):
+            users = _public_users_by_id(conn, (r["id"] for r in rows))
+            for r in rows:
+                if r["id"] in users:
+                    yield users[r["id"]]
+    finally:
+        conn.close()
+
+
+def _iter_with_authors(table: str, columns: str, batch_size: int) -> Iterator[dict]:
+    conn = get_conn()
+    try:
+        for rows in _iter_chunks(conn, f"SELECT {columns} FROM {table} WHERE deleted_at IS NULL ORDER BY id DESC", (), batch_size):
+            yield from _with_authors(conn, rows)
+    finally:
+        conn.close()
+
+
+def iter_stories(batch_size: int = STREAM_BATCH_SIZE) -> Iterator[dict]:
+    return _iter_with_authors("stories", _STORY_COLUMNS, batch_size)
+
+
+def iter_skillswap_posts(batch_size: int = STREAM_BATCH_SIZE) -> Iterator[dict]:
+    return _iter_with_authors("skillswap_posts", _SKILLSWAP_POST_COLUMNS, batch_size)
+
+
+def iter_reports(status: Optional[str] = None, batch_size: int = STREAM_BATCH_SIZE) -> Iterator[dict]:
+    where_sql, params = ("WHERE status=?", (status,)) if status else ("", ())
+    conn = get_conn()
+    try:
+        for rows in _iter_chunks(conn, f"SELECT * FROM reports {where_sql} ORDER BY id DESC", params, batch_size):
+            users = _public_users_by_id(conn, [r["reporter_id"] for r in rows] + [r["target_user_id"] for r in rows])
+            for r in rows:
+                if int(r["reporter_id"]) not in users or int(r["target_user_id"]) not in users:
+                    continue
+                d = _row_to_dict(r)
+                d["reporter"] = users.get(int(d["reporter_id"]))
+                d["target_user"] = users.get(int(d["target_user_id"]))
+                yield d
+    finally:
+        conn.close()
+
+
+# ---- Backup / JSONL export / import ----
+#
+# backup_db() copies the live database with SQLite's online backup API a few
+# pages at a time, so the writer thread is never locked out for long. The JSONL
+# helpers dump/load the main tables one row per line (archive partitions are
+# covered by backing up the archive database file).
+
+# Trigger-maintained tables; an import replaces their contents with the export's.
+_DERIVED_TABLES = ("admin_stats", "stats_hourly", "unread_counters")
+
+
+def _mb_per_s(nbytes: int, seconds: float) -> float:
+    return round(nbytes / 1e6 / seconds, 2) if seconds > 0 else 0.0
+
+
+def backup_db(
+    dest_path: str,
+    *,
+    include_archive: bool = True,
+    pages: int = BACKUP_PAGES_PER_STEP,
+    sleep_s: float = BACKUP_STEP_SLEEP_S,
+) -> dict:
+    """Online backup of the database (and archive) to dest_path (+ <dest>.archive.db)."""
+    if not _db._path:
+        raise RuntimeError("DB not initialized; call db.init_app(app)")
+    jobs = [(_db._path, dest_path)]
+    if include_archive and _db.archive_path and os.path.exists(_db.archive_path):
+        jobs.append((_db.archive_path, os.path.splitext(dest_path)[0] + ".archive.db"))
+    started = time.perf_counter()
+    total = 0
+    files = []
+    for src_path, out_path in jobs:
+        src = sqlite3.connect(src_path, timeout=BUSY_TIMEOUT_S)
+        dst = sqlite3.connect(out_path)
+        try:
+            src.backup(dst, pages=pages, sleep=sleep_s)
+        finally:
+            dst.close()
+            src.close()
+        size = os.path.getsize(out_path)
+        total += size
+        files.append({"path": out_path, "bytes": size})
+    elapsed = time.perf_counter() - started
+    return {"files": files, "bytes": total, "seconds": round(elapsed, 3), "mb_per_s": _mb_per_s(total, elapsed)}
+
+
+def _main_tables(conn: sqlite3.Connection) -> List[str]:
+    """Main tables, parents before children (foreign keys)."""
+    names = [
+        r[0]
+        for r in conn.execute(
+            "SELECT name FROM main.sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
+        ).fetchall()
+    ]
+    parents = {
+        t: {r["table"] for r in conn.execute(f"PRAGMA main.foreign_key_list({t})").fetchall()} - {t}
+        for t in names
+    }
+    ordered: List[str] = []
+    while len(ordered) < len(names):
+        ready = [t for t in names if t not in ordered and parents[t] <= set(ordered)]
+        if not ready:  # cycle: keep the remaining order, deferred FKs sort it out per batch
+            ready = [t for t in names if t not in ordered]
+        ordered.extend(ready)
+    return ordered
+
+
+def export_jsonl(out_dir: str, tables: Optional[List[str]] = None, batch_size: int = STREAM_BATCH_SIZE) -> dict:
+    """Write <out_dir>/<table>.jsonl for each main table, one JSON object per row."""
+    os.makedirs(out_dir, exist_ok=True)
+    started = time.perf_counter()
+    report: Dict[str, dict] = {}
+    conn = _db.connect_readonly()
+    try:
+        conn.execute("BEGIN")  # one snapshot across all tables
+        for table in tables or _main_tables(conn):
+            path = os.path.join(out_dir, f"{table}.jsonl")
+            rows = 0
+            with open(path, "w", encoding="utf-8") as fp:
+                for chunk in _iter_chunks(conn, f"SELECT * FROM main.{table}", (), batch_size):
+                    for r in chunk:
+                        fp.write(json.dumps(_row_to_dict(r), ensure_ascii=False, separators=(",", ":")))
+                        fp.write("\n")
+                    rows += len(chunk)
+            report[table] = {"rows": rows, "bytes": os.path.getsize(path)}
+    finally:
+        conn.rollback()
+        conn.close()
+    elapsed = time.perf_counter() - started
+    total = sum(t["bytes"] for t in report.values())
+    return {"tables": report, "bytes": total, "seconds": round(elapsed, 3), "mb_per_s": _mb_per_s(total, elapsed)}
+
+
+def import_jsonl(in_dir: str, batch_rows: int = IMPORT_BATCH_ROWS) -> dict:
+    """Load <in_dir>/<table>.jsonl files written by export_jsonl() into an empty database.
+
+    Rows go in IMPORT_BATCH_ROWS per transaction with foreign-key checks
+    deferred to each commit. The derived tables (admin_stats, stats_hourly,
+    unread_counters, comments_count) are imported as exported, so their
+    triggers are dropped for the load and recreated afterwards.
+    """
+    conn = _db.connect()
+    conn.isolation_level = None
+    started = time.perf_counter()
+    report: Dict[str, dict] = {}
+    triggers: List[str] = []
+    try:
+        tables = [t for t in _main_tables(conn) if os.path.exists(os.path.join(in_dir, f"{t}.jsonl"))]
+        busy = [
+            t for t in tables
+            if t not in _DERIVED_TABLES and conn.execute(f"SELECT 1 FROM main.{t} LIMIT 1").fetchone()
+        ]
+        if busy:
+            raise ValueError(f"import target is not empty: {', '.join(busy)}")
+
+        conn.execute("BEGIN IMMEDIATE")
+        saved = conn.execute("SELECT name, sql FROM main.sqlite_master WHERE type='trigger'").fetchall()
+        for r in saved:
+            conn.execute(f"DROP TRIGGER main.{r['name']}")
+        for t in tables:
+            if t in _DERIVED_TABLES:
+                conn.execute(f"DELETE FROM main.{t}")
+        conn.execute("COMMIT")
+        triggers = [r["sql"] for r in saved]
+
+        for table in tables:
+            path = os.path.join(in_dir, f"{table}.jsonl")
+            columns = [r["name"] for r in conn.execute(f"PRAGMA main.table_info({table})").fetchall()]
+            sql = (
+                f"INSERT INTO main.{table} ({', '.join(columns)}) "
+                f"VALUES ({', '.join('?' * len(columns))})"
+            )
+            rows = 0
+            batch: List[tuple] = []
+            with open(path, encoding="utf-8") as fp:
+                for line in fp:
+                    if not line.strip():
+                        continue
+                    d = json.loads(line)
+                    batch.append(tuple(d.get(c) for c in columns))
+                    if len(batch) >= batch_rows:
+                        _import_batch(conn, sql, batch)
+                        rows += len(batch)
+                        batch = []
+            if batch:
+                _import_batch(conn, sql, batch)
+                rows += len(batch)
+            report[table] = {"rows": rows, "bytes": os.path.getsize(path)}
+    finally:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        if triggers:
+            conn.execute("BEGIN IMMEDIATE")
+            for sql in triggers:
+                conn.execute(sql)
+            conn.execute("COMMIT")
+        conn.close()
+    elapsed = time.perf_counter() - started
+    total = sum(t["bytes"] for t in report.values())
+    return {"tables": report, "bytes": total, "seconds": round(elapsed, 3), "mb_per_s": _mb_per_s(total, elapsed)}
+
+
+def _import_batch(conn: sqlite3.Connection, sql: str, batch: List[tuple]) -> None:
+    conn.execute("BEGIN IMMEDIATE")
+    conn.execute("PRAGMA defer_foreign_keys = ON")  # reset by SQLite at each COMMIT
+    conn.executemany(sql, batch)
+    conn.execute("COMMIT")
@@ -0,0 +1,243 @@
+"""Asyncio counterparts of the db.py helpers.
+
+Usage (from an async route / ASGI handler):
+    import db_async
+    user = await db_async.get_user_public(user_id)
+
+Reads are offloaded to a small dedicated executor, so thousands of idle
+coroutines (SSE subscribers, slow LLM calls) share a handful of threads.
+Mutations are awaited straight off db.py's single writer queue and hold no
+executor thread while they wait. Results and exceptions are exactly those of
+the sync helpers.
+
+Benchmark (sync thread-per-client vs asyncio):
+    python db_async.py [clients]
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+import db
+
+
+# Threads used for offloaded reads; keep <= db.READ_POOL_SIZE so every worker
+# gets a pooled connection.
+ASYNC_DB_WORKERS = 4
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=ASYNC_DB_WORKERS, thread_name_prefix="db-async")
+    return _executor
+
+
+def shutdown() -> None:
+    """Stop the read executor (e.g. on ASGI lifespan shutdown)."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
+
+
+def _offload(fn: Callable) -> Callable:
+    @functools.wraps(fn)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_executor(), functools.partial(fn, *args, **kwargs))
+
+    return wrapper
+
+
+def _queued(fn: Callable) -> Callable:
+    @functools.wraps(fn)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        return await asyncio.wrap_future(fn.submit(*args, **kwargs))
+
+    return wrapper
+
+
+# ---- Users / Auth ----
+
+get_user_by_email = _offload(db.get_user_by_email)
+get_user_by_id = _offload(db.get_user_by_id)
+get_user_public = _offload(db.get_user_public)
+get_user_warning = _offload(db.get_user_warning)
+is_user_currently_suspended = _offload(db.is_user_currently_suspended)
+list_users = _offload(db.list_users)
+list_contacts_for_user = _offload(db.list_contacts_for_user)
+create_user = _queued(db.create_user)
+update_user = _queued(db.update_user)
+set_user_interests = _queued(db.set_user_interests)
+set_user_suspension = _queued(db.set_user_suspension)
+clear_user_suspension = _queued(db.clear_user_suspension)
+set_user_warning = _queued(db.set_user_warning)
+ack_user_warning = _queued(db.ack_user_warning)
+set_user_banned = _queued(db.set_user_banned)
+set_user_matchup_enabled = _queued(db.set_user_matchup_enabled)
+delete_user = _queued(db.delete_user)
+get_session_principal = _offload(db.get_session_principal)
+
+# ---- Login events ----
+
+list_login_events = _offload(db.list_login_events)
+list_login_rollups = _offload(db.list_login_rollups)
+log_login_event = _queued(db.log_login_event)
+
+# ---- Stories / comments ----
+
+get_story = _offload(db.get_story)
+list_stories = _offload(db.list_stories)
+count_story_comments = _offload(db.count_story_comments)
+list_story_comments = _offload(db.list_story_comments)
+get_story_comment = _offload(db.get_story_comment)
+create_story = _queued(db.create_story)
+delete_story = _queued(db.delete_story)
+create_story_comment = _queued(db.create_story_comment)
+delete_story_comment = _queued(db.delete_story_comment)
+
+# ---- SkillSwap ----
+
+get_skillswap_post = _offload(db.get_skillswap_post)
+list_skillswap_posts = _offload(db.list_skillswap_posts)
+create_skillswap_post = _queued(db.create_skillswap_post)
+delete_skillswap_post = _queued(db.delete_skillswap_post)
+count_skillswap_comments = _offload(db.count_skillswap_comments)
+list_skillswap_comments = _offload(db.list_skillswap_comments)
+get_skillswap_comment = _offload(db.get_skillswap_comment)
+create_skillswap_comment = _queued(db.create_skillswap_comment)
+delete_skillswap_comment = _queued(db.delete_skillswap_comment)
+
+# ---- Events ----
+
+get_event = _offload(db.get_event)
+list_events = _offload(db.list_events)
+list_events_between = _offload(db.list_events_between)
+list_user_events = _offload(db.list_user_events)
+set_event_rsvp = _queued(db.set_event_rsvp)
+create_event = _queued(db.create_event)
+delete_event = _queued(db.delete_event)
+
+# ---- Geocoding (gazetteer cache) ----
+
+list_events_missing_coords = _offload(db.list_events_missing_coords)
+list_gazetteer = _offload(db.list_gazetteer)
+put_gazetteer_entries = _queued(db.put_gazetteer_entries)
+set_event_coords_bulk = _queued(db.set_event_coords_bulk)
+
+# ---- Messages ----
+
+get_message = _offload(db.get_message)
+list_thread = _offload(db.list_thread)
+create_message = _queued(db.create_message)
+
+# ---- Notifications ----
+
+get_notification = _offload(db.get_notification)
+list_notifications = _offload(db.list_notifications)
+create_notification = _queued(db.create_notification)
+mark_all_notifications_read = _queued(db.mark_all_notifications_read)
+clear_notifications = _queued(db.clear_notifications)
+notify = _queued(db.notify)
+flush_notification_digests = _queued(db.flush_notification_digests)
+
+# ---- Unread badge counters ----
+
+get_badges = _offload(db.get_badges)
+mark_thread_read = _queued(db.mark_thread_read)
+
+# ---- Reports ----
+
+get_report = _offload(db.get_report)
+list_reports = _offload(db.list_reports)
+create_report = _queued(db.create_report)
+update_report_status = _queued(db.update_report_status)
+create_system_reports = _queued(db.create_system_reports)
+
+# ---- Soft delete / background purge ----
+
+list_purge_tasks = _offload(db.list_purge_tasks)
+get_purge_task = _offload(db.get_purge_task)
+
+# ---- Admin overview ----
+
+get_admin_stats = _offload(db.get_admin_stats)
+get_admin_overview = _offload(db.get_admin_overview)
+
+# ---- Maintenance ----
+
+storage_report = _offload(db.storage_report)
+reclaim_free_pages = _offload(db.reclaim_free_pages)
+
+# ---- Durable job queue ----
+
+enqueue_job = _queued(db.enqueue_job)
+lease_jobs = _queued(db.lease_jobs)
+complete_job = _queued(db.complete_job)
+fail_job = _queued(db.fail_job)
+retry_dead_job = _queued(db.retry_dead_job)
+list_dead_jobs = _offload(db.list_dead_jobs)
+job_queue_depth = _offload(db.job_queue_depth)
+
+# ---- Chatbot suggestion cache ----
+
+list_suggestion_contexts = _offload(db.list_suggestion_contexts)
+list_suggestion_sets = _offload(db.list_suggestion_sets)
+put_suggestion_set = _queued(db.put_suggestion_set)
+
+
+def _bench(clients: int = 1000, idle_s: float = 0.05) -> None:
+    """Each client idles (like an SSE subscriber) then reads a profile and a thread."""
+    import os
+    import tempfile
+    import threading
+    import time
+
+    class _App:
+        config = {"SQLITE_PATH": os.path.join(tempfile.mkdtemp(), "bench.db")}
+
+    db.init_db(_App, seed=True)
+    for i in range(200):
+        db.create_message(2, 3, f"bench {i}")
+
+    def sync_client(_: int) -> None:
+        time.sleep(idle_s)
+        db.get_user_public(2)
+        db.list_thread(2, 3, limit=50)
+
+    async def async_client() -> None:
+        await asyncio.sleep(idle_s)
+        await get_user_public(2)
+        await list_thread(2, 3, limit=50)
+
+    base_threads = threading.active_count()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as ex:
+        list(ex.map(sync_client, range(clients)))
+        sync_threads = threading.active_count() - base_threads
+    sync_s = time.perf_counter() - started
+
+    async def run_async() -> int:
+        await asyncio.gather(*(async_client() for _ in range(clients)))
+        return threading.active_count() - base_threads
+
+    started = time.perf_counter()
+    async_threads = asyncio.run(run_async())
+    async_s = time.perf_counter() - started
+
+    print(f"clients={clients} idle={idle_s * 1000:.0f}ms")
+    print(f"  sync  (thread per client): {sync_s:.3f}s, {sync_threads} extra threads")
+    print(f"  async (db_async executor): {async_s:.3f}s, {async_threads} extra threads")
+
+
+if __name__ == "__main__":
+    import sys
+
+    _bench(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
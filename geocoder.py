@@ -0,0 +1,324 @@
+"""Batch geocoding of events.location into events.latitude / longitude.
+
+Usage (in create_app, or after an admin creates events):
+    import geocoder
+    geocoder.start(upstream=geocoder.onemap_upstream())   # background sweeps
+    geocoder.geocode_all()                                  # one full sweep, now
+
+Events without coordinates never reach the map (js/map.js drops them). A
+sweep walks them in id-ordered batches, normalizes their location text
+("Punggol Meadows CC, Singapore" -> "punggol meadows community centre") and
+resolves each distinct place:
+
+  1. exact hit in the gazetteer: gazetteer.json plus the gazetteer table,
+     which also caches upstream answers (including "not found");
+  2. fuzzy hit: a known place whose words all appear in the text (the most
+     specific one wins), or a close spelling (difflib, FUZZY_MIN);
+  3. otherwise one batched call to the pluggable upstream.
+
+Cache hits never call the upstream. Coordinates are written back with one
+bulk update (db.set_event_coords_bulk), and fuzzy and upstream answers are
+stored under the new key, so the next sweep resolves them exactly.
+
+Benchmark (cold vs warm sweep against a local stand-in upstream):
+    python geocoder.py [events]
+"""
+
+from __future__ import annotations
+
+import difflib
+import json
+import os
+import re
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import db
+
+GAZETTEER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "gazetteer.json")
+BATCH_SIZE = 200
+UPSTREAM_BATCH = 50
+FUZZY_MIN = 0.88
+# "Not found" answers are retried upstream after this long.
+NEGATIVE_TTL_S = 7 * 24 * 3600
+SWEEP_INTERVAL_S = 600.0
+
+Coords = Tuple[float, float]
+# upstream(place keys) -> {place key: (lat, lng) or None}
+Upstream = Callable[[List[str]], Dict[str, Optional[Coords]]]
+
+_ABBREVIATIONS = {
+    "cc": "community centre",
+    "rc": "residents committee",
+    "aac": "active ageing centre",
+    "sac": "senior activity centre",
+    "blk": "block",
+    "st": "street",
+    "ave": "avenue",
+    "rd": "road",
+    "dr": "drive",
+    "cres": "crescent",
+    "ctr": "centre",
+    "center": "centre",
+    "sgh": "singapore general hospital",
+    "amk": "ang mo kio",
+    "cck": "choa chu kang",
+}
+_NOISE = {"singapore", "sg", "the", "s"}
+_POSTCODE_RE = re.compile(r"\b\d{6}\b")
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def normalize_place(text: Optional[str]) -> str:
+    """Lowercase, drop postcodes/punctuation/"Singapore", expand common abbreviations."""
+    words: List[str] = []
+    for word in _WORD_RE.findall(_POSTCODE_RE.sub(" ", (text or "").lower())):
+        if word in _NOISE:
+            continue
+        words.extend(_ABBREVIATIONS.get(word, word).split())
+    return " ".join(words)
+
+
+class Gazetteer:
+    """Exact + fuzzy lookup over place keys (seed file + gazetteer table)."""
+
+    def __init__(self, entries: Iterable[Tuple[str, Optional[Coords]]]) -> None:
+        self._exact: Dict[str, Optional[Coords]] = {}
+        self._by_word: Dict[str, Set[str]] = {}
+        for key, coords in entries:
+            self.add(key, coords)
+
+    def __len__(self) -> int:
+        return len(self._exact)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._exact
+
+    def add(self, key: str, coords: Optional[Coords]) -> None:
+        self._exact[key] = coords
+        if coords is not None:
+            for word in key.split():
+                self._by_word.setdefault(word, set()).add(key)
+
+    def exact(self, key: str) -> Optional[Coords]:
+        return self._exact.get(key)
+
+    def fuzzy(self, key: str) -> Optional[Tuple[str, Coords]]:
+        words = key.split()
+        if not words:
+            return None
+        # Tolerate typos in single words ("bendemer") before looking up candidates.
+        vocab = list(self._by_word)
+        expanded = set(words)
+        for word in words:
+            if word not in self._by_word and len(word) >= 4:
+                expanded.update(difflib.get_close_matches(word, vocab, n=2, cutoff=FUZZY_MIN))
+        candidates: Set[str] = set()
+        for word in expanded:
+            candidates |= self._by_word.get(word, set())
+
+        best: Optional[Tuple[float, str]] = None
+        for cand in candidates:
+            cand_words = cand.split()
+            if all(w in expanded for w in cand_words):
+                score = 1.0 + len(cand_words) / 100  # contained: prefer the most specific place
+            else:
+                score = difflib.SequenceMatcher(None, key, cand).ratio()
+            if score >= FUZZY_MIN and (best is None or score > best[0]):
+                best = (score, cand)
+        if best is None:
+            return None
+        coords = self._exact[best[1]]
+        return (best[1], coords) if coords is not None else None
+
+
+def _load_gazetteer(now_ms: int) -> Gazetteer:
+    """Seed file + cached table rows; expired "not found" rows are left out (retried upstream)."""
+    entries: List[Tuple[str, Optional[Coords]]] = []
+    if os.path.exists(GAZETTEER_PATH):
+        with open(GAZETTEER_PATH, encoding="utf-8") as fp:
+            entries.extend((normalize_place(k), (float(v[0]), float(v[1]))) for k, v in json.load(fp).items())
+    for row in db.list_gazetteer():
+        if row["latitude"] is not None:
+            entries.append((row["place_key"], (row["latitude"], row["longitude"])))
+        elif now_ms - int(row["updated_at"]) <= NEGATIVE_TTL_S * 1000:
+            entries.append((row["place_key"], None))
+    return Gazetteer(entries)
+
+
+_COUNTERS = ("events", "places", "cache_hits", "fuzzy_hits", "upstream_places", "upstream_calls", "updated",
+             "unresolved")
+
+
+def geocode_pending(
+    upstream: Optional[Upstream] = None, batch_size: int = BATCH_SIZE, after_id: int = 0
+) -> dict:
+    """Resolve one batch of events without coordinates (ids > after_id); returns counters and last_id."""
+    events = db.list_events_missing_coords(limit=batch_size, after_id=after_id)
+    stats = dict.fromkeys(_COUNTERS, 0)
+    stats["events"] = len(events)
+    stats["last_id"] = int(events[-1]["id"]) if events else after_id
+    if not events:
+        return stats
+    gaz = _load_gazetteer(db.utcnow_ms())
+
+    by_key: Dict[str, List[int]] = {}
+    for ev in events:
+        key = normalize_place(ev.get("location"))
+        if key:
+            by_key.setdefault(key, []).append(int(ev["id"]))
+        else:
+            stats["unresolved"] += 1
+    stats["places"] = len(by_key)
+
+    resolved: Dict[str, Coords] = {}
+    learned: List[Tuple[str, Optional[float], Optional[float], str]] = []
+    misses: List[str] = []
+    for key in by_key:
+        if key in gaz:
+            stats["cache_hits"] += 1
+            coords = gaz.exact(key)
+            if coords is not None:
+                resolved[key] = coords
+            continue
+        hit = gaz.fuzzy(key)
+        if hit is not None:
+            stats["fuzzy_hits"] += 1
+            resolved[key] = hit[1]
+            learned.append((key, hit[1][0], hit[1][1], f"fuzzy:{hit[0]}"))
+        else:
+            misses.append(key)
+
+    if misses and upstream is not None:
+        stats["upstream_places"] = len(misses)
+        for start in range(0, len(misses), UPSTREAM_BATCH):
+            chunk = misses[start : start + UPSTREAM_BATCH]
+            stats["upstream_calls"] += 1
+            try:
+                answers = upstream(chunk)
+            except Exception:
+                continue  # retried on the next sweep
+            for key in chunk:
+                coords = answers.get(key)
+                if coords is not None:
+                    resolved[key] = (float(coords[0]), float(coords[1]))
+                    learned.append((key, resolved[key][0], resolved[key][1], "upstream"))
+                elif key in answers:
+                    learned.append((key, None, None, "upstream"))  # cache "not found" too
+
+    db.put_gazetteer_entries(learned)
+    stats["updated"] = db.set_event_coords_bulk(
+        [(eid, lat, lng) for key, (lat, lng) in resolved.items() for eid in by_key[key]]
+    )
+    stats["unresolved"] += sum(len(ids) for key, ids in by_key.items() if key not in resolved)
+    return stats
+
+
+def geocode_all(upstream: Optional[Upstream] = None, batch_size: int = BATCH_SIZE) -> dict:
+    """One sweep over every event without coordinates (unresolvable ones don't block the rest)."""
+    total = dict.fromkeys(_COUNTERS, 0)
+    after_id = 0
+    while True:
+        stats = geocode_pending(upstream, batch_size, after_id)
+        for key in _COUNTERS:
+            total[key] += stats[key]
+        if stats["events"] < batch_size:
+            return total
+        after_id = stats["last_id"]
+
+
+def start(interval_s: float = SWEEP_INTERVAL_S, upstream: Optional[Upstream] = None) -> threading.Event:
+    """Run geocode_all() every interval_s on a daemon thread; set the returned Event to stop it."""
+    stop = threading.Event()
+
+    def _loop() -> None:
+        while True:
+            try:
+                geocode_all(upstream)
+            except Exception:
+                pass
+            if stop.wait(interval_s):
+                return
+
+    threading.Thread(target=_loop, name="geocoder", daemon=True).start()
+    return stop
+
+
+def onemap_upstream(timeout_s: float = 10.0) -> Upstream:
+    """Upstream backed by the OneMap search API (one request per place).
+
+    requests is imported on the first call, not when the sweep is wired up.
+    """
+    session = None
+
+    def call(keys: List[str]) -> Dict[str, Optional[Coords]]:
+        nonlocal session
+        if session is None:
+            import requests
+
+            session = requests.Session()
+        out: Dict[str, Optional[Coords]] = {}
+        for key in keys:
+            resp = session.get(
+                "https://www.onemap.gov.sg/api/common/elastic/search",
+                params={"searchVal": key, "returnGeom": "Y", "getAddrDetails": "N", "pageNum": 1},
+                timeout=timeout_s,
+            )
+            resp.raise_for_status()
+            results = resp.json().get("results") or []
+            out[key] = (float(results[0]["LATITUDE"]), float(results[0]["LONGITUDE"])) if results else None
+        return out
+
+    return call
+
+
+def _bench(events: int = 2000) -> None:
+    import random
+    import tempfile
+
+    class _App:
+        config = {"SQLITE_PATH": os.path.join(tempfile.mkdtemp(), "bench.db")}
+
+    calls = {"n": 0, "places": 0}
+
+    def stand_in(keys: List[str]) -> Dict[str, Optional[Coords]]:
+        """Local stand-in for the upstream: 20 ms per call, deterministic answers."""
+        calls["n"] += 1
+        calls["places"] += len(keys)
+        time.sleep(0.02)
+        return {k: (1.3 + (hash(k) % 1000) / 10_000, 103.8 + (hash(k) % 777) / 10_000) for k in keys}
+
+    def _clear_coords() -> None:
+        conn = db.get_conn()
+        try:
+            conn.execute("UPDATE events SET latitude=NULL, longitude=NULL")
+            conn.commit()
+        finally:
+            conn.close()
+
+    db.init_db(_App, seed=True)
+    rng = random.Random(3)
+    known = ["Punggol CC", "Bendemer Community Club", "Toa Payoh Hub, Singapore 310190", "AMK Ave 3 Blk 406",
+             "Tampines Regional Library", "Jurong Spring CC"]
+    venues = known + [f"Venue {n} Hall" for n in range(60)]
+    for i in range(events):
+        db.create_event.submit(f"Event {i}", "2026-11-01", None, rng.choice(venues), "")
+    db.create_event("last", "2026-11-01", None, "Multiple SAFRA Clubs, Singapore", "")
+
+    print(f"{events + 7} events without coordinates, {len(venues) + 1} distinct venues (+ seed events)")
+    for label in ("cold", "warm (events re-cleared)"):
+        started = time.perf_counter()
+        calls["n"] = calls["places"] = 0
+        total = geocode_all(stand_in)
+        elapsed = time.perf_counter() - started
+        print(f"  {label:26s} {elapsed * 1000:8.1f} ms  updated {total['updated']}, "
+              f"exact hits {total['cache_hits']}, fuzzy {total['fuzzy_hits']}, "
+              f"upstream calls {calls['n']} ({calls['places']} places)")
+        db.submit_write(_clear_coords).result()
+
+
+if __name__ == "__main__":
+    import sys
+
+    _bench(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,154 @@
+"""Composite page data for the landing page (/api/home).
+
+Usage (route):
+    import home
+    return Response(home.home_json(session.get("user_id")), mimetype="application/json")
+
+One response replaces the landing page's separate /api/auth/me,
+/api/events?limit=4, /api/stories, /api/skillswap, /api/notifications and
+/api/badges calls:
+
+    {"ok": true, "events": [...], "stories": [...], "skillswap": [...],
+     "user": {...} | null, "warning": {"pending", "message"},
+     "badges": {...}, "notifications": [...]}
+
+The shared fragments (upcoming events, latest stories, latest skill posts) are
+cached as encoded JSON and spliced into the body; each is keyed by the
+db.content_version() of the content it embeds, so the writes that change it
+invalidate it on commit. FRAGMENT_TTL_S bounds staleness for writes made by
+other worker processes. Only the per-user part is read and encoded per request.
+
+Benchmark (p50/p95 page-data latency, separate calls vs /api/home):
+    python home.py [requests]
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import db
+from records import encode, list_notification_records
+
+HOME_EVENTS = 4
+HOME_STORIES = 6
+HOME_SKILL_POSTS = 6
+HOME_NOTIFICATIONS = 20
+FRAGMENT_TTL_S = 30.0
+
+_lock = threading.Lock()
+# fragment name -> (version key, built at (monotonic), encoded JSON)
+_fragments: Dict[str, Tuple[Tuple[Any, ...], float, bytes]] = {}
+
+
+def _fragment(name: str, version: Tuple[Any, ...], build: Callable[[], Any]) -> bytes:
+    now = time.monotonic()
+    with _lock:
+        hit = _fragments.get(name)
+    if hit is not None and hit[0] == version and now - hit[1] < FRAGMENT_TTL_S:
+        return hit[2]
+    body = encode(build())
+    with _lock:
+        _fragments[name] = (version, now, body)
+    return body
+
+
+def upcoming_events() -> bytes:
+    # Keyed by day too: "upcoming" moves at midnight without any write.
+    return _fragment(
+        "events",
+        (*db.content_version("events"), db._start_of_today_ms()),
+        lambda: db.list_events(limit=HOME_EVENTS, upcoming_only=True),
+    )
+
+
+def latest_stories() -> bytes:
+    return _fragment(
+        "stories", db.content_version("stories", "users"), lambda: db.list_stories(limit=HOME_STORIES)
+    )
+
+
+def latest_skill_posts() -> bytes:
+    return _fragment(
+        "skillswap", db.content_version("skillswap", "users"), lambda: db.list_skillswap_posts(limit=HOME_SKILL_POSTS)
+    )
+
+
+def user_part(user_id: Optional[int]) -> dict:
+    """The per-request part: session user, pending warning, badges, notifications."""
+    principal = db.get_session_principal(int(user_id)) if user_id else None  # cached
+    if principal is None:
+        return {
+            "user": None,
+            "warning": {"pending": False, "message": None},
+            "badges": {"messages": 0, "notifications": 0},
+            "notifications": [],
+        }
+    uid = int(user_id)
+    return {
+        "user": principal["user"],
+        "warning": {"pending": principal["warning"] is not None, "message": principal["warning"]},
+        "badges": db.get_badges(uid),
+        "notifications": list_notification_records(uid, limit=HOME_NOTIFICATIONS),
+    }
+
+
+def home_json(user_id: Optional[int]) -> bytes:
+    """The full /api/home body as UTF-8 JSON bytes."""
+    per_user = encode(user_part(user_id))
+    return b"".join((
+        b'{"ok":true,"events":', upcoming_events(),
+        b',"stories":', latest_stories(),
+        b',"skillswap":', latest_skill_posts(),
+        b",", per_user[1:],  # the per-user object's keys, closing brace included
+    ))
+
+
+def _bench(requests: int = 2000, write_every: int = 50) -> None:
+    import json
+    import os
+    import tempfile
+
+    class _App:
+        config = {"SQLITE_PATH": os.path.join(tempfile.mkdtemp(), "bench.db")}
+
+    db.init_db(_App, seed=True)
+    users = [u["id"] for u in db.list_users()]
+    for i in range(300):
+        db.create_story.submit(users[i % len(users)], f"Story {i}", "daytoday", "x" * 400)
+        db.create_skillswap_post.submit(users[i % len(users)], "offer", f"Skill {i}", "tech", "y" * 200)
+        db.create_notification.submit(users[i % len(users)], "message", "💬", "New message", f"n {i}", "/messages")
+    db.create_story(users[0], "last", "daytoday", "x")
+
+    def separate(uid: int) -> None:
+        # What the landing page fetched before: one JSON body per endpoint.
+        principal = db.get_session_principal(uid)
+        json.dumps({"ok": True, "user": principal["user"], "warning": {"pending": False}})
+        json.dumps({"ok": True, "events": db.list_events(limit=HOME_EVENTS)})
+        json.dumps({"ok": True, "stories": db.list_stories()})
+        json.dumps({"ok": True, "posts": db.list_skillswap_posts()})
+        json.dumps({"ok": True, "notifications": db.list_notifications(uid)})
+        json.dumps({"ok": True, "badges": db.get_badges(uid)})
+
+    def composite(uid: int) -> None:
+        json.loads(home_json(uid))  # also checks the spliced body is valid JSON
+
+    print(f"{requests} page loads, one story write every {write_every} (invalidates a fragment)")
+    for name, fn in (("separate calls", separate), ("/api/home", composite)):
+        samples = []
+        for n in range(requests):
+            if n % write_every == 0:
+                db.create_story(users[n % len(users)], f"bench {n}", "daytoday", "z")
+            started = time.perf_counter()
+            fn(users[n % len(users)])
+            samples.append((time.perf_counter() - started) * 1000)
+        samples.sort()
+        p50, p95 = samples[len(samples) // 2], samples[int(len(samples) * 0.95)]
+        print(f"  {name:15s} p50 {p50:8.2f} ms   p95 {p95:8.2f} ms")
+
+
+if __name__ == "__main__":
+    import sys
+
+    _bench(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,236 @@
+"""iCalendar (.ics) feeds for events.
+
+Usage (routes):
+    import ical
+    Response(ical.public_feed(), mimetype="text/calendar")           # /api/events.ics
+    Response(ical.user_feed(user_id), mimetype="text/calendar")      # /api/users/<id>/events.ics
+
+The public feed lists events from FEED_PAST_DAYS ago onwards; a user's feed
+lists the events they RSVP'd to. Feeds are cached until the next event or
+RSVP write (db.events_version()), and on regeneration only events not seen
+before are rendered. VEVENT blocks are cached per (id, row version from db.event_row_versions()):
+every write that changes an existing event (e.g. the geocoder filling in its
+coordinates) bumps that in the same after-commit hook as the feed version,
+so a block is never served for an older version of its row.
+
+Benchmark (cold vs cached vs after one write):
+    python ical.py [events]
+Check that geocoded events gain GEO in the public and per-user feeds:
+    python ical.py check
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, timedelta, timezone
+from typing import Callable, Dict, FrozenSet, List, Optional, Tuple
+
+import db
+
+# Past events kept in the public feed.
+FEED_PAST_DAYS = 90
+# Cached feed bodies kept (least recently served dropped first); one per user who fetched theirs.
+MAX_CACHED_FEEDS = 1024
+PRODID = "-//GenerationBridge//Events//EN"
+
+_lock = threading.Lock()
+BlockKey = Tuple[int, int]
+
+_vevents: Dict[BlockKey, str] = {}  # (event id, row version) -> rendered VEVENT block
+# (kind, user id) -> (events version, body, block keys in it), in LRU order
+_feeds: "OrderedDict[Tuple[str, int], Tuple[int, bytes, FrozenSet[BlockKey]]]" = OrderedDict()
+
+
+def _escape(text: Optional[str]) -> str:
+    return (
+        (text or "")
+        .replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def _fold(line: str) -> str:
+    """RFC 5545 line folding at 75 octets."""
+    raw = line.encode("utf-8")
+    if len(raw) <= 75:
+        return line
+    parts: List[str] = []
+    start = 0
+    limit = 75
+    while start < len(raw):
+        end = min(start + limit, len(raw))
+        while end < len(raw) and (raw[end] & 0xC0) == 0x80:  # don't split a UTF-8 sequence
+            end -= 1
+        parts.append(raw[start:end].decode("utf-8"))
+        start = end
+        limit = 74  # continuation lines start with a space
+    return "\r\n ".join(parts)
+
+
+def _utc(ms: int) -> str:
+    return datetime.fromtimestamp(ms / 1000, tz=timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+def _vevent(ev: dict) -> str:
+    lines = ["BEGIN:VEVENT", f"UID:event-{ev['id']}@generationbridge"]
+    created = db._parse_iso_dt(ev.get("created_at"))
+    if created is not None:
+        lines.append(f"DTSTAMP:{created.astimezone(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}")
+    if db._parse_event_time(ev.get("start_time")) is None:
+        # All-day: DTEND is the day after the last day (exclusive)
+        first = date.fromisoformat(ev["start_date"])
+        try:
+            last = date.fromisoformat(ev.get("end_date") or "")
+        except ValueError:
+            last = first
+        lines.append(f"DTSTART;VALUE=DATE:{first.strftime('%Y%m%d')}")
+        lines.append(f"DTEND;VALUE=DATE:{(max(first, last) + timedelta(days=1)).strftime('%Y%m%d')}")
+    else:
+        lines.append(f"DTSTART:{_utc(ev['starts_at'])}")
+        lines.append(f"DTEND:{_utc(ev['ends_at'])}")
+    lines.append(f"SUMMARY:{_escape(ev.get('title'))}")
+    if ev.get("description"):
+        lines.append(f"DESCRIPTION:{_escape(ev['description'])}")
+    if ev.get("location"):
+        lines.append(f"LOCATION:{_escape(ev['location'])}")
+    if ev.get("latitude") is not None and ev.get("longitude") is not None:
+        lines.append(f"GEO:{ev['latitude']};{ev['longitude']}")
+    if ev.get("link"):
+        lines.append(f"URL:{ev['link']}")
+    lines.append("END:VEVENT")
+    return "\r\n".join(_fold(line) for line in lines) + "\r\n"
+
+
+def _render(name: str, events: List[dict], versions: Dict[int, int]) -> Tuple[bytes, FrozenSet[BlockKey]]:
+    blocks: List[str] = []
+    keys = set()
+    with _lock:
+        for ev in events:
+            if ev.get("starts_at") is None:
+                continue
+            key = (int(ev["id"]), versions.get(int(ev["id"]), 0))
+            block = _vevents.get(key)
+            if block is None:
+                block = _vevents[key] = _vevent(ev)
+            blocks.append(block)
+            keys.add(key)
+    head = (
+        "BEGIN:VCALENDAR\r\nVERSION:2.0\r\n"
+        f"PRODID:{PRODID}\r\nCALSCALE:GREGORIAN\r\n{_fold('X-WR-CALNAME:' + _escape(name))}\r\n"
+    )
+    return (head + "".join(blocks) + "END:VCALENDAR\r\n").encode("utf-8"), frozenset(keys)
+
+
+def _cached(key: Tuple[str, int], build: Callable[[], Tuple[bytes, FrozenSet[BlockKey]]]) -> bytes:
+    version = db.events_version()
+    with _lock:
+        hit = _feeds.get(key)
+        if hit is not None and hit[0] == version:
+            _feeds.move_to_end(key)
+            return hit[1]
+    body, keys = build()
+    with _lock:
+        _feeds[key] = (version, body, keys)
+        _feeds.move_to_end(key)
+        # Bodies from before the last write would be rebuilt on their next request anyway.
+        for old in [k for k, f in _feeds.items() if f[0] < version]:
+            del _feeds[old]
+        while len(_feeds) > MAX_CACHED_FEEDS:
+            _feeds.popitem(last=False)
+        if key[0] == "public":
+            # Drop blocks of deleted / aged-out / rewritten events that no current feed uses.
+            live = set().union(*(f[2] for f in _feeds.values() if f[0] == version))
+            for stale in [k for k in _vevents if k not in live]:
+                del _vevents[stale]
+    return body
+
+
+def public_feed() -> bytes:
+    def build() -> Tuple[bytes, FrozenSet[BlockKey]]:
+        since = int((datetime.now(timezone.utc) - timedelta(days=FEED_PAST_DAYS)).timestamp() * 1000)
+        versions = db.event_row_versions()
+        return _render("GenerationBridge Events", db.list_events_between(since, 2**62, limit=10_000), versions)
+
+    return _cached(("public", 0), build)
+
+
+def user_feed(user_id: int) -> bytes:
+    def build() -> Tuple[bytes, FrozenSet[BlockKey]]:
+        versions = db.event_row_versions()
+        return _render("My GenerationBridge Events", db.list_user_events(int(user_id)), versions)
+
+    return _cached(("user", int(user_id)), build)
+
+
+def _bench(events: int = 2000) -> None:
+    import os
+    import tempfile
+    import time
+
+    class _App:
+        config = {"SQLITE_PATH": os.path.join(tempfile.mkdtemp(), "bench.db")}
+
+    db.init_db(_App, seed=True)
+    today = date.today()
+    for i in range(events):
+        day = today + timedelta(days=i % 365)
+        db.create_event.submit(f"Event {i}", day.isoformat(), "10:00" if i % 2 else None,
+                               "Community Centre, Singapore", "Bring a friend, all ages welcome.")
+    db.create_event("last", today.isoformat())
+
+    def timed(label: str) -> None:
+        started = time.perf_counter()
+        body = public_feed()
+        print(f"  {label:24s} {(time.perf_counter() - started) * 1000:8.2f} ms  ({len(body) / 1e3:.0f} kB)")
+
+    print(f"public feed, {events + 1} events")
+    timed("cold")
+    timed("cached")
+    db.create_event("one more", today.isoformat(), "18:30")
+    timed("after one create_event")
+
+    started = time.perf_counter()
+    rows = db.list_events_between(today.isoformat(), (today + timedelta(days=7)).isoformat())
+    print(f"  this week: {len(rows)} events in {(time.perf_counter() - started) * 1000:.2f} ms")
+
+
+def _check() -> None:
+    import os
+    import tempfile
+
+    import geocoder
+
+    class _App:
+        config = {"SQLITE_PATH": os.path.join(tempfile.mkdtemp(), "check.db")}
+
+    db.init_db(_App, seed=True)
+    user = db.list_users()[0]["id"]
+    ev = db.create_event("Geocode me", date.today().isoformat(), "10:00", "Bishan CC", "")
+    db.set_event_rsvp(user, ev["id"])
+    uid = f"UID:event-{ev['id']}@generationbridge"
+
+    def block(feed: bytes) -> str:
+        text = feed.decode("utf-8")
+        start = text.index(uid)
+        return text[start : text.index("END:VEVENT", start)]
+
+    assert "GEO:" not in block(public_feed()) and "GEO:" not in block(user_feed(user))
+    geocoder.geocode_all()
+    lat = db.get_event(ev["id"])["latitude"]
+    assert lat is not None, "event was not geocoded"
+    for name, feed in (("public", public_feed()), ("user", user_feed(user))):
+        assert f"GEO:{lat};" in block(feed), f"{name} feed kept the pre-geocoding VEVENT"
+    print("ok: geocoded event has GEO in the public and user feeds")
+
+
+if __name__ == "__main__":
+    import sys
+
+    if sys.argv[1:2] == ["check"]:
+        _check()
+    else:
+        _bench(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,299 @@
+"""Worker pool for the durable job queue in db.py (jobs / jobs_dead tables).
+
+Usage (in create_app):
+    import jobs
+    jobs.workers.init_app(app, push=lambda uid, n: hub.publish(uid, "notification:new", n))
+
+    # in a request, instead of doing the work inline:
+    db_async.enqueue_job("notify", {"user_id": uid, "notif_type": "message", ...})
+    # or inside an existing @_serialized_write, so it commits with the caller:
+    db.add_job(conn, "notify", {...})
+
+Handlers are registered per job kind with @handler("kind"); a handler gets the
+decoded payload and raises to fail the attempt. Failed attempts are retried
+with exponential backoff (db.fail_job) and dead-lettered after max_attempts;
+a worker that dies mid-job loses its lease after visibility_s and the job is
+picked up again, so handlers must be safe to run twice.
+
+JOB_THREADS worker threads lease jobs (highest priority first). Handlers
+registered with process=True (CPU-bound work) are run in a pool of
+JOB_PROCESSES processes; they must be module-level functions.
+
+metrics() reports queue depth (ready / delayed / leased / dead, oldest ready
+job) and, per kind, completed / retried / dead counts with p50/p95 of run time
+and of enqueue-to-done latency.
+
+Benchmark (request-path cost of enqueueing vs doing the work inline, and
+worker throughput):
+    python jobs.py [jobs]
+"""
+
+from __future__ import annotations
+
+import collections
+import os
+import threading
+import time
+import traceback
+from typing import TYPE_CHECKING, Any, Callable, Deque, Dict, Optional, Tuple
+
+import db
+from traffic import percentile
+
+if TYPE_CHECKING:
+    from concurrent.futures import ProcessPoolExecutor
+
+THREADS = 4
+PROCESSES = 0
+POLL_INTERVAL_S = 1.0
+SAMPLES = 1024  # latency samples kept per kind
+
+_handlers: Dict[str, Tuple[Callable[[Any], Any], bool]] = {}
+
+
+def register(kind: str, fn: Callable[[Any], Any], *, process: bool = False) -> None:
+    _handlers[kind] = (fn, process)
+
+
+def handler(kind: str, *, process: bool = False):
+    """Decorator form of register()."""
+
+    def deco(fn: Callable[[Any], Any]) -> Callable[[Any], Any]:
+        register(kind, fn, process=process)
+        return fn
+
+    return deco
+
+
+class _KindStats:
+    __slots__ = ("completed", "retried", "dead", "lost", "run_ms", "latency_ms")
+
+    def __init__(self) -> None:
+        self.completed = self.retried = self.dead = self.lost = 0
+        self.run_ms: Deque[float] = collections.deque(maxlen=SAMPLES)
+        self.latency_ms: Deque[float] = collections.deque(maxlen=SAMPLES)
+
+    def to_dict(self) -> dict:
+        run, latency = sorted(self.run_ms), sorted(self.latency_ms)
+        return {
+            "completed": self.completed,
+            "retried": self.retried,
+            "dead": self.dead,
+            "lost_leases": self.lost,
+            "run_p50_ms": round(percentile(run, 50), 2),
+            "run_p95_ms": round(percentile(run, 95), 2),
+            "latency_p50_ms": round(percentile(latency, 50), 2),
+            "latency_p95_ms": round(percentile(latency, 95), 2),
+        }
+
+
+class JobWorkerPool:
+    """Threads that lease, run and ack jobs; optional process pool for CPU-bound kinds."""
+
+    def __init__(self, threads: int = THREADS, processes: int = PROCESSES,
+                 visibility_s: float = db.JOB_VISIBILITY_S) -> None:
+        self.threads = int(threads)
+        self.processes = int(processes)
+        self.visibility_s = float(visibility_s)
+        self.push: Optional[Callable[[int, dict], None]] = None
+        self._procs: Optional[ProcessPoolExecutor] = None
+        self._stop = threading.Event()
+        self._workers: list = []
+        self._lock = threading.Lock()
+        self._stats: Dict[str, _KindStats] = {}
+
+    def init_app(self, app, *, push: Optional[Callable[[int, dict], None]] = None, start: bool = True) -> None:
+        self.threads = int(app.config.get("JOB_THREADS", self.threads))
+        self.processes = int(app.config.get("JOB_PROCESSES", self.processes))
+        self.visibility_s = float(app.config.get("JOB_VISIBILITY_S", self.visibility_s))
+        self.push = push
+        if start:
+            self.start()
+
+    def start(self) -> None:
+        if self._workers:
+            return
+        self._stop.clear()
+        if self.processes > 0:
+            from concurrent.futures import ProcessPoolExecutor  # pulls in multiprocessing
+
+            self._procs = ProcessPoolExecutor(max_workers=self.processes)
+        for n in range(self.threads):
+            t = threading.Thread(target=self._loop, args=(f"{os.getpid()}:{n}",), name=f"job-worker-{n}", daemon=True)
+            t.start()
+            self._workers.append(t)
+
+    def stop(self, timeout_s: float = 10.0) -> None:
+        """Stop leasing; in-flight jobs finish (anything unacked is re-run after its lease expires)."""
+        self._stop.set()
+        db.jobs_ready_event().set()
+        for t in self._workers:
+            t.join(timeout=timeout_s)
+        self._workers = []
+        if self._procs is not None:
+            self._procs.shutdown(wait=True)
+            self._procs = None
+
+    def _loop(self, owner: str) -> None:
+        ready = db.jobs_ready_event()
+        while not self._stop.is_set():
+            # Clear before leasing: an enqueue committed after this point sets it again.
+            ready.clear()
+            try:
+                leased = db.lease_jobs(owner, 1, self.visibility_s)
+            except Exception:
+                leased = []
+            if not leased:
+                ready.wait(POLL_INTERVAL_S)
+                continue
+            for job in leased:
+                self._run(owner, job)
+
+    def _run(self, owner: str, job: dict) -> None:
+        kind = job["kind"]
+        started = time.perf_counter()
+        error: Optional[str] = None
+        entry = _handlers.get(kind)
+        if entry is None:
+            error = f"no handler registered for {kind!r}"
+        else:
+            fn, in_process = entry
+            try:
+                if in_process and self._procs is not None:
+                    self._procs.submit(fn, job["payload"]).result(timeout=self.visibility_s)
+                else:
+                    fn(job["payload"])
+            except Exception:
+                error = traceback.format_exc(limit=5)
+        run_ms = (time.perf_counter() - started) * 1000
+
+        try:
+            if error is None:
+                outcome = "completed" if db.complete_job(job["id"], owner) else None
+            else:
+                outcome = db.fail_job(job["id"], owner, error)
+        except Exception:
+            outcome = None
+        with self._lock:
+            stats = self._stats.setdefault(kind, _KindStats())
+            stats.run_ms.append(run_ms)
+            if outcome == "completed":
+                stats.completed += 1
+                stats.latency_ms.append(db.utcnow_ms() - int(job["created_at"]))
+            elif outcome == "retry":
+                stats.retried += 1
+            elif outcome == "dead":
+                stats.dead += 1
+            else:
+                stats.lost += 1
+
+    def metrics(self) -> dict:
+        with self._lock:
+            kinds = {kind: s.to_dict() for kind, s in sorted(self._stats.items())}
+        return {"queue": db.job_queue_depth(), "kinds": kinds, "threads": len(self._workers),
+                "processes": self.processes if self._procs is not None else 0}
+
+    def drain(self, timeout_s: float = 30.0) -> bool:
+        """Wait until no job is ready or leased (benchmarks, shutdown)."""
+        deadline = time.monotonic() + timeout_s
+        while time.monotonic() < deadline:
+            depth = db.job_queue_depth()
+            if depth["ready"] == 0 and depth["leased"] == 0:
+                return True
+            time.sleep(0.01)
+        return False
+
+
+# Singleton used by create_app
+workers = JobWorkerPool()
+
+
+# ---- Built-in handlers ----
+
+@handler("notify")
+def _notify(payload: dict) -> None:
+    """payload: db.notify() keyword arguments; pushes the notification if one was created or bumped."""
+    notification, _ = db.notify(**payload)
+    if notification is not None and workers.push is not None:
+        workers.push(int(payload["user_id"]), notification)
+
+
+@handler("log_login_event")
+def _log_login_event(payload: dict) -> None:
+    db.log_login_event(payload.get("user_id"), payload.get("email") or "", bool(payload.get("success")),
+                       payload.get("ip") or "", payload.get("user_agent") or "")
+
+
+@handler("geocode_events")
+def _geocode_events(payload: Optional[dict]) -> None:
+    import geocoder
+
+    geocoder.geocode_all()
+
+
+def _bench(jobs: int = 2000) -> None:
+    import tempfile
+
+    class _App:
+        config = {"SQLITE_PATH": os.path.join(tempfile.mkdtemp(), "bench.db")}
+
+    db.init_db(_App, seed=True)
+    users = [u["id"] for u in db.list_users()]
+
+    def notify_payload(i: int) -> dict:
+        return {"user_id": users[i % len(users)], "notif_type": "message", "icon": "chat",
+                "title": f"New message {i}", "content": "Hello!", "link": f"/messages/{i}"}
+
+    def timed(fn, n: int) -> list:
+        samples = []
+        for i in range(n):
+            t0 = time.perf_counter()
+            fn(i)
+            samples.append((time.perf_counter() - t0) * 1000)
+        return sorted(samples)
+
+    n = min(jobs, 1000)
+    inline = timed(lambda i: db.notify(**notify_payload(i)), n)
+    queued = timed(lambda i: db.enqueue_job("notify", notify_payload(i)), n)
+    print(f"request path, {n} notifications: inline db.notify p50 {percentile(inline, 50):.3f} ms "
+          f"p95 {percentile(inline, 95):.3f} ms; enqueue_job p50 {percentile(queued, 50):.3f} ms "
+          f"p95 {percentile(queued, 95):.3f} ms")
+
+    # Throughput: work that waits on something slow (a push / LLM round trip) scales with threads.
+    register("bench_io", lambda payload: time.sleep(0.005))
+    calls = {"n": 0}
+
+    def flaky(payload: Any) -> None:
+        calls["n"] += 1
+        raise RuntimeError("upstream unavailable")
+
+    register("bench_flaky", flaky)
+    db.JOB_BACKOFF_BASE_S = 0.01
+    for threads in (1, 4, 8):
+        for i in range(jobs):
+            db.enqueue_job("bench_io", {"i": i}, priority=i % 3)
+        pool = JobWorkerPool(threads=threads)
+        started = time.perf_counter()
+        pool.start()
+        pool.drain(300)
+        elapsed = time.perf_counter() - started
+        pool.stop()
+        k = pool.metrics()["kinds"]["bench_io"]
+        print(f"  {threads} threads: {jobs} jobs (5 ms each) in {elapsed:.2f}s ({jobs / elapsed:,.0f} jobs/s), "
+              f"latency p95 {k['latency_p95_ms']:.0f} ms")
+
+    pool = JobWorkerPool(threads=2)
+    pool.start()
+    db.enqueue_job("bench_flaky", {}, max_attempts=3)
+    deadline = time.monotonic() + 10
+    while not db.list_dead_jobs() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    metrics = pool.metrics()
+    pool.stop()
+    print(f"flaky job: {calls['n']} attempts, then dead-lettered; queue {metrics['queue']}")
+
+
+if __name__ == "__main__":
+    import sys
+
+    _bench(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
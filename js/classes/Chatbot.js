@@ -59,10 +59,11 @@ class Chatbot {
         const typingIndicator = this.addTypingIndicator(messagesContainer);
         
         try {
+            // Served from the precomputed suggestion cache (no LLM call per click)
             const response = await fetch('/api/chatbot/suggest', {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({})
+                body: JSON.stringify({ page: 'chatbot' })
             });
 
             if (!response.ok) {
@@ -90,8 +90,8 @@ class GenerationBridgeApp {
     async ensureWarningAcknowledged() {
         // Only applies to logged in, non-admin users.
         try {
-            const res = await fetch('/api/auth/me');
-            const data = await res.json().catch(() => ({}));
+            // Landing page: /api/home already carries the user and warning.
+            const data = window.gbHomeData || await (await fetch('/api/auth/me')).json().catch(() => ({}));
             const user = data?.user;
             if (!user || user.is_admin) return;
 
@@ -2,6 +2,8 @@ class NotificationManager {
     constructor() {
         this.notifications = [];
         this.realtimeClient = null;
+        // Server-side unread count from /api/badges (null until loaded)
+        this.unreadCount = null;
     }
 
     formatTimestamp(ts) {
@@ -27,6 +29,7 @@ class NotificationManager {
         if (this.realtimeClient) {
             this.realtimeClient.onNotificationNew((notif) => {
                 this.notifications = [notif, ...this.notifications];
+                if (this.unreadCount !== null) this.unreadCount += 1;
                 this.updateBadge();
                 this.render('dropdown-notification-list', this.notifications);
             });
@@ -34,6 +37,16 @@ class NotificationManager {
     }
 
     async refresh() {
+        // Landing page: use the notifications/badges already loaded by /api/home (once).
+        const home = window.gbHomeData;
+        if (home && Array.isArray(home.notifications) && !this._homeSeeded) {
+            this._homeSeeded = true;
+            this.notifications = home.notifications;
+            this.unreadCount = Number(home.badges?.notifications) || 0;
+            this.render('dropdown-notification-list', this.notifications);
+            this.updateBadge();
+            return;
+        }
         try {
             const res = await fetch('/api/notifications');
             const data = await res.json();
@@ -45,13 +58,29 @@ class NotificationManager {
         }
         this.render('dropdown-notification-list', this.notifications);
         this.updateBadge();
+        this.refreshBadges();
+    }
+
+    async refreshBadges() {
+        try {
+            const res = await fetch('/api/badges');
+            const data = await res.json();
+            if (data && data.ok && data.badges) {
+                this.unreadCount = Number(data.badges.notifications) || 0;
+                this.updateBadge();
+            }
+        } catch (e) {
+            // ignore (badge falls back to the loaded list)
+        }
     }
 
     updateBadge() {
         const badge = document.getElementById('notificationBadge');
         if (!badge) return;
         
-        const unreadCount = this.notifications.filter(n => !(n.is_read || n.isRead)).length;
+        const unreadCount = (this.unreadCount !== null)
+            ? this.unreadCount
+            : this.notifications.filter(n => !(n.is_read || n.isRead)).length;
 
         if (unreadCount > 0) {
             badge.textContent = unreadCount;
@@ -65,6 +94,7 @@ class NotificationManager {
         (async () => {
             try { await fetch('/api/notifications/clear', { method: 'POST' }); } catch (e) {}
             this.notifications.length = 0;
+            this.unreadCount = 0;
             this.updateBadge();
             this.render('dropdown-notification-list', this.notifications);
         })();
@@ -13,6 +13,32 @@ class Translator {
         historyContainer.prepend(newItem);
     }
 
+    async translateOne(text, direction) {
+        const response = await fetch('/api/translator/translate', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ text, direction })
+        });
+        const data = await response.json();
+        return (data && data.ok) ? data.translation : null;
+    }
+
+    async translateBatch(lines, direction) {
+        // Blank lines are kept in place; only the non-blank ones are sent
+        const phrases = lines.map(line => line.trim()).filter(Boolean);
+        const response = await fetch('/api/translator/translate_batch', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ phrases, direction })
+        });
+        if (!response.ok) return null;
+        const data = await response.json();
+        if (!data || !data.ok || !Array.isArray(data.translations)) return null;
+        // Results come back in input order
+        const results = data.translations.map(t => t.translation);
+        return lines.map(line => line.trim() ? results.shift() : line).join('\n');
+    }
+
         async performTranslation() {
         const modernTextarea = document.getElementById('modernText');
         const traditionalTextarea = document.getElementById('traditionalText');
@@ -34,22 +60,29 @@ class Translator {
             // Clear output before updating with the new translation
             outputTextarea.value = "";
 
-            const response = await fetch('/api/translator/translate', {
-                method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({ text: inputText, direction })
-            });
-
-            const data = await response.json();
+            // Several lines go out as one batch request (one upstream round trip);
+            // if the batch route is unavailable, translate the whole text as before.
+            const lines = inputText.split('\n');
+            let translation = null;
+            if (lines.filter(line => line.trim()).length > 1) {
+                try {
+                    translation = await this.translateBatch(lines, direction);
+                } catch (error) {
+                    console.warn('Batch translation failed, falling back:', error);
+                }
+            }
+            if (translation === null) {
+                translation = await this.translateOne(inputText, direction);
+            }
 
-            if (data && data.ok) {
-                outputTextarea.value = data.translation;
+            if (translation !== null) {
+                outputTextarea.value = translation;
 
                 if (direction === "to_traditional") {
-                    this.addToHistory(inputText, data.translation);
+                    this.addToHistory(inputText, translation);
                 } else {
                     // direction === "to_modern"
-                    this.addToHistory(data.translation, inputText);
+                    this.addToHistory(translation, inputText);
                 }
             }
         } catch (error) {
@@ -0,0 +1,45 @@
+"""Shared OpenAI client for the chatbot, translator and suggestion refresher.
+
+Usage:
+    import llm
+    reply = llm.chat([{"role": "user", "content": prompt}], temperature=0.7)
+
+`import openai` costs ~0.7 s (pydantic, httpx and the generated types), more
+than the rest of startup put together. Nothing here imports it until the
+first chat() / client() call, so create_app(), the CLI scripts and workers
+that never reach an LLM don't pay for it. The client is created once per
+process and shared (it is thread-safe and pools connections).
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+DEFAULT_MODEL = "gpt-4o-mini"
+
+_client: Any = None
+_lock = threading.Lock()
+
+
+def model_name(model: Optional[str] = None) -> str:
+    return model or os.environ.get("OPENAI_MODEL", DEFAULT_MODEL)
+
+
+def client() -> Any:
+    """The process-wide OpenAI client, imported and created on first use."""
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                from openai import OpenAI
+
+                _client = OpenAI()
+    return _client
+
+
+def chat(messages: List[Dict[str, str]], *, model: Optional[str] = None, temperature: float = 0.7) -> str:
+    """One chat completion; returns the reply text."""
+    resp = client().chat.completions.create(model=model_name(model), messages=messages, temperature=temperature)
+    return resp.choices[0].message.content or ""
@@ -0,0 +1,113 @@
+"""In-memory login throttling for /api/auth/login and /api/auth/admin_login.
+
+Usage (in the auth routes, before any DB lookup):
+    from login_throttle import throttle
+
+    allowed, retry_after = throttle.allow(ip, email)
+    if not allowed:
+        return 429 with a Retry-After header
+    ...
+    if login succeeded:
+        throttle.record_success(email)
+
+Each key (IP, email) uses a sliding-window counter: two fixed buckets with the
+previous one weighted by how much of it still overlaps the window. Checks and
+updates are O(1) and never touch login_events; history for charts lives in the
+hourly rollups (db.list_login_rollups).
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+
+class _Window:
+    __slots__ = ("start", "curr", "prev")
+
+    def __init__(self, start: float) -> None:
+        self.start = start
+        self.curr = 0
+        self.prev = 0
+
+
+class SlidingWindowLimiter:
+    """Approximate sliding-window counter keyed by string."""
+
+    def __init__(self, limit: int, window_s: float, max_keys: int = 100_000) -> None:
+        self.limit = int(limit)
+        self.window_s = float(window_s)
+        self.max_keys = int(max_keys)
+        self._windows: Dict[str, _Window] = {}
+        self._lock = threading.Lock()
+
+    def _roll(self, w: _Window, now: float) -> None:
+        elapsed = now - w.start
+        if elapsed < self.window_s:
+            return
+        w.prev = w.curr if elapsed < 2 * self.window_s else 0
+        w.curr = 0
+        w.start = now - (elapsed % self.window_s)
+
+    def _estimate(self, w: _Window, now: float) -> float:
+        overlap = 1.0 - (now - w.start) / self.window_s
+        return w.prev * overlap + w.curr
+
+    def _prune(self, now: float) -> None:
+        horizon = now - 2 * self.window_s
+        for key in [k for k, w in self._windows.items() if w.start < horizon]:
+            del self._windows[key]
+
+    def hit(self, key: str, now: Optional[float] = None) -> Tuple[bool, float]:
+        """Count one attempt if under the limit. Returns (allowed, retry_after_s)."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            w = self._windows.get(key)
+            if w is None:
+                if len(self._windows) >= self.max_keys:
+                    self._prune(now)
+                w = self._windows[key] = _Window(now)
+            self._roll(w, now)
+            if self._estimate(w, now) >= self.limit:
+                return False, max(0.0, self.window_s - (now - w.start))
+            w.curr += 1
+            return True, 0.0
+
+    def reset(self, key: str) -> None:
+        with self._lock:
+            self._windows.pop(key, None)
+
+
+class LoginThrottle:
+    """Per-IP and per-email attempt limits for the login endpoints."""
+
+    def __init__(self, per_ip: int = 30, per_email: int = 5, window_s: float = 900.0) -> None:
+        self.by_ip = SlidingWindowLimiter(per_ip, window_s)
+        self.by_email = SlidingWindowLimiter(per_email, window_s)
+
+    def init_app(self, app) -> None:
+        window_s = float(app.config.get("LOGIN_THROTTLE_WINDOW_S", self.by_ip.window_s))
+        self.by_ip = SlidingWindowLimiter(int(app.config.get("LOGIN_THROTTLE_PER_IP", self.by_ip.limit)), window_s)
+        self.by_email = SlidingWindowLimiter(
+            int(app.config.get("LOGIN_THROTTLE_PER_EMAIL", self.by_email.limit)), window_s
+        )
+
+    @staticmethod
+    def _email_key(email: str) -> str:
+        return (email or "").strip().lower()
+
+    def allow(self, ip: str, email: str) -> Tuple[bool, float]:
+        """Record an attempt; returns (allowed, retry_after_s). Rejected attempts are not counted."""
+        ok, retry = self.by_ip.hit(ip or "")
+        if not ok:
+            return False, retry
+        ok, retry = self.by_email.hit(self._email_key(email))
+        return ok, retry
+
+    def record_success(self, email: str) -> None:
+        self.by_email.reset(self._email_key(email))
+
+
+# Singleton used by the auth routes
+throttle = LoginThrottle()
@@ -0,0 +1,321 @@
+"""Automatic moderation scanning of new user content, off the request path.
+
+Usage (in create_app):
+    from moderation import scanner
+    scanner.init_app(app, push=lambda report: hub.publish_admins("report:new", report))
+
+New messages, stories, story comments, skill posts and skill responses reach
+the scanner through db.add_content_listener() once their write has committed;
+the listener only enqueues. A dispatcher thread batches the queue into a
+process pool, where each worker scores text with a compiled multi-pattern
+matcher over moderation.json (translator.PhraseMatcher) plus a few heuristics
+(links, contact numbers, shouting, repetition). Items scoring FLAG_SCORE or
+more are filed with db.create_system_reports() under the system reporter, and
+each new report is passed to push (report:new for the admins).
+
+MODERATION_WORKERS = 0 scans on the dispatcher thread instead of a pool.
+
+Benchmark (scan throughput, and create_message latency with scanning on):
+    python moderation.py [items]
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import queue
+import re
+import threading
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+import db
+from translator import PhraseMatcher, normalize
+
+TERMS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "moderation.json")
+# A single insult (including phrases that are often said in jest, like "shut
+# up" or "ok boomer") stays below FLAG_SCORE; only unambiguous abuse flags on
+# its own, otherwise several distinct hits are needed to file a report.
+CATEGORY_WEIGHTS = {"abuse": 3, "insult": 1, "scam": 2, "contact": 1}
+FLAG_SCORE = 3
+BATCH_SIZE = 128
+BATCH_WAIT_S = 0.05
+MAX_QUEUE = 100_000
+
+_URL_RE = re.compile(r"https?://|www\.", re.I)
+_SHORTENER_RE = re.compile(r"\b(?:bit\.ly|tinyurl\.com|t\.co|goo\.gl|is\.gd|cutt\.ly)/", re.I)
+_LONG_NUMBER_RE = re.compile(r"(?:\d[\s-]?){8,}")
+_REPEAT_RE = re.compile(r"(.)\1{7,}")
+
+# (kind, item id, author id, text)
+Item = Tuple[str, int, int, str]
+
+_matcher: Optional[PhraseMatcher] = None
+
+
+def _load_matcher(path: str = TERMS_PATH) -> PhraseMatcher:
+    with open(path, encoding="utf-8") as fp:
+        terms = json.load(fp)
+    return PhraseMatcher((term, category) for category, words in terms.items() for term in words)
+
+
+def _init_worker(path: str = TERMS_PATH) -> None:
+    global _matcher
+    _matcher = _load_matcher(path)
+
+
+def scan(text: str) -> Tuple[int, List[str]]:
+    """Score one text; returns (score, reasons)."""
+    global _matcher
+    if _matcher is None:
+        _matcher = _load_matcher()
+    score = 0
+    reasons: List[str] = []
+    key = normalize(text)
+    seen = set()
+    for start, end, category in _matcher.find(key):
+        term = key[start:end]
+        if term in seen:
+            continue  # repeating a word doesn't add to the score
+        seen.add(term)
+        score += CATEGORY_WEIGHTS.get(category, 1)
+        reasons.append(f"{category}: \"{term}\"")
+
+    links = len(_URL_RE.findall(text))
+    if links >= 3:
+        score += 2
+        reasons.append(f"{links} links")
+    if _SHORTENER_RE.search(text):
+        score += 1
+        reasons.append("shortened link")
+    if _LONG_NUMBER_RE.search(text):
+        score += 1
+        reasons.append("phone / account number")
+    letters = [ch for ch in text if ch.isalpha()]
+    if len(letters) >= 20 and sum(ch.isupper() for ch in letters) / len(letters) > 0.7:
+        score += 1
+        reasons.append("shouting")
+    if _REPEAT_RE.search(text):
+        score += 1
+        reasons.append("repeated characters")
+    return score, reasons
+
+
+def scan_batch(items: List[Item]) -> List[dict]:
+    """Scan a batch (runs in a pool worker); returns flags for db.create_system_reports."""
+    flags = []
+    for kind, item_id, author_id, text in items:
+        score, reasons = scan(text or "")
+        if score >= FLAG_SCORE:
+            flags.append({
+                "kind": kind,
+                "id": item_id,
+                "author_id": author_id,
+                "reason": f"Automatic scan: {kind.replace('_', ' ')} flagged",
+                "details": f"score {score}; " + "; ".join(reasons[:10]),
+            })
+    return flags
+
+
+class _InlineExecutor(Executor):
+    """MODERATION_WORKERS = 0: run batches on the calling thread."""
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        future: Future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as exc:
+            future.set_exception(exc)
+        return future
+
+
+class ModerationScanner:
+    """Content listener + batching dispatcher in front of a process pool."""
+
+    def __init__(self, workers: Optional[int] = None, batch_size: int = BATCH_SIZE) -> None:
+        self.workers = workers
+        self.batch_size = int(batch_size)
+        self.push: Optional[Callable[[dict], None]] = None
+        self._queue: "queue.Queue[Optional[Tuple[Item, float]]]" = queue.Queue(MAX_QUEUE)
+        self._pool: Optional[Executor] = None
+        self._inflight: Optional[threading.Semaphore] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._stats: Dict[str, float] = {"queued": 0, "scanned": 0, "flagged": 0, "dropped": 0, "max_lag_ms": 0.0}
+
+    def init_app(self, app, *, push: Optional[Callable[[dict], None]] = None, start: bool = True) -> None:
+        if "MODERATION_WORKERS" in app.config:
+            self.workers = int(app.config["MODERATION_WORKERS"])
+        self.push = push
+        if start:
+            self.start()
+
+    # ---- Listener (writer thread, after commit) ----
+
+    def submit(self, kind: str, item_id: int, author_id: int, text: str) -> None:
+        try:
+            self._queue.put_nowait(((kind, int(item_id), int(author_id), text), time.monotonic()))
+        except queue.Full:
+            with self._lock:
+                self._stats["dropped"] += 1
+            return
+        with self._lock:
+            self._stats["queued"] += 1
+
+    # ---- Dispatcher ----
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        workers = (os.cpu_count() or 2) if self.workers is None else self.workers
+        if workers > 0:
+            self._pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+        else:
+            self._pool = _InlineExecutor()
+        # Bounded batches in flight; the queue absorbs bursts meanwhile.
+        self._inflight = threading.Semaphore(max(1, workers) * 2)
+        self._thread = threading.Thread(target=self._loop, name="moderation-dispatcher", daemon=True)
+        self._thread.start()
+        db.add_content_listener(self.submit)
+
+    def stop(self) -> None:
+        db.remove_content_listener(self.submit)
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout=10)
+            self._thread = None
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+    def _loop(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = [first]
+            deadline = time.monotonic() + BATCH_WAIT_S
+            stopping = False
+            while len(batch) < self.batch_size:
+                try:
+                    nxt = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if nxt is None:
+                    stopping = True
+                    break
+                batch.append(nxt)
+            self._dispatch(batch)
+            if stopping:
+                return
+
+    def _dispatch(self, batch: List[Tuple[Item, float]]) -> None:
+        self._inflight.acquire()
+        oldest = min(enqueued for _, enqueued in batch)
+        try:
+            future = self._pool.submit(scan_batch, [item for item, _ in batch])
+        except Exception:
+            self._inflight.release()
+            return
+        future.add_done_callback(lambda f: self._scanned(f, len(batch), oldest))
+
+    def _scanned(self, future: Future, count: int, oldest: float) -> None:
+        self._inflight.release()
+        flags = [] if future.exception() else future.result()
+        with self._lock:
+            self._stats["scanned"] += count
+            self._stats["flagged"] += len(flags)
+            self._stats["max_lag_ms"] = max(self._stats["max_lag_ms"], (time.monotonic() - oldest) * 1000)
+        if flags:
+            # Don't block the pool's result thread on the writer.
+            db.create_system_reports.submit(flags).add_done_callback(self._filed)
+
+    def _filed(self, future: Future) -> None:
+        if future.exception() or self.push is None:
+            return
+        for report in future.result():
+            try:
+                self.push(report)
+            except Exception:
+                pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = dict(self._stats)
+        out["backlog"] = self._queue.qsize()
+        return out
+
+    def drain(self, timeout_s: float = 30.0) -> bool:
+        """Wait until everything queued so far has been scanned (benchmarks, shutdown)."""
+        deadline = time.monotonic() + timeout_s
+        while time.monotonic() < deadline:
+            s = self.stats()
+            if s["scanned"] + s["dropped"] >= s["queued"]:
+                return True
+            time.sleep(0.01)
+        return False
+
+
+# Singleton used by create_app
+scanner = ModerationScanner()
+
+
+def _bench(items: int = 20_000) -> None:
+    import random
+    import tempfile
+
+    class _App:
+        config = {"SQLITE_PATH": os.path.join(tempfile.mkdtemp(), "bench.db")}
+
+    rng = random.Random(7)
+    clean = ["See you at the community centre on Saturday!", "My grandson taught me how to use video calls.",
+             "Does anyone have a good recipe for kueh lapis?", "Thanks for sharing, that was lovely to read."]
+    bad = ["Please buy me Google gift cards, it is urgent payment", "you are such an idiot, shut up",
+           "WhatsApp me, my number is 9123 4567 89", "LOOOOOOOOOOL CHECK THIS OUT NOW EVERYONE"]
+    texts = [rng.choice(bad) if rng.random() < 0.05 else rng.choice(clean) for _ in range(items)]
+
+    started = time.perf_counter()
+    for t in texts:
+        scan(t)
+    per_item = (time.perf_counter() - started) / items
+    print(f"scan(): {per_item * 1e6:.1f} us/item on one core ({1 / per_item:,.0f} items/s)")
+
+    db.init_db(_App, seed=True)
+    users = [u["id"] for u in db.list_users()]
+
+    def send_messages(n: int) -> List[float]:
+        samples = []
+        for i in range(n):
+            t0 = time.perf_counter()
+            db.create_message(users[i % len(users)], users[(i + 1) % len(users)], texts[i % len(texts)])
+            samples.append((time.perf_counter() - t0) * 1000)
+        return sorted(samples)
+
+    n = min(items, 2000)
+    off = send_messages(n)
+    pool = ModerationScanner()
+    pool.start()
+    on = send_messages(n)
+    pool.drain()
+    p95 = lambda s: s[int(len(s) * 0.95)]  # noqa: E731
+    print(f"create_message p95: {p95(off):.3f} ms without scanning, {p95(on):.3f} ms with the scanner attached")
+
+    # Burst: enqueue everything at once and time how long the pool takes to catch up.
+    started = time.perf_counter()
+    for i, t in enumerate(texts):
+        pool.submit("message", 10_000_000 + i, users[0], t)
+    pool.drain(120)
+    elapsed = time.perf_counter() - started
+    stats = pool.stats()
+    print(f"burst of {items}: scanned in {elapsed:.2f}s ({items / elapsed:,.0f} items/s, "
+          f"{pool._pool._max_workers if isinstance(pool._pool, ProcessPoolExecutor) else 0} workers), "
+          f"max lag {stats['max_lag_ms']:.0f} ms, flagged {stats['flagged']:.0f}")
+    pool.stop()
+    print(f"pending reports: {len(db.list_reports(status='pending', limit=100_000))}")
+
+
+if __name__ == "__main__":
+    import sys
+
+    _bench(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000)
@@ -0,0 +1,19 @@
+from db import purge_pending
+from app import app
+
+
+# Finish purging tombstoned users / stories / skill posts now instead of
+# waiting for the background purger (see db.purge_pending()).
+def show(task: dict) -> None:
+    print(
+        f"\r{task['entity']} {task['entity_id']}: {task['percent']:5.1f}%  "
+        f"{task['rows_purged']}/{task['rows_total']} rows  ({task['current_table'] or 'done'})",
+        end="\n" if task["done"] else "",
+        flush=True,
+    )
+
+
+with app.app_context():
+    finished = purge_pending(progress=show)
+
+print(f"Purged {finished} deleted item(s)")
@@ -8,6 +8,6 @@ if os.path.exists("app.db"):
 
 # Recreate database + seed
 with app.app_context():
-    init_db(app)
+    init_db(app, seed=True)
 
 print("Database re-seeded successfully!")
@@ -0,0 +1,465 @@
+"""Compact row records and a fast JSON path for the hot list endpoints.
+
+The dict helpers in db.py build a dict per sqlite3.Row and then a second dict
+in the API shape. The record classes here are __slots__ dataclasses built
+straight from cursor tuples (no sqlite3.Row), already in the API shape, and
+encode() serializes them directly to bytes:
+
+    from records import list_thread_records, encode
+    return Response(encode({"ok": True, "messages": list_thread_records(a, b)}),
+                    mimetype="application/json")
+
+encode() uses orjson when it is installed (it serializes slotted dataclasses
+natively) and falls back to the stdlib json module otherwise. The JSON output
+is the same as the matching db.py helper's.
+
+Benchmarks:
+    python records.py [rows]   # time/allocations per 10k rows, dicts vs records
+    python records.py stream   # peak memory, list_stories vs streamed NDJSON
+    python records.py check    # exits non-zero if streaming memory grows with row count
+"""
+
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+from typing import Any, ClassVar, Dict, Iterable, Iterator, List, Optional, Sequence
+
+import db
+
+try:
+    import orjson
+except ImportError:  # optional: stdlib fallback below
+    orjson = None
+
+
+@dataclass(slots=True)
+class UserRecord:
+    """Same shape as db.get_user_public()."""
+
+    id: int
+    full_name: Optional[str]
+    email: Optional[str]
+    age: Optional[int]
+    generation: Optional[str]
+    bio: Optional[str]
+    match_preferences: Optional[str]
+    avatar: Optional[str]
+    interests: List[str]
+    is_admin: bool
+    is_banned: bool
+    show_in_matchup: bool
+
+    # group_concat separator for interests (ASCII unit separator)
+    SQL: ClassVar[str] = """
+        SELECT u.id, u.full_name, u.email, u.age, u.generation, u.bio, u.match_preferences, u.avatar,
+               (SELECT group_concat(interest_name, char(31))
+                FROM (SELECT interest_name FROM user_interests WHERE user_id=u.id ORDER BY interest_name)),
+               u.is_admin, u.is_banned, u.show_in_matchup
+        FROM users u
+    """
+
+    @classmethod
+    def from_row(cls, t: Sequence[Any]) -> "UserRecord":
+        return cls(
+            t[0], t[1], t[2], t[3], t[4], t[5], t[6], t[7],
+            t[8].split("\x1f") if t[8] else [],
+            bool(t[9]), bool(t[10]), bool(t[11]),
+        )
+
+
+@dataclass(slots=True)
+class StoryRecord:
+    """Same shape as db.get_story()."""
+
+    id: int
+    user_id: int
+    title: str
+    category: str
+    content: str
+    status: str
+    created_at: str
+    comments_count: int
+    user: Optional[UserRecord]
+
+    COLUMNS: ClassVar[str] = "id, user_id, title, category, content, status, created_at, comments_count"
+
+
+@dataclass(slots=True)
+class MessageRecord:
+    """Same shape as db.get_message()."""
+
+    id: int
+    sender_id: int
+    recipient_id: int
+    text: str
+    created_at: str
+    is_read: int
+
+    COLUMNS: ClassVar[str] = "id, sender_id, recipient_id, text, created_at, is_read"
+
+    @classmethod
+    def from_row(cls, t: Sequence[Any]) -> "MessageRecord":
+        return cls(t[0], t[1], t[2], t[3], db.ms_to_iso(t[4]), t[5])
+
+
+@dataclass(slots=True)
+class NotificationRecord:
+    """Same shape as db.get_notification()."""
+
+    id: int
+    type: str
+    icon: str
+    title: str
+    content: str
+    link: Optional[str]
+    time: str
+    isRead: bool
+    count: int
+
+    COLUMNS: ClassVar[str] = (
+        "id, notif_type, icon, title, content, link, COALESCE(updated_at, created_at), is_read, group_count"
+    )
+
+    @classmethod
+    def from_row(cls, t: Sequence[Any]) -> "NotificationRecord":
+        return cls(t[0], t[1], t[2], t[3], t[4], t[5], db.ms_to_iso(t[6]), bool(t[7]), t[8] or 1)
+
+
+@dataclass(slots=True)
+class EventRecord:
+    """Same shape as db.get_event()."""
+
+    id: int
+    title: str
+    description: Optional[str]
+    location: Optional[str]
+    start_date: str
+    start_time: Optional[str]
+    end_date: Optional[str]
+    end_time: Optional[str]
+    link: Optional[str]
+    created_at: str
+    latitude: Optional[float]
+    longitude: Optional[float]
+    starts_at: Optional[int]
+    ends_at: Optional[int]
+
+    COLUMNS: ClassVar[str] = (
+        "id, title, description, location, start_date, start_time, end_date, end_time, link, "
+        "created_at, latitude, longitude, starts_at, ends_at"
+    )
+
+
+# ---- Fetchers ----
+
+def _raw(conn, sql: str, params: Iterable[Any] = ()) -> List[tuple]:
+    cur = conn.execute(sql, tuple(params))
+    cur.row_factory = None
+    return cur.fetchall()
+
+
+def _users_by_id(conn, user_ids: Iterable[int]) -> Dict[int, UserRecord]:
+    ids = sorted({int(i) for i in user_ids})
+    if not ids:
+        return {}
+    marks = ",".join("?" * len(ids))
+    return {
+        r[0]: UserRecord.from_row(r)
+        for r in _raw(conn, f"{UserRecord.SQL} WHERE u.id IN ({marks}) AND u.deleted_at IS NULL", ids)
+    }
+
+
+def list_user_records(
+    exclude_user_id: Optional[int] = None, *, only_matchup: bool = False, limit: Optional[int] = None
+) -> List[UserRecord]:
+    clauses, params = ["u.deleted_at IS NULL", "u.is_system=0"], []
+    if exclude_user_id:
+        clauses.append("u.id<>?")
+        params.append(int(exclude_user_id))
+    if only_matchup:
+        clauses.append("u.show_in_matchup=1")
+    where_sql = " WHERE " + " AND ".join(clauses)
+    params.append(-1 if limit is None else int(limit))
+    conn = db.get_conn()
+    try:
+        return [UserRecord.from_row(r) for r in _raw(conn, f"{UserRecord.SQL}{where_sql} ORDER BY u.id LIMIT ?", params)]
+    finally:
+        conn.close()
+
+
+def list_story_records(limit: Optional[int] = None) -> List[StoryRecord]:
+    """Stories newest first; authors in one batched query (no N+1)."""
+    conn = db.get_conn()
+    try:
+        rows = _raw(
+            conn,
+            f"SELECT {StoryRecord.COLUMNS} FROM stories WHERE deleted_at IS NULL ORDER BY id DESC LIMIT ?",
+            (-1 if limit is None else int(limit),),
+        )
+        if not rows:
+            return []
+        users = _users_by_id(conn, (r[1] for r in rows))
+        return [StoryRecord(*r, users.get(r[1])) for r in rows]
+    finally:
+        conn.close()
+
+
+def list_thread_records(user_a: int, user_b: int, limit: int = 200) -> List[MessageRecord]:
+    conn = db.get_conn()
+    try:
+        if db._any_tombstoned(conn, user_a, user_b):
+            return []
+        rows = db._select_partitioned(
+            conn,
+            "messages",
+            "(sender_id=? AND recipient_id=?) OR (sender_id=? AND recipient_id=?)",
+            (int(user_a), int(user_b), int(user_b), int(user_a)),
+            limit=int(limit),
+            newest_first=False,
+            columns=MessageRecord.COLUMNS,
+            raw=True,
+        )
+        return [MessageRecord.from_row(r) for r in rows]
+    finally:
+        conn.close()
+
+
+def list_notification_records(user_id: int, limit: int = 50) -> List[NotificationRecord]:
+    conn = db.get_conn()
+    try:
+        rows = db._select_partitioned(
+            conn,
+            "notifications",
+            "user_id=?",
+            (int(user_id),),
+            limit=int(limit),
+            newest_first=True,
+            columns=NotificationRecord.COLUMNS,
+            raw=True,
+        )
+        return [NotificationRecord.from_row(r) for r in rows]
+    finally:
+        conn.close()
+
+
+def list_event_records(limit: int = 50, upcoming_only: bool = True) -> List[EventRecord]:
+    limit = int(limit or 50)
+    if limit <= 0:
+        limit = 50
+    conn = db.get_conn()
+    try:
+        if upcoming_only:
+            rows = _raw(
+                conn,
+                f"""
+                SELECT {EventRecord.COLUMNS} FROM events
+                WHERE starts_at >= ?
+                ORDER BY starts_at ASC, id ASC
+                LIMIT ?
+                """,
+                (db._start_of_today_ms(), limit),
+            )
+            if len(rows) < limit:  # undated (unparseable start_date) rows last, as in db.list_events()
+                rows += _raw(
+                    conn,
+                    f"SELECT {EventRecord.COLUMNS} FROM events WHERE starts_at IS NULL ORDER BY id ASC LIMIT ?",
+                    (limit - len(rows),),
+                )
+        else:
+            rows = _raw(
+                conn,
+                f"""
+                SELECT {EventRecord.COLUMNS} FROM events
+                ORDER BY starts_at DESC, id DESC
+                LIMIT ?
+                """,
+                (limit,),
+            )
+        return [EventRecord(*r) for r in rows]
+    finally:
+        conn.close()
+
+
+# ---- Encoding ----
+
+def _to_json(obj: Any) -> Any:
+    slots = getattr(type(obj), "__slots__", None)
+    if slots is not None:
+        return {name: getattr(obj, name) for name in slots}
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def encode(obj: Any) -> bytes:
+    """Serialize dicts/lists/records to UTF-8 JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, default=_to_json, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def ndjson_lines(items: Iterable[Any]) -> Iterator[bytes]:
+    """One encoded record per line, for `Accept: application/x-ndjson` responses:
+
+        Response(stream_with_context(ndjson_lines(db.iter_stories())),
+                 mimetype="application/x-ndjson")
+    """
+    for item in items:
+        yield encode(item) + b"\n"
+
+
+def wants_ndjson(accept_header: Optional[str]) -> bool:
+    return "application/x-ndjson" in (accept_header or "")
+
+
+def _bench(rows: int = 10_000) -> None:
+    import os
+    import tempfile
+    import time
+    import tracemalloc
+
+    class _App:
+        config = {"SQLITE_PATH": os.path.join(tempfile.mkdtemp(), "bench.db")}
+
+    db.init_db(_App, seed=True)
+    for i in range(rows):
+        db.create_message.submit(2, 3, f"benchmark message {i}")
+    db.create_message(2, 3, "last")
+
+    def dict_path() -> bytes:
+        return json.dumps(db.list_thread(2, 3, limit=rows)).encode("utf-8")
+
+    def record_path() -> bytes:
+        return encode(list_thread_records(2, 3, limit=rows))
+
+    assert json.loads(dict_path()) == json.loads(record_path())
+    print(f"{rows} message rows (encoder: {'orjson' if orjson else 'stdlib json'})")
+    for name, fn in (("dicts + json", dict_path), ("records + encode", record_path)):
+        fn()  # warm the read pool
+        started = time.perf_counter()
+        for _ in range(5):
+            fn()
+        per_call = (time.perf_counter() - started) / 5
+        tracemalloc.start()
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"  {name:17s} {per_call * 1000:8.2f} ms   peak alloc {peak / 1e6:6.2f} MB")
+
+
+def _bench_stream(sizes: Sequence[int] = (1_000, 10_000, 50_000)) -> None:
+    """Peak allocation of list_stories() vs streaming iter_stories() as the table grows."""
+    import os
+    import tempfile
+    import tracemalloc
+
+    class _App:
+        config = {"SQLITE_PATH": os.path.join(tempfile.mkdtemp(), "bench.db")}
+
+    db.init_db(_App, seed=True)
+    have = len(db.list_stories())
+    print("stories  list_stories peak  iter_stories+ndjson peak")
+    for size in sizes:
+        for i in range(have, size):
+            db.create_story.submit(2, f"Story {i}", "daytoday", "x" * 400)
+        db.create_story(2, "last", "daytoday", "x")
+        have = size + 1
+
+        tracemalloc.start()
+        encode(db.list_stories())
+        _, list_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        tracemalloc.start()
+        for _ in ndjson_lines(db.iter_stories()):
+            pass
+        _, stream_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{have:7d}  {list_peak / 1e6:14.2f} MB  {stream_peak / 1e6:20.2f} MB")
+
+
+# Peak traced allocation allowed while streaming any table through ndjson_lines();
+# independent of row count (rows are fetched STREAM_BATCH_SIZE at a time).
+STREAM_PEAK_LIMIT = 2 * 1024 * 1024
+
+
+def _check_stream(n: int = 2_000) -> None:
+    """Stream N and then 10N rows of each iter_* table; fail if peak memory grows past the limit."""
+    import os
+    import tempfile
+    import tracemalloc
+
+    class _App:
+        config = {"SQLITE_PATH": os.path.join(tempfile.mkdtemp(), "check.db")}
+
+    db.init_db(_App, seed=True)
+
+    def add_rows(count: int) -> None:
+        def write() -> None:
+            conn = db.get_conn()
+            try:
+                start = conn.execute("SELECT COALESCE(MAX(id), 0) FROM users").fetchone()[0] + 1
+                ids = range(start, start + count)
+                conn.executemany(
+                    "INSERT INTO users(id,full_name,email,password,generation,bio) VALUES (?,?,?,?,?,?)",
+                    [(i, f"User {i}", f"user{i}@check.test", "x", "Gen Z", "b" * 200) for i in ids],
+                )
+                conn.executemany(
+                    "INSERT INTO stories(user_id,title,category,content,status,created_at) VALUES (?,?,?,?,?,?)",
+                    [(i, f"Story {i}", "daytoday", "x" * 400, "ongoing", db.utcnow_iso()) for i in ids],
+                )
+                conn.executemany(
+                    "INSERT INTO skillswap_posts(user_id,post_type,title,category,description,created_at) "
+                    "VALUES (?,?,?,?,?,?)",
+                    [(i, "offer", f"Skill {i}", "tech", "x" * 400, db.utcnow_iso()) for i in ids],
+                )
+                conn.executemany(
+                    "INSERT INTO reports(reporter_id,target_user_id,reason,details,status,created_at) "
+                    "VALUES (?,?,?,?, 'pending', ?)",
+                    [(i, start, "spam", "x" * 200, db.utcnow_iso()) for i in ids],
+                )
+                conn.commit()
+            finally:
+                conn.close()
+
+        db.submit_write(write).result()
+
+    streams = {
+        "users": db.iter_users,
+        "stories": db.iter_stories,
+        "skillswap_posts": db.iter_skillswap_posts,
+        "reports": db.iter_reports,
+    }
+
+    def peaks() -> Dict[str, int]:
+        out = {}
+        for name, stream in streams.items():
+            tracemalloc.start()
+            for _ in ndjson_lines(stream()):
+                pass
+            out[name] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        return out
+
+    add_rows(n)
+    small = peaks()
+    add_rows(9 * n)
+    large = peaks()
+    failed = []
+    for name in streams:
+        print(f"{name:16s} {n:7d} rows {small[name] / 1e6:6.2f} MB   {10 * n:7d} rows {large[name] / 1e6:6.2f} MB")
+        if large[name] > STREAM_PEAK_LIMIT:
+            failed.append(f"{name}: peak {large[name] / 1e6:.2f} MB over the {STREAM_PEAK_LIMIT / 1e6:.2f} MB limit")
+    if failed:
+        raise SystemExit("FAIL: streaming memory grows with row count\n  " + "\n  ".join(failed))
+    print(f"ok: streaming peak stays under {STREAM_PEAK_LIMIT / 1e6:.2f} MB from {n} to {10 * n} rows")
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) > 1 and sys.argv[1] == "stream":
+        _bench_stream()
+    elif len(sys.argv) > 1 and sys.argv[1] == "check":
+        _check_stream(int(sys.argv[2]) if len(sys.argv) > 2 else 2_000)
+    else:
+        _bench(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000)
@@ -0,0 +1,189 @@
+"""Replay a traffic capture (see traffic.py) against a local create_app().
+
+    python replay-traffic.py capture.jsonl [--concurrency 8] [--speedup 10] [--json report.json]
+
+The app is served in-process on a free port; a fake OpenAI-compatible server
+stands in for the chatbot / translator / suggestion LLM calls (OPENAI_BASE_URL
+points at it, --llm-latency simulates the round trip). Requests keep their
+recorded spacing divided by --speedup (0 = as fast as possible) and run on
+--concurrency client threads; each captured user gets its own session cookie.
+Replayed writes land in whatever DB the app is configured with, so point it at
+a copy (python backup-db.py backup /tmp/replay.db).
+
+--url http://host:port replays against an already-running instance instead.
+
+Reports throughput and, per route, p50/p95/p99 latency and 4xx/5xx rates.
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+import requests
+
+from traffic import CAPTURE_EXCLUDE, SESSION_USER_KEY, load_capture, percentile, route_key
+
+_ARRAY_RE = re.compile(r"\[.*\]\s*$", re.S)
+
+
+def start_fake_openai(latency_s: float) -> ThreadingHTTPServer:
+    """Minimal /v1/chat/completions: echoes JSON-array prompts, canned text otherwise."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args) -> None:
+            pass
+
+        def do_POST(self) -> None:
+            length = int(self.headers.get("Content-Length") or 0)
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            prompt = str((payload.get("messages") or [{}])[-1].get("content") or "")
+            match = _ARRAY_RE.search(prompt)
+            if match:
+                reply = match.group(0)  # translator batch: same length and order
+            elif "JSON array" in prompt:
+                reply = json.dumps([f"Conversation starter {n}" for n in range(5)])
+            else:
+                reply = "That sounds lovely! Tell me more about it."
+            time.sleep(latency_s)
+            body = json.dumps({
+                "id": "chatcmpl-replay",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": payload.get("model", "fake"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": reply}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(reply) // 4,
+                          "total_tokens": (len(prompt) + len(reply)) // 4},
+            }).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, name="fake-openai", daemon=True).start()
+    return server
+
+
+def start_app() -> Tuple[str, object]:
+    from werkzeug.serving import WSGIRequestHandler, make_server
+
+    from backend.server import create_app
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_request(self, *args) -> None:
+            pass
+
+    os.environ.pop("TRAFFIC_CAPTURE_PATH", None)  # don't record the replay itself
+    app = create_app()
+    server = make_server("127.0.0.1", 0, app, threaded=True, request_handler=QuietHandler)
+    threading.Thread(target=server.serve_forever, name="replay-app", daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}", app
+
+
+def session_for(app, user_id: Optional[int], cache: Dict[Optional[int], requests.Session]) -> requests.Session:
+    sess = cache.get(user_id)
+    if sess is None:
+        sess = cache[user_id] = requests.Session()
+        if user_id is not None and app is not None:
+            # Sign a session cookie for the captured user instead of replaying logins.
+            signer = app.session_interface.get_signing_serializer(app)
+            cookie = app.config.get("SESSION_COOKIE_NAME", "session")
+            sess.cookies.set(cookie, signer.dumps({SESSION_USER_KEY: user_id}))
+    return sess
+
+
+def replay(entries: List[dict], base_url: str, app, concurrency: int, speedup: float) -> Tuple[Dict[str, List[tuple]], float]:
+    results: Dict[str, List[tuple]] = {}
+    lock = threading.Lock()
+    sessions: Dict[Optional[int], requests.Session] = {}
+    t0 = entries[0].get("t", 0) if entries else 0
+
+    def send(entry: dict) -> None:
+        with lock:
+            sess = session_for(app, entry.get("user"), sessions)
+        started = time.perf_counter()
+        try:
+            resp = sess.request(entry["method"], base_url + entry["path"], json=entry.get("body"), timeout=30)
+            status = resp.status_code
+        except requests.RequestException:
+            status = 0
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with lock:
+            results.setdefault(route_key(entry["method"], entry["path"]), []).append((elapsed_ms, status))
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for entry in entries:
+            if speedup > 0:
+                due = (entry.get("t", t0) - t0) / 1000.0 / speedup
+                delay = due - (time.perf_counter() - started)
+                if delay > 0:
+                    time.sleep(delay)
+            pool.submit(send, entry)
+    return results, time.perf_counter() - started
+
+
+def report(results: Dict[str, List[tuple]], wall_s: float) -> dict:
+    total = sum(len(v) for v in results.values())
+    routes = {}
+    for key, samples in sorted(results.items(), key=lambda kv: -len(kv[1])):
+        latencies = sorted(ms for ms, _ in samples)
+        routes[key] = {
+            "count": len(samples),
+            "p50_ms": round(percentile(latencies, 50), 2),
+            "p95_ms": round(percentile(latencies, 95), 2),
+            "p99_ms": round(percentile(latencies, 99), 2),
+            "4xx_rate": round(sum(400 <= s < 500 for _, s in samples) / len(samples), 4),
+            "error_rate": round(sum(s >= 500 or s == 0 for _, s in samples) / len(samples), 4),
+        }
+    return {"requests": total, "seconds": round(wall_s, 3), "rps": round(total / wall_s, 1) if wall_s else 0.0,
+            "routes": routes}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Replay captured API traffic against create_app().")
+    parser.add_argument("capture")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--speedup", type=float, default=0.0, help="divide recorded gaps by this (0 = no pacing)")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="fake OpenAI round trip, seconds")
+    parser.add_argument("--url", help="replay against a running instance instead of an in-process app")
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    entries = [e for e in load_capture(args.capture) if not e["path"].startswith(CAPTURE_EXCLUDE)]
+    if not entries:
+        sys.exit("capture is empty")
+
+    app = None
+    if args.url:
+        base_url = args.url.rstrip("/")
+    else:
+        fake = start_fake_openai(args.llm_latency)
+        os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{fake.server_port}/v1"
+        os.environ["OPENAI_API_KEY"] = "replay"
+        base_url, app = start_app()
+
+    results, wall_s = replay(entries, base_url, app, args.concurrency, args.speedup)
+    summary = report(results, wall_s)
+
+    print(f"{summary['requests']} requests in {summary['seconds']:.2f}s  ({summary['rps']} req/s, "
+          f"concurrency {args.concurrency}, speedup {args.speedup or 'max'})")
+    print(f"  {'route':44s} {'count':>6s} {'p50':>8s} {'p95':>8s} {'p99':>8s} {'4xx':>6s} {'err':>6s}")
+    for key, r in summary["routes"].items():
+        print(f"  {key[:44]:44s} {r['count']:6d} {r['p50_ms']:8.2f} {r['p95_ms']:8.2f} {r['p99_ms']:8.2f} "
+              f"{r['4xx_rate']:6.1%} {r['error_rate']:6.1%}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump(summary, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
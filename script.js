@@ -202,10 +202,25 @@ function _loadScript(src) {
     });
 }
 
+// Landing page: one /api/home round trip replaces auth/me, events, notifications and badges.
+let _homeDataPromise = null;
+function _loadHomeData() {
+    if (_homeDataPromise === null) {
+        const page = document.body?.getAttribute('data-page') || '';
+        _homeDataPromise = (page === 'index')
+            ? _fetchJsonWithFallback(['/api/home']).then(data => {
+                window.gbHomeData = (data && data.ok) ? data : null;
+                return window.gbHomeData;
+            })
+            : Promise.resolve(null);
+    }
+    return _homeDataPromise;
+}
+
 async function _refreshHeaderFromBackend() {
     try {
-        const res = await fetch('/api/auth/me');
-        const data = await res.json();
+        const home = await _loadHomeData();
+        const data = home || await (await fetch('/api/auth/me')).json();
         if (data && data.ok && data.user) {
             localStorage.setItem('isLoggedIn', 'true');
             localStorage.setItem('userData', JSON.stringify({
@@ -1212,6 +1227,12 @@ async function loadUpcomingEventsHome() {
     const grid = document.getElementById('upcomingEventsGrid');
     if (!grid) return;
 
+    const home = await _loadHomeData();
+    if (home) {
+        _renderUpcomingEventsHome(home.events);
+        return;
+    }
+
     // Prefer same-origin API; fall back to the legacy local-dev host.
     const data = await _fetchJsonWithFallback([
         '/api/events?limit=4',
@@ -0,0 +1,153 @@
+"""Cold-start profile: import time per module and create_app() time.
+
+    python startup-profile.py                       # backend.server + create_app()
+    python startup-profile.py --module db,jobs      # just these imports (CLI scripts, workers)
+    python startup-profile.py --budget-ms 1500      # exit 1 if a cold start takes longer
+    python startup-profile.py --forbid openai,requests
+
+Each run is a fresh interpreter started with -X importtime; the median of
+--runs is reported. "total" is the wall time of the whole process, from exec
+to ready (interpreter startup + imports + create_app()). The slowest imports
+are listed by cumulative time (what removing that import would save) and by
+self time (where it is spent).
+
+--budget-ms and --forbid turn this into a check for CI or a pre-deploy hook:
+the exit status is 1 when the median cold start exceeds the budget, or when a
+forbidden module (an optional heavy client such as openai, which should only
+load on first use - see llm.py) is imported during startup.
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+STARTUP_BUDGET_MS = float(os.environ.get("STARTUP_BUDGET_MS", "0") or 0)
+HEAVY_MODULES = ("openai", "requests", "httpx", "pydantic", "pytz", "dotenv")
+
+_LINE_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+_SNIPPET = """
+import json, sys, time
+t0 = time.perf_counter()
+{imports}
+t1 = time.perf_counter()
+{create}
+t2 = time.perf_counter()
+print(json.dumps({{"import_ms": (t1 - t0) * 1000, "create_app_ms": (t2 - t1) * 1000, "db_init_ms": {db_init}}}))
+"""
+
+
+def _snippet(modules: List[str]) -> str:
+    if modules:
+        imports = "\n".join(f"import {m}" for m in modules)
+        return _SNIPPET.format(imports=imports, create="", db_init="None")
+    return _SNIPPET.format(
+        imports="from backend.server import create_app",
+        create="app = create_app()",
+        db_init='app.config.get("DB_INIT_MS")',
+    )
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int, int]]:
+    """-X importtime output as (module, self_us, cumulative_us, depth)."""
+    out = []
+    for line in stderr.splitlines():
+        m = _LINE_RE.match(line)
+        if m:
+            out.append((m.group(4), int(m.group(1)), int(m.group(2)), len(m.group(3)) // 2))
+    return out
+
+
+def run_once(modules: List[str], cwd: str) -> dict:
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _snippet(modules)],
+        cwd=cwd, capture_output=True, text=True,
+    )
+    total_ms = (time.perf_counter() - started) * 1000
+    if proc.returncode != 0:
+        tail = "\n".join(line for line in proc.stderr.splitlines() if not line.startswith("import time:"))[-2000:]
+        sys.exit(f"startup failed (exit {proc.returncode}):\n{tail}")
+    timings = json.loads(proc.stdout.strip().splitlines()[-1])
+    timings["total_ms"] = total_ms
+    timings["imports"] = parse_importtime(proc.stderr)
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Profile cold start (imports + create_app()).")
+    parser.add_argument("--module", help="comma-separated modules to import instead of create_app()")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--budget-ms", type=float, default=STARTUP_BUDGET_MS,
+                        help="fail if the median total exceeds this (0 = report only; env STARTUP_BUDGET_MS)")
+    parser.add_argument("--forbid", default="", help="comma-separated modules that must not load at startup")
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    modules = [m.strip() for m in (args.module or "").split(",") if m.strip()]
+    cwd = os.path.dirname(os.path.abspath(__file__))
+    # Warm-up run that writes .pyc files (even under PYTHONDONTWRITEBYTECODE), so runs measure imports, not compiles.
+    env = {k: v for k, v in os.environ.items() if k != "PYTHONDONTWRITEBYTECODE"}
+    subprocess.run([sys.executable, "-c", _snippet(modules)], cwd=cwd, env=env, capture_output=True)
+    runs = [run_once(modules, cwd) for _ in range(max(1, args.runs))]
+
+    median = lambda key: statistics.median(r[key] for r in runs)  # noqa: E731
+    # Per-module times from the median run (by total), so the numbers add up.
+    rep = sorted(runs, key=lambda r: r["total_ms"])[len(runs) // 2]
+    loaded = {name for name, _, _, _ in rep["imports"]}
+    top_cumulative = sorted(
+        ((name, cum) for name, _, cum, depth in rep["imports"] if depth == 0), key=lambda x: -x[1]
+    )[: args.top]
+    top_self = sorted(((name, own) for name, own, _, _ in rep["imports"]), key=lambda x: -x[1])[: args.top]
+    heavy = sorted(m for m in HEAVY_MODULES if m in loaded)
+    forbidden = sorted(m.strip() for m in args.forbid.split(",") if m.strip() and m.strip() in loaded)
+
+    summary: Dict[str, object] = {
+        "target": ",".join(modules) or "create_app()",
+        "runs": len(runs),
+        "total_ms": round(median("total_ms"), 1),
+        "import_ms": round(median("import_ms"), 1),
+        "create_app_ms": round(median("create_app_ms"), 1),
+        "db_init_ms": rep.get("db_init_ms"),
+        "modules_loaded": len(loaded),
+        "heavy_loaded": heavy,
+        "top_cumulative_ms": {name: round(us / 1000, 2) for name, us in top_cumulative},
+        "top_self_ms": {name: round(us / 1000, 2) for name, us in top_self},
+    }
+
+    print(f"{summary['target']}: cold start {summary['total_ms']:.0f} ms (median of {len(runs)}) = "
+          f"imports {summary['import_ms']:.0f} ms + create_app {summary['create_app_ms']:.0f} ms "
+          f"+ interpreter; {len(loaded)} modules")
+    if summary["db_init_ms"] is not None:
+        print(f"  init_db: {summary['db_init_ms']} ms")
+    if heavy:
+        print(f"  heavy optional modules loaded at startup: {', '.join(heavy)}")
+    print(f"  {'slowest top-level imports (cumulative)':48s} {'ms':>8s}")
+    for name, ms in summary["top_cumulative_ms"].items():
+        print(f"  {name[:48]:48s} {ms:8.2f}")
+    print(f"  {'slowest modules (self)':48s} {'ms':>8s}")
+    for name, ms in summary["top_self_ms"].items():
+        print(f"  {name[:48]:48s} {ms:8.2f}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump(summary, fh, indent=2)
+
+    failed = False
+    if args.budget_ms and summary["total_ms"] > args.budget_ms:
+        print(f"FAIL: cold start {summary['total_ms']:.0f} ms exceeds the {args.budget_ms:.0f} ms budget")
+        failed = True
+    if forbidden:
+        print(f"FAIL: imported during startup: {', '.join(forbidden)}")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+import db
+
+
+# python storage-report.py                 size of app.db per table / index
+# python storage-report.py synthetic [N]   v7 (ISO text timestamps) -> v8 (epoch ms) on N synthetic rows per table
+def print_report(label, report):
+    print(
+        f"{label}: file {report['db_bytes'] / 1e6:.2f} MB (free {report['free_bytes'] / 1e6:.2f} MB), "
+        f"tables {report['table_bytes'] / 1e6:.2f} MB, indexes {report['index_bytes'] / 1e6:.2f} MB"
+    )
+    for name in ("messages", "notifications", "login_events"):
+        if name in report["tables"]:
+            idx = report["indexes"].get(f"idx_{name}_created_at")
+            print(f"  {name:14s} {report['tables'][name] / 1e6:7.2f} MB" + (f"   created_at index {idx / 1e6:6.2f} MB" if idx else ""))
+
+
+def _to_v7(path):
+    """Rewrite the epoch-ms tables the way v7 stored them (ISO text created_at, no auto_vacuum)."""
+    conn = sqlite3.connect(path)
+    conn.isolation_level = None
+    for table in db._EPOCH_MS_TABLES:
+        sql = conn.execute("SELECT sql FROM sqlite_master WHERE name=?", (table,)).fetchone()[0]
+        cols = [r[1] for r in conn.execute(f"PRAGMA table_info({table})")]
+        conn.execute("BEGIN")
+        conn.execute(sql.replace(f"CREATE TABLE {table}", f"CREATE TABLE {table}__v7", 1)
+                     .replace("created_at INTEGER", "created_at TEXT", 1))
+        iso = "strftime('%Y-%m-%dT%H:%M:%f', created_at / 1000.0, 'unixepoch') || '000+00:00'"
+        conn.execute(f"INSERT INTO {table}__v7 SELECT {', '.join(iso if c == 'created_at' else c for c in cols)} FROM {table}")
+        conn.execute(f"DROP TABLE {table}")
+        conn.execute(f"ALTER TABLE {table}__v7 RENAME TO {table}")
+        conn.execute(f"CREATE INDEX idx_{table}_created_at ON {table}(created_at)")
+        conn.execute("COMMIT")
+    conn.execute("PRAGMA user_version = 7")
+    conn.execute("PRAGMA auto_vacuum = NONE")
+    conn.execute("VACUUM")
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.close()
+
+
+def synthetic(rows):
+    class _App:
+        config = {"SQLITE_PATH": os.path.join(tempfile.mkdtemp(), "synthetic.db")}
+
+    db.init_db(_App, seed=True)
+    now = db.utcnow_ms()
+    for i in range(rows):
+        db.create_message.submit(2 + i % 3, 3 + i % 2, f"synthetic message {i}")
+        db.create_notification.submit(2 + i % 3, "message", "💬", "New message", f"synthetic {i}", "/messages")
+        db.log_login_event.submit(2 + i % 3, "david.miller@generationbridge.com", i % 7 != 0, "10.0.0.1", "bench")
+    db.create_message(2, 3, "last")
+    db._db.close_all()
+
+    _to_v7(_App.config["SQLITE_PATH"])
+    db._db.init_app(_App)
+    print_report("before (v7, ISO text)", db.storage_report())
+    db._db.close_all()
+
+    started = time.perf_counter()
+    db.init_db(_App)
+    print(f"migrated to v{db.SCHEMA_VERSION} in {(time.perf_counter() - started):.2f}s")
+    print_report("after  (v8, epoch ms)", db.storage_report())
+
+    # Bulk delete, then let the incremental vacuum hand the pages back in steps.
+    for uid in (2, 3, 4):
+        db.clear_notifications(uid)
+    db.submit_write(lambda: None).result()
+    print_report("after clear_notifications (before vacuum steps finish)", db.storage_report())
+    while db._vacuum_scheduled:
+        time.sleep(0.01)
+    print_report("after incremental vacuum", db.storage_report())
+
+
+if len(sys.argv) > 1 and sys.argv[1] == "synthetic":
+    synthetic(int(sys.argv[2]) if len(sys.argv) > 2 else 50_000)
+else:
+    from app import app
+
+    with app.app_context():
+        print_report(app.config["SQLITE_PATH"], db.storage_report())
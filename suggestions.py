@@ -0,0 +1,257 @@
+"""Precomputed chatbot conversation starters for /api/chatbot/suggest.
+
+Usage:
+    from suggestions import suggestions
+    suggestions.init_app(app)                # load cached sets, start the refresher
+    topics = suggestions.suggest(user_id, page="chatbot")
+    return jsonify({"ok": True, "topics": topics})
+
+Suggestion sets are generated per context (page, generation, interest) by a
+background refresher and kept in the suggestion_cache table (with a TTL) and
+in memory. suggest() only reads memory, so it never calls the LLM: a user's
+topics are merged from the sets for each of their interests. Expired sets are
+still served while the refresher regenerates them (stale-while-revalidate);
+contexts that have never been generated fall back to DEFAULT_TOPICS.
+
+Benchmark (suggest() latency and upstream calls against a fake generator):
+    python suggestions.py [calls]
+"""
+
+from __future__ import annotations
+
+import os
+import queue
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+import db
+
+# How long a generated set stays fresh, and how often the refresher looks for
+# missing/expired contexts between revalidation requests.
+SUGGESTION_TTL_S = 6 * 3600
+REFRESH_INTERVAL_S = 300.0
+TOPICS_PER_RESPONSE = 5
+PAGES = ("chatbot",)
+
+DEFAULT_TOPICS = [
+    "What was your first job, and what did it teach you?",
+    "Which song always takes you back to a certain time?",
+    "What's a skill you'd love to learn from someone of another generation?",
+    "How did you keep in touch with friends when you were younger?",
+    "What's a family recipe or tradition you'd like to pass on?",
+]
+
+# generator(page, generation, interest) -> topics
+Generator = Callable[[str, str, str], List[str]]
+
+
+def context_key(page: str, generation: str, interest: str) -> str:
+    return f"{page}|{generation or ''}|{interest or ''}"
+
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+class SuggestionCache:
+    """In-memory view of suggestion_cache plus the background refresher."""
+
+    def __init__(self, generator: Optional[Generator] = None, ttl_s: float = SUGGESTION_TTL_S) -> None:
+        self.generator = generator
+        self.ttl_s = float(ttl_s)
+        self._sets: Dict[str, Tuple[List[str], int]] = {}
+        self._lock = threading.Lock()
+        self._pending: Set[str] = set()
+        self._queue: "queue.Queue[str]" = queue.Queue()
+        self._stop: Optional[threading.Event] = None
+        self.upstream_calls = 0
+
+    def init_app(self, app, *, start: bool = True) -> None:
+        self.ttl_s = float(app.config.get("SUGGESTION_TTL_S", self.ttl_s))
+        if self.generator is None and os.environ.get("OPENAI_API_KEY"):
+            self.generator = openai_generator()
+        self.load()
+        if start:
+            self.start(float(app.config.get("SUGGESTION_REFRESH_INTERVAL_S", REFRESH_INTERVAL_S)))
+
+    def load(self) -> None:
+        rows = db.list_suggestion_sets()
+        with self._lock:
+            self._sets = {r["context_key"]: (r["topics"], r["expires_at"]) for r in rows}
+
+    # ---- Serving ----
+
+    def suggest(self, user_id: Optional[int], page: str = "chatbot", limit: int = TOPICS_PER_RESPONSE) -> List[str]:
+        # page comes from the client; an unknown one must not mint cache keys (each is an LLM call).
+        if page not in PAGES:
+            page = PAGES[0]
+        generation, interests = "", [""]
+        principal = db.get_session_principal(int(user_id)) if user_id else None  # cached
+        user = principal["user"] if principal else None
+        if user:
+            generation = user.get("generation") or ""
+            interests = (user.get("interests") or []) + [""]
+        keys = [context_key(page, generation, i) for i in interests]
+
+        now = _now_ms()
+        sets: List[List[str]] = []
+        with self._lock:
+            for key in keys:
+                hit = self._sets.get(key)
+                if hit is None or hit[1] <= now:
+                    self._revalidate(key)
+                if hit is not None:
+                    sets.append(hit[0])
+
+        # Round-robin across the user's interest sets so each gets a turn.
+        topics: List[str] = []
+        for rank in range(max((len(s) for s in sets), default=0)):
+            for s in sets:
+                if rank < len(s) and s[rank] not in topics:
+                    topics.append(s[rank])
+        return (topics or DEFAULT_TOPICS)[:limit]
+
+    def _revalidate(self, key: str) -> None:
+        # Caller holds self._lock.
+        if key not in self._pending:
+            self._pending.add(key)
+            self._queue.put(key)
+
+    # ---- Refreshing (background thread only) ----
+
+    def refresh(self, key: str) -> bool:
+        if self.generator is None:
+            return False
+        page, generation, interest = key.split("|", 2)
+        self.upstream_calls += 1
+        topics = [t.strip() for t in self.generator(page, generation, interest) if t and t.strip()]
+        if not topics:
+            return False
+        expires_at = _now_ms() + int(self.ttl_s * 1000)
+        db.put_suggestion_set(key, topics, expires_at)
+        with self._lock:
+            self._sets[key] = (topics, expires_at)
+        return True
+
+    def refresh_due(self) -> int:
+        """Precompute every known context that is missing or expired."""
+        now = _now_ms()
+        keys = [context_key(p, g, i) for p in PAGES for g, i in db.list_suggestion_contexts()]
+        with self._lock:
+            due = [k for k in keys if k not in self._sets or self._sets[k][1] <= now]
+        done = 0
+        for key in due:
+            try:
+                done += self.refresh(key)
+            except Exception:
+                pass
+        return done
+
+    def start(self, interval_s: float = REFRESH_INTERVAL_S) -> threading.Event:
+        """Run the refresher on a daemon thread; set the returned Event to stop it."""
+        if self._stop is not None:
+            return self._stop
+        stop = self._stop = threading.Event()
+
+        def _loop() -> None:
+            next_sweep = 0.0
+            while not stop.is_set():
+                if time.monotonic() >= next_sweep:
+                    self.refresh_due()
+                    next_sweep = time.monotonic() + interval_s
+                try:
+                    key = self._queue.get(timeout=max(0.0, min(1.0, next_sweep - time.monotonic())))
+                except queue.Empty:
+                    continue
+                try:
+                    with self._lock:
+                        hit = self._sets.get(key)
+                    if hit is None or hit[1] <= _now_ms():  # the sweep may have beaten us to it
+                        self.refresh(key)
+                except Exception:
+                    pass
+                finally:
+                    with self._lock:
+                        self._pending.discard(key)
+
+        threading.Thread(target=_loop, name="suggestion-refresher", daemon=True).start()
+        return stop
+
+    def stop(self) -> None:
+        if self._stop is not None:
+            self._stop.set()
+            self._stop = None
+
+
+def openai_generator(model: Optional[str] = None) -> Generator:
+    """Generator that asks the LLM for starters for one context (client loaded on first use, see llm.py)."""
+    import llm
+    from translator import parse_reply
+
+    def generate(page: str, generation: str, interest: str) -> List[str]:
+        who = f"a {generation} member" if generation else "a member"
+        about = f" who is interested in {interest}" if interest else ""
+        reply = llm.chat(
+            [{
+                "role": "user",
+                "content": (
+                    f"Suggest 5 short, friendly conversation starters for {who}{about} of an "
+                    "intergenerational community chatting with someone from another generation. "
+                    "Reply with ONLY a JSON array of strings."
+                ),
+            }],
+            model=model,
+            temperature=0.7,
+        )
+        return parse_reply(reply)
+
+    return generate
+
+
+# Singleton used by the chatbot routes
+suggestions = SuggestionCache()
+
+
+def _bench(calls: int = 10_000, latency_s: float = 0.5) -> None:
+    import tempfile
+
+    class _App:
+        config = {"SQLITE_PATH": os.path.join(tempfile.mkdtemp(), "bench.db")}
+
+    def fake_generator(page: str, generation: str, interest: str) -> List[str]:
+        time.sleep(latency_s)
+        return [f"{generation or 'anyone'} / {interest or 'general'} starter {n}" for n in range(5)]
+
+    db.init_db(_App, seed=True)
+    cache = SuggestionCache(fake_generator, ttl_s=3600)
+    started = time.perf_counter()
+    precomputed = cache.refresh_due()
+    print(f"precomputed {precomputed} context sets in {time.perf_counter() - started:.2f}s (background)")
+
+    cache.upstream_calls = 0
+    users = [u["id"] for u in db.list_users()]
+    started = time.perf_counter()
+    for n in range(calls):
+        cache.suggest(users[n % len(users)])
+    per_call = (time.perf_counter() - started) / calls
+    print(f"{calls} suggest() calls: {per_call * 1e6:.0f} us/call, {cache.upstream_calls} upstream calls")
+    print(f"  (one LLM round trip per call would be ~{latency_s * 1000:.0f} ms)")
+
+    # Expire everything: callers still get the stale sets while the refresher catches up.
+    with cache._lock:
+        cache._sets = {k: (t, 0) for k, (t, _) in cache._sets.items()}
+    stop = cache.start(interval_s=3600)
+    started = time.perf_counter()
+    stale = cache.suggest(users[0])
+    print(f"expired: served {len(stale)} stale topics in {(time.perf_counter() - started) * 1e6:.0f} us")
+    while cache._pending:
+        time.sleep(0.05)
+    print(f"  refresher regenerated in the background ({cache.upstream_calls} upstream calls)")
+    stop.set()
+
+
+if __name__ == "__main__":
+    import sys
+
+    _bench(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000)
@@ -0,0 +1,167 @@
+"""Opt-in capture of API traffic to JSONL, for replay-traffic.py.
+
+Usage (in create_app):
+    from traffic import capture
+    capture.init_app(app)    # no-op unless TRAFFIC_CAPTURE_PATH is set
+
+Set app.config["TRAFFIC_CAPTURE_PATH"] (or the TRAFFIC_CAPTURE_PATH
+environment variable) to a file and every /api/ request is appended to it as
+one JSON line:
+
+    {"t": 1760000000000, "method": "POST", "path": "/api/messages/send",
+     "body": {"recipient_id": 3, "text": "xxxxxxxx"}, "user": 2,
+     "status": 200, "ms": 4.1}
+
+Bodies are sanitized before they leave the request: secrets are redacted and
+free text is replaced by filler of the same length, so a capture keeps the
+traffic mix and payload sizes but no user content. Lines are written by a
+background thread, off the request path. Long-lived streams
+(CAPTURE_EXCLUDE) are not recorded.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import queue
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+CAPTURE_EXCLUDE = ("/api/realtime/stream",)
+SESSION_USER_KEY = "user_id"
+
+_SECRET_KEY_RE = re.compile(r"pass|token|secret|api_?key|authorization|otp", re.I)
+# Short enum-like fields that are kept verbatim (they shape the traffic mix).
+KEEP_FIELDS = frozenset({
+    "direction", "post_type", "category", "status", "type", "page", "going", "reason", "mode", "limit",
+})
+
+
+def sanitize(value: Any, key: str = "") -> Any:
+    """Redact secrets and blank out free text, keeping structure and sizes."""
+    if isinstance(value, dict):
+        return {k: sanitize(v, str(k)) for k, v in value.items()}
+    if isinstance(value, list):
+        return [sanitize(v, key) for v in value]
+    if isinstance(value, str):
+        if _SECRET_KEY_RE.search(key):
+            return "[redacted]"
+        if key in KEEP_FIELDS:
+            return value
+        if key == "email" or "@" in value:
+            return "user@example.com"
+        return "x" * len(value)
+    return value
+
+
+_ID_SEGMENT_RE = re.compile(r"/\d+(?=/|$)")
+
+
+def route_key(method: str, path: str) -> str:
+    """'GET /api/stories/12/comments?x=1' -> 'GET /api/stories/<id>/comments'."""
+    return f"{method} {_ID_SEGMENT_RE.sub('/<id>', path.split('?', 1)[0])}"
+
+
+def percentile(sorted_values: Sequence[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def load_capture(path: str) -> List[dict]:
+    with open(path, encoding="utf-8") as fh:
+        entries = [json.loads(line) for line in fh if line.strip()]
+    entries.sort(key=lambda e: e.get("t", 0))
+    return entries
+
+
+class TrafficCapture:
+    """Flask before/after_request hooks feeding a JSONL writer thread."""
+
+    def __init__(self) -> None:
+        self.path: Optional[str] = None
+        self._queue: "queue.SimpleQueue[Optional[dict]]" = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+
+    def init_app(self, app) -> None:
+        path = app.config.get("TRAFFIC_CAPTURE_PATH") or os.environ.get("TRAFFIC_CAPTURE_PATH")
+        if not path:
+            return
+        self.path = path
+        self._start()
+        app.before_request(self._before)
+        app.after_request(self._after)
+
+    def _start(self) -> None:
+        if self._thread is not None:
+            return
+
+        def _loop() -> None:
+            with open(self.path, "a", encoding="utf-8") as fh:
+                while True:
+                    entry = self._queue.get()
+                    if entry is None:
+                        return
+                    lines = [entry]
+                    while True:  # drain whatever queued up meanwhile into one write
+                        try:
+                            more = self._queue.get_nowait()
+                        except queue.Empty:
+                            break
+                        if more is None:
+                            fh.write("".join(json.dumps(e, ensure_ascii=False) + "\n" for e in lines))
+                            return
+                        lines.append(more)
+                    fh.write("".join(json.dumps(e, ensure_ascii=False) + "\n" for e in lines))
+                    fh.flush()
+
+        self._thread = threading.Thread(target=_loop, name="traffic-capture", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    @staticmethod
+    def _wanted(path: str) -> bool:
+        return path.startswith("/api/") and not path.startswith(CAPTURE_EXCLUDE)
+
+    def _before(self) -> None:
+        from flask import g, request
+
+        if self._wanted(request.path):
+            g._traffic_started = (time.time(), time.perf_counter())
+
+    def _after(self, response):
+        from flask import g, request, session
+
+        started = g.pop("_traffic_started", None)
+        if started is None:
+            return response
+        wall_s, started = started
+        body: Any = None
+        if request.is_json:
+            body = sanitize(request.get_json(silent=True))
+        elif request.form:
+            body = sanitize(request.form.to_dict())
+        path = request.full_path.rstrip("?") if request.query_string else request.path
+        entry: Dict[str, Any] = {
+            "t": int(wall_s * 1000),
+            "method": request.method,
+            "path": path,
+            "body": body,
+            "user": session.get(SESSION_USER_KEY),
+            "status": response.status_code,
+            "ms": round((time.perf_counter() - started) * 1000, 2),
+        }
+        self._queue.put(entry)
+        return response
+
+
+# Singleton used by create_app
+capture = TrafficCapture()
@@ -0,0 +1,510 @@
+"""Batch translation between modern and traditional phrasing.
+
+Backs /api/translator/translate_batch:
+
+    from translator import translate_batch, openai_upstream
+    body = request.get_json()
+    results = translate_batch(body["phrases"], body["direction"], upstream=openai_upstream())
+    return jsonify({"ok": True, "translations": results})
+
+Phrases are deduplicated and looked up by their normalized form (trimmed,
+whitespace collapsed, case-folded). Known pairs come from translations.db; all
+remaining misses go upstream, as typed, in ONE combined prompt, and the new
+pairs are written back in one transaction. Results are returned in input order
+(duplicates share a result).
+
+Before going upstream, misses are tried against a local PhraseEngine: an
+Aho-Corasick matcher compiled from translations.db plus the curated
+phrasebook.json. Inputs made entirely of known phrases (e.g. "ngl, that slaps")
+are answered locally; the engine's coverage rate is in engine_stats().
+
+Benchmarks (per-phrase calls vs one batch against a local fake upstream; the
+local engine's latency and coverage):
+    python translator.py [phrases]
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+DIRECTIONS = ("to_traditional", "to_modern")
+# Upper bound on phrases accepted per batch request (and so per upstream prompt).
+MAX_BATCH_PHRASES = 200
+TRANSLATIONS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "translations.db")
+# Curated {"modern": "traditional"} pairs loaded into the local engine.
+PHRASEBOOK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "phrasebook.json")
+# New pairs reach the local engine when this many are pending or the engine is this old.
+ENGINE_REBUILD_PAIRS = 256
+ENGINE_REBUILD_S = 30.0
+
+# upstream(direction, phrases) -> translations, same length and order
+Upstream = Callable[[str, List[str]], List[str]]
+
+_WS_RE = re.compile(r"\s+")
+
+
+def normalize(text: str) -> str:
+    return _WS_RE.sub(" ", (text or "").strip()).casefold()
+
+
+class TranslationStore:
+    """translations.db: (modern, traditional) pairs, looked up both ways.
+
+    Rows keep the text as written; modern_key / traditional_key hold its
+    normalize()d form, which is what lookups match on (one row per modern_key).
+    """
+
+    def __init__(self, path: str = TRANSLATIONS_PATH, phrasebook_path: Optional[str] = PHRASEBOOK_PATH) -> None:
+        self.path = path
+        self.phrasebook_path = phrasebook_path
+        self._ready = False
+        self._lock = threading.Lock()
+        self._engine: Optional[PhraseEngine] = None
+        self._engine_pairs: List[Tuple[str, str]] = []
+        self._engine_pending: List[Tuple[str, str]] = []
+        self._engine_built_at = 0.0
+
+    def connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=5.0)
+        if not self._ready:
+            with self._lock:
+                conn.executescript(
+                    """
+                    CREATE TABLE IF NOT EXISTS translations (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        modern TEXT UNIQUE,
+                        traditional TEXT,
+                        modern_key TEXT,
+                        traditional_key TEXT
+                    );
+                    """
+                )
+                cols = {r[1] for r in conn.execute("PRAGMA table_info(translations)")}
+                if "modern_key" not in cols:
+                    # Older files: add and backfill the key columns, keeping the first row per key.
+                    conn.create_function("normalize", 1, normalize)
+                    with conn:
+                        conn.execute("ALTER TABLE translations ADD COLUMN modern_key TEXT")
+                        conn.execute("ALTER TABLE translations ADD COLUMN traditional_key TEXT")
+                        conn.execute(
+                            "UPDATE translations SET modern_key=normalize(modern), traditional_key=normalize(traditional)"
+                        )
+                        conn.execute(
+                            "DELETE FROM translations WHERE id NOT IN (SELECT MIN(id) FROM translations GROUP BY modern_key)"
+                        )
+                conn.executescript(
+                    """
+                    DROP INDEX IF EXISTS idx_translations_traditional;
+                    CREATE UNIQUE INDEX IF NOT EXISTS idx_translations_modern_key ON translations(modern_key);
+                    CREATE INDEX IF NOT EXISTS idx_translations_traditional_key ON translations(traditional_key, id);
+                    """
+                )
+                self._ready = True
+        return conn
+
+    def lookup_many(self, direction: str, keys: Sequence[str]) -> Dict[str, str]:
+        """Normalized key -> stored translation (as written)."""
+        if not keys:
+            return {}
+        src, dst = ("modern_key", "traditional") if direction == "to_traditional" else ("traditional_key", "modern")
+        conn = self.connect()
+        try:
+            found: Dict[str, str] = {}
+            keys = list(keys)
+            for i in range(0, len(keys), 500):
+                chunk = keys[i : i + 500]
+                marks = ",".join("?" * len(chunk))
+                for k, v in conn.execute(
+                    f"SELECT {src}, {dst} FROM translations WHERE {src} IN ({marks}) ORDER BY id", chunk
+                ).fetchall():
+                    found.setdefault(k, v)
+            return found
+        finally:
+            conn.close()
+
+    def store_many(self, direction: str, pairs: Dict[str, str]) -> None:
+        """Save phrase -> translation pairs (display text) in one transaction."""
+        rows = [(k.strip(), (v or "").strip()) for k, v in pairs.items()]
+        if direction != "to_traditional":
+            rows = [(v, k) for k, v in rows]
+        rows = [(m, t) for m, t in rows if normalize(m) and normalize(t)]
+        if not rows:
+            return
+        conn = self.connect()
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT OR IGNORE INTO translations (modern, traditional, modern_key, traditional_key) "
+                    "VALUES (?, ?, ?, ?)",
+                    [(m, t, normalize(m), normalize(t)) for m, t in rows],
+                )
+        finally:
+            conn.close()
+        with self._lock:
+            self._engine_pending.extend(rows)
+
+    def engine(self) -> "PhraseEngine":
+        """Local engine over this store's pairs plus the phrasebook.
+
+        Built on first use; pairs stored since then are compiled in with one
+        rebuild once ENGINE_REBUILD_PAIRS are pending or ENGINE_REBUILD_S has
+        passed, rather than after every store_many().
+        """
+        engine = self._engine
+        if engine is None:
+            with self._lock:
+                self._engine_pending = []  # everything stored so far is read back below
+            pairs: List[Tuple[str, str]] = []
+            if self.phrasebook_path and os.path.exists(self.phrasebook_path):
+                with open(self.phrasebook_path, encoding="utf-8") as fp:
+                    pairs.extend(json.load(fp).items())
+            conn = self.connect()
+            try:
+                pairs.extend(conn.execute("SELECT modern, traditional FROM translations").fetchall())
+            finally:
+                conn.close()
+            return self._install_engine(pairs)
+        pending = self._engine_pending
+        if pending and (
+            len(pending) >= ENGINE_REBUILD_PAIRS or time.monotonic() - self._engine_built_at >= ENGINE_REBUILD_S
+        ):
+            with self._lock:
+                pending, self._engine_pending = self._engine_pending, []
+            engine = self._install_engine(self._engine_pairs + pending)
+        return engine
+
+    def _install_engine(self, pairs: List[Tuple[str, str]]) -> "PhraseEngine":
+        engine = PhraseEngine(pairs, stats=_engine_stats)
+        with self._lock:
+            self._engine, self._engine_pairs, self._engine_built_at = engine, pairs, time.monotonic()
+        return engine
+
+
+# ---- Offline phrase dictionary ----
+
+class PhraseMatcher:
+    """Aho-Corasick automaton over normalized phrases.
+
+    find() scans the text once and returns non-overlapping, whole-word matches
+    as (start, end, replacement), preferring the leftmost and then the longest.
+    """
+
+    def __init__(self, pairs: Iterable[Tuple[str, str]]) -> None:
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]  # pattern lengths ending at each node
+        self._value: Dict[Tuple[int, int], str] = {}  # (node, length) -> replacement
+        for phrase, replacement in pairs:
+            key = normalize(phrase)
+            if key and replacement and replacement.strip():
+                self._add(key, replacement.strip())
+        self._link()
+
+    def __len__(self) -> int:
+        return len(self._value)
+
+    def _add(self, key: str, replacement: str) -> None:
+        node = 0
+        for ch in key:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        if (node, len(key)) not in self._value:  # first pair wins (phrasebook before table)
+            self._out[node].append(len(key))
+            self._value[(node, len(key))] = replacement
+
+    def _link(self) -> None:
+        queue = list(self._goto[0].values())
+        for node in queue:  # BFS; appending while iterating walks the whole trie
+            for ch, child in self._goto[node].items():
+                f = self._fail[node]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                target = self._goto[f].get(ch, 0)
+                self._fail[child] = target if target != child else 0
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+                queue.append(child)
+
+    def find(self, text: str) -> List[Tuple[int, int, str]]:
+        goto, fail, out = self._goto, self._fail, self._out
+        hits: List[Tuple[int, int, str]] = []
+        node = 0
+        n = len(text)
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if not out[node] or (i + 1 < n and text[i + 1].isalnum()):
+                continue
+            for length in out[node]:
+                start = i + 1 - length
+                if start == 0 or not text[start - 1].isalnum():
+                    hits.append((start, i + 1, self._lookup(node, length)))
+        hits.sort(key=lambda h: (h[0], h[0] - h[1]))
+        chosen: List[Tuple[int, int, str]] = []
+        pos = 0
+        for h in hits:
+            if h[0] >= pos:
+                chosen.append(h)
+                pos = h[1]
+        return chosen
+
+    def _lookup(self, node: int, length: int) -> str:
+        # Suffix outputs are stored on the node that owns the pattern; walk fail links to it.
+        while (node, length) not in self._value:
+            node = self._fail[node]
+        return self._value[(node, length)]
+
+
+class PhraseEngine:
+    """Both-direction local translator; answers only inputs it fully covers."""
+
+    def __init__(self, pairs: Iterable[Tuple[str, str]], stats: Optional["EngineStats"] = None) -> None:
+        pairs = list(pairs)
+        self._matchers = {
+            "to_traditional": PhraseMatcher(pairs),
+            "to_modern": PhraseMatcher((t, m) for m, t in pairs),
+        }
+        self.stats = stats or EngineStats()
+
+    def coverage(self, text: str, direction: str) -> float:
+        """Share of the input's word characters covered by known phrases."""
+        key = normalize(text)
+        words = sum(ch.isalnum() for ch in key)
+        if not words:
+            return 0.0
+        covered = sum(sum(ch.isalnum() for ch in key[s:e]) for s, e, _ in self._matchers[direction].find(key))
+        return covered / words
+
+    def translate(self, text: str, direction: str) -> Optional[str]:
+        """Local translation, or None when any word is not covered by the dictionary."""
+        key = normalize(text)
+        matches = self._matchers[direction].find(key) if key else []
+        parts: List[str] = []
+        pos = 0
+        for start, end, replacement in matches:
+            gap = key[pos:start]
+            if any(ch.isalnum() for ch in gap):
+                self.stats.record(False)
+                return None
+            parts.append(gap)
+            parts.append(replacement)
+            pos = end
+        if not matches or any(ch.isalnum() for ch in key[pos:]):
+            self.stats.record(False)
+            return None
+        parts.append(key[pos:])
+        out = "".join(parts)
+        stripped = (text or "").strip()
+        if stripped[:1].isupper():
+            out = out[:1].upper() + out[1:]
+        self.stats.record(True)
+        return out
+
+
+class EngineStats:
+    """Lookups tried against the local engine and how many it answered."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.local = 0
+
+    def record(self, answered: bool) -> None:
+        with self._lock:
+            self.lookups += 1
+            self.local += int(answered)
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            lookups, local = self.lookups, self.local
+        return {
+            "lookups": lookups,
+            "local": local,
+            "coverage_rate": round(local / lookups, 4) if lookups else 0.0,
+        }
+
+
+_engine_stats = EngineStats()
+
+
+def engine_stats() -> Dict[str, float]:
+    """Metric: share of store misses answered by the local engine (process lifetime)."""
+    return _engine_stats.snapshot()
+
+
+def translate_local(text: str, direction: str, store: Optional[TranslationStore] = None) -> Optional[str]:
+    """Single-phrase fast path for /api/translator/translate (None -> ask the LLM)."""
+    if direction not in DIRECTIONS:
+        raise ValueError(f"direction must be one of {', '.join(DIRECTIONS)}")
+    store = store or _store
+    key = normalize(text)
+    known = store.lookup_many(direction, [key]) if key else {}
+    if key in known:
+        return known[key]
+    return store.engine().translate(text, direction)
+
+
+_store = TranslationStore()
+
+
+def translate_batch(
+    phrases: Sequence[str],
+    direction: str,
+    *,
+    upstream: Upstream,
+    store: Optional[TranslationStore] = None,
+) -> List[Dict[str, object]]:
+    """Translate phrases; returns [{"text", "translation", "cached", "source"}] in input order.
+
+    source is "store" (translations.db), "local" (phrase engine) or "upstream".
+    """
+    if direction not in DIRECTIONS:
+        raise ValueError(f"direction must be one of {', '.join(DIRECTIONS)}")
+    if len(phrases) > MAX_BATCH_PHRASES:
+        raise ValueError(f"at most {MAX_BATCH_PHRASES} phrases per batch")
+    store = store or _store
+
+    # Normalized keys are only for dedup and lookups; the engine and upstream see the phrase as typed.
+    keys = [normalize(p) for p in phrases]
+    originals: Dict[str, str] = {}
+    for p, k in zip(phrases, keys):
+        if k:
+            originals.setdefault(k, p.strip())
+    unique = list(originals)
+    known = store.lookup_many(direction, unique)
+    engine = store.engine()
+    local: Dict[str, str] = {}
+    for k in unique:
+        if k not in known:
+            answer = engine.translate(originals[k], direction)
+            if answer is not None:
+                local[k] = answer
+    misses = [k for k in unique if k not in known and k not in local]
+
+    fresh: Dict[str, str] = {}
+    if misses:
+        answers = upstream(direction, [originals[k] for k in misses])
+        if len(answers) != len(misses):
+            raise ValueError("upstream returned a different number of translations")
+        fresh = {k: (a or "").strip() for k, a in zip(misses, answers) if (a or "").strip()}
+        store.store_many(direction, {originals[k]: a for k, a in fresh.items()})
+
+    results: List[Dict[str, object]] = []
+    for text, key in zip(phrases, keys):
+        if key in known:
+            results.append({"text": text, "translation": known[key], "cached": True, "source": "store"})
+        elif key in local:
+            results.append({"text": text, "translation": local[key], "cached": True, "source": "local"})
+        else:
+            results.append({"text": text, "translation": fresh.get(key, ""), "cached": False, "source": "upstream"})
+    return results
+
+
+# ---- Upstream (LLM) ----
+
+_PROMPTS = {
+    "to_traditional": "Rewrite each modern/slang phrase in plain, traditional English an older reader would use.",
+    "to_modern": "Rewrite each traditional phrase the way a young person would say it today.",
+}
+
+
+def build_prompt(direction: str, phrases: List[str]) -> str:
+    return (
+        f"{_PROMPTS[direction]}\n"
+        "Input is a JSON array of phrases. Reply with ONLY a JSON array of the rewritten "
+        "phrases, same length and order.\n"
+        f"{json.dumps(phrases, ensure_ascii=False)}"
+    )
+
+
+def parse_reply(reply: str) -> List[str]:
+    start, end = reply.find("["), reply.rfind("]")
+    if start < 0 or end < start:
+        raise ValueError("upstream reply is not a JSON array")
+    return [str(x) for x in json.loads(reply[start : end + 1])]
+
+
+def openai_upstream(model: Optional[str] = None) -> Upstream:
+    """Upstream that sends one chat completion per batch of misses.
+
+    The OpenAI client is only loaded when a batch actually misses the cache (see llm.py).
+    """
+    import llm
+
+    def call(direction: str, phrases: List[str]) -> List[str]:
+        reply = llm.chat([{"role": "user", "content": build_prompt(direction, phrases)}], model=model, temperature=0)
+        return parse_reply(reply)
+
+    return call
+
+
+def _bench(phrases: int = 60, latency_s: float = 0.25) -> None:
+    import shutil
+    import tempfile
+    import time
+
+    calls = 0
+
+    def fake_upstream(direction: str, batch: List[str]) -> List[str]:
+        """Stands in for the LLM: one round trip of latency_s per call."""
+        nonlocal calls
+        calls += 1
+        build_prompt(direction, batch)
+        time.sleep(latency_s)
+        return [f"{p} (traditional)" for p in batch]
+
+    # Translator input repeats itself (greetings, common slang) in varying case/spacing.
+    distinct = max(1, phrases // 3)
+    inputs = [f"  Phrase number {i % distinct} " if i % 2 else f"phrase NUMBER {i % distinct}" for i in range(phrases)]
+
+    tmp = tempfile.mkdtemp()
+    try:
+        store = TranslationStore(os.path.join(tmp, "translations.db"))
+        print(f"{phrases} phrases ({distinct} distinct), fake upstream {latency_s * 1000:.0f} ms/call")
+
+        started = time.perf_counter()
+        for p in inputs:  # today: one /translate request and one LLM round trip per phrase
+            fake_upstream("to_traditional", [p])
+        print(f"  per-phrase /translate   {calls:4d} upstream calls  {time.perf_counter() - started:7.3f}s")
+
+        for label in ("translate_batch (cold)", "translate_batch (warm)"):
+            calls = 0
+            started = time.perf_counter()
+            out = translate_batch(inputs, "to_traditional", upstream=fake_upstream, store=store)
+            elapsed = time.perf_counter() - started
+            assert [r["text"] for r in out] == inputs
+            print(f"  {label:22s}  {calls:4d} upstream calls  {elapsed:7.3f}s")
+
+        engine = store.engine()
+        samples = ["ngl that slaps", "tbh it's giving main character energy", "brb, ttyl fam!", "lol no cap",
+                   "Honestly", "I'll be right back", "that recipe is bussin", "see you at the garden club"]
+        rounds = 2000
+        started = time.perf_counter()
+        for _ in range(rounds):
+            for s in samples:
+                engine.translate(s, "to_traditional")
+        per_call_us = (time.perf_counter() - started) / (rounds * len(samples)) * 1e6
+        covered = sum(engine.translate(s, "to_traditional") is not None for s in samples)
+        print(f"  local engine: {per_call_us:.1f} us/lookup, {covered}/{len(samples)} samples fully covered")
+        for s in samples[:3]:
+            print(f"    {s!r} -> {engine.translate(s, 'to_traditional')!r}")
+    finally:
+        shutil.rmtree(tmp)
+
+
+if __name__ == "__main__":
+    import sys
+
+    _bench(int(sys.argv[1]) if len(sys.argv) > 1 else 60)